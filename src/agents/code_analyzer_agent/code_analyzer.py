@@ -5,20 +5,52 @@ Analyzes PR file changes to:
 1. Summarize code changes
 2. Identify risky coding practices  
 3. Provide improvement recommendations
+
+A file diff larger than CHUNKED_ANALYSIS.chunk_tokens is split at hunk
+boundaries (see src/utils/diff_chunks.py); the chunks are analyzed
+concurrently and their reports combined FAN_IN at a time, level by level,
+into one file report.
 """
 
 import os
-import re
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+import asyncio
+import logging
+import hashlib
+from typing import Dict, Any, List, Optional
 from langchain_core.output_parsers import StrOutputParser
 
+from src.utils.config_loader import read_base_config
+from src.utils.llm_registry import get_prompt_template
+from src.utils.model_router import ANALYZE, ROUTER
+from src.utils.diff_chunks import (
+    CHUNK_CONCURRENCY, CHUNK_TOKENS, CHUNKING_ENABLED, FAN_IN, MAX_CHUNKED_FILE_BYTES, DiffChunk, chunk_diff
+)
+from src.utils.diff_parser import iter_file_diffs
+from src.utils.repo_index import MAX_CONTEXT_TOKENS, MAX_DEFINITIONS, IndexView, related_context
+from src.utils.review_log import get_logger, log_event
+from src.utils.tokens import count_tokens
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 if not OPENAI_API_KEY:
     print("WARNING: OPENAI_API_KEY is not set in the .env file.")
 
+logger = get_logger("analyzer")
+
+# Upper bound on concurrent per-file LLM calls
+MAX_CONCURRENCY = read_base_config().get("ANALYZER", {}).get("max_concurrency", 4)
+# Raw diff text kept per file for the prompt; hunks past it are still indexed
+MAX_FILE_DIFF_BYTES = read_base_config().get("DIFF", {}).get("max_file_bytes", 20000)
+if CHUNKING_ENABLED:
+    # Large files are analyzed in chunks, so keep (nearly) all of their diff
+    MAX_FILE_DIFF_BYTES = max(MAX_FILE_DIFF_BYTES, MAX_CHUNKED_FILE_BYTES)
+
+# Prefix of per-file reports that should not be reused on the next review
+ANALYSIS_FAILED_PREFIX = "Analysis failed for this file"
+
+# Run metadata key naming the file an analysis call is about, for token streaming
+FILE_METADATA_KEY = "review_file"
+
 # Prompts for different file types
 ANALYZE_CHANGES_PROMPT = """
 You are an expert code reviewer. Analyze the following code changes and provide:
@@ -29,6 +61,7 @@ Changes: +{additions}/-{deletions}
 ```diff
 {file_diff}
 ```
+{repo_context}
 
 Please provide:
 
@@ -54,57 +87,208 @@ Please provide:
 Keep the analysis focused and actionable.
 """
 
+COMBINE_ANALYSES_PROMPT = """
+You are an expert code reviewer. The diff of one file was too large to review at once, so
+consecutive parts of it were analyzed separately. Combine the analyses below into a single
+analysis of the changes they cover.
+
+File: {filename}
+Changes: +{additions}/-{deletions}
+
+{reports}
+
+Use exactly these sections:
+
+## Summary of Changes
+## Code Quality Issues
+## Risky Practices Found
+## Recommendations
+
+Keep every distinct issue with its line numbers, merge duplicates, and do not drop high-risk
+findings. Keep the analysis focused and actionable.
+"""
+
 def extract_file_changes(pr_data: Dict) -> Dict[str, Dict]:
     """Extract individual file changes from PR diff."""
     if not pr_data.get("pr_diff"):
         return {}
     
-    full_diff = pr_data["pr_diff"]
     files_data = pr_data.get("pr_files", [])
     
     # Map filenames to metadata
     file_metadata = {file.get("filename"): file for file in files_data}
     
-    # Split diff by files using regex
-    file_pattern = r'diff --git a/(.*?) b/(.*?)\n'
-    file_splits = re.split(file_pattern, full_diff)
-    
     file_changes = {}
-    
-    for i in range(1, len(file_splits), 3):
-        if i + 2 < len(file_splits):
-            filename = file_splits[i + 1]  # Use 'after' filename
-            diff_content = file_splits[i + 2]
-            
-            metadata = file_metadata.get(filename, {})
-            
-            diff_header = f"diff --git a/{file_splits[i]} b/{filename}" + "\n" + diff_content
-            
-            file_changes[filename] = {
-                "filename": filename,
-                "additions": metadata.get("additions", 0),
-                "deletions": metadata.get("deletions", 0),
-                "diff": diff_header.strip()
-            }
+    for record in iter_file_diffs(pr_data["pr_diff"], max_file_bytes=MAX_FILE_DIFF_BYTES):
+        filename = record["filename"]
+        metadata = file_metadata.get(filename, {})
+        file_changes[filename] = {
+            "filename": filename,
+            "status": record["status"],
+            "old_path": record["old_path"],
+            "additions": metadata.get("additions", record["additions"]),
+            "deletions": metadata.get("deletions", record["deletions"]),
+            "diff": record["diff"],
+            "truncated": record["truncated"],
+            "digest": record["digest"],
+            "is_binary": record["is_binary"],
+            "hunks": record["hunks"]
+        }
     
     return file_changes
 
-async def code_analyzer(pr_data: Dict) -> str:
-    """Analyze changes in a single file."""
-    file_changes = extract_file_changes(pr_data)
-    filename = file_changes.get("filename", "Unknown")
+def fingerprint_file_change(change: Dict) -> str:
+    """Stable hash of a file's diff, used to detect unchanged files across pushes."""
+    return change.get("digest") or hashlib.sha256(change.get("diff", "").encode("utf-8")).hexdigest()
+
+def is_usable_analysis(report: str) -> bool:
+    """A report with at least one of the requested sections; anything else escalates."""
+    return bool(report) and "## " in report
+
+async def analyze_file(change: Dict, chains: Dict[str, Any], tier: str, semaphore: asyncio.Semaphore,
+                       repo_index: Optional[IndexView] = None, part: Optional[str] = None) -> str:
+    """
+    Analyze changes in a single file on the given model tier, bounded by the shared semaphore.
+    part names the chunk when change holds one chunk of a larger diff.
+    """
+    filename = change.get("filename", "Unknown")
     prompt_data = {
-        "filename": filename,
-        "additions": file_changes.get("additions", 0),
-        "deletions": file_changes.get("deletions", 0),
-        "file_diff": file_changes.get("diff", "No diff available")
+        "filename": f"{filename} ({part})" if part else filename,
+        "additions": change.get("additions", 0),
+        "deletions": change.get("deletions", 0),
+        "file_diff": change.get("diff", "No diff available"),
+        "repo_context": ""
     }
-    prompt_template = ANALYZE_CHANGES_PROMPT
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = (
-        prompt 
-        | ChatOpenAI(model="gpt-4o", temperature=0, api_key=OPENAI_API_KEY)
-        | StrOutputParser()
-    )
-    
-    return await chain.ainvoke(prompt_data)
+    async with semaphore:
+        try:
+            if repo_index is not None:
+                # Definitions the hunks use but do not show; lookups read git, so off the loop
+                prompt_data["repo_context"] = await asyncio.to_thread(
+                    related_context, repo_index, change, MAX_DEFINITIONS, MAX_CONTEXT_TOKENS
+                )
+        except Exception as e:
+            log_event(logger, logging.WARNING, "repo_context.failed", file=prompt_data["filename"], error=repr(e))
+        config = {"metadata": {FILE_METADATA_KEY: filename}}
+        try:
+            report, _ = await ROUTER.invoke(
+                ANALYZE, tier, lambda t: chains[t].ainvoke(prompt_data, config=config), is_usable_analysis
+            )
+            return report
+        except Exception as e:
+            log_event(logger, logging.WARNING, "analysis.failed", file=prompt_data["filename"], error=repr(e))
+            return f"{ANALYSIS_FAILED_PREFIX}: {e}"
+
+def _part_label(chunks: List[DiffChunk]) -> str:
+    first, last = chunks[0], chunks[-1]
+    parts = f"part {first['part']}" if first is last else f"parts {first['part']}-{last['part']}"
+    return f"{parts}, new lines {first['new_start']}-{max(c['new_end'] for c in chunks)}"
+
+async def analyze_chunked_file(change: Dict, chains: Dict[str, Any], combine_chains: Dict[str, Any], tier: str,
+                               semaphore: asyncio.Semaphore, repo_index: Optional[IndexView] = None) -> str:
+    """
+    Analyzes a large file diff chunk by chunk, then combines the chunk reports
+    FAN_IN at a time until one report is left. Latency grows with the number
+    of levels (log FAN_IN of the chunk count) as long as semaphore admits the
+    chunks of a level together.
+    """
+    filename = change.get("filename", "Unknown")
+    chunks = await asyncio.to_thread(chunk_diff, change.get("diff", ""), CHUNK_TOKENS)
+    total = len(chunks)
+
+    async def leaf(chunk: DiffChunk) -> str:
+        return await analyze_file(
+            {**change, "diff": chunk["diff"], "additions": chunk["additions"], "deletions": chunk["deletions"]},
+            chains, tier, semaphore, repo_index, part=f"{_part_label([chunk])} of {total}"
+        )
+
+    async def combine(group: List[tuple]) -> tuple:
+        covered = [chunk for members, _ in group for chunk in members]
+        if len(group) == 1:
+            return group[0]
+        reports = "\n\n".join(f"### Analysis of {_part_label(members)}\n{report.strip()}" for members, report in group)
+        prompt_data = {
+            "filename": filename,
+            "additions": sum(c["additions"] for c in covered),
+            "deletions": sum(c["deletions"] for c in covered),
+            "reports": reports,
+        }
+        config = {"metadata": {FILE_METADATA_KEY: filename}}
+        async with semaphore:
+            try:
+                report, _ = await ROUTER.invoke(
+                    ANALYZE, tier, lambda t: combine_chains[t].ainvoke(prompt_data, config=config), is_usable_analysis
+                )
+            except Exception as e:
+                # Keep the part reports rather than losing them
+                log_event(logger, logging.WARNING, "analysis.combine_failed", file=filename, error=repr(e))
+                report = reports
+        return covered, report
+
+    reports = await asyncio.gather(*(leaf(chunk) for chunk in chunks))
+    failed = sum(1 for report in reports if report.startswith(ANALYSIS_FAILED_PREFIX))
+    # Only the chunks' line ranges and counts are needed from here on, not their diffs
+    level = [
+        ([{**chunk, "diff": ""}], report) for chunk, report in zip(chunks, reports)
+        if not report.startswith(ANALYSIS_FAILED_PREFIX)
+    ]
+    del chunks, reports
+    levels = 0
+    while len(level) > 1:
+        level = await asyncio.gather(*(combine(level[i:i + FAN_IN]) for i in range(0, len(level), FAN_IN)))
+        levels += 1
+    log_event(logger, logging.INFO, "analysis.chunked", file=filename, chunks=total, levels=levels, failed=failed)
+    if not level:
+        return f"{ANALYSIS_FAILED_PREFIX}: all {total} parts failed"
+    report = level[0][1]
+    if failed:
+        # Partial reports are shown but not reused on the next review
+        return f"{ANALYSIS_FAILED_PREFIX}: {failed} of {total} parts could not be analyzed\n\n{report}"
+    return report
+
+async def analyze_files(file_changes: Dict[str, Dict], repo_index: Optional[IndexView] = None,
+                        tiers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Map step: analyze every file concurrently and return filename -> report.
+    tiers maps filenames to model tiers (see model_router); missing files use the stage default.
+    """
+    prompt = get_prompt_template("analyze_changes", ANALYZE_CHANGES_PROMPT)
+    combine_prompt = get_prompt_template("combine_analyses", COMBINE_ANALYSES_PROMPT)
+    chains, combine_chains = {}, {}
+    for tier in ROUTER.order:
+        model = ROUTER.chat_model(tier, temperature=0)
+        chains[tier] = prompt | model | StrOutputParser()
+        combine_chains[tier] = combine_prompt | model | StrOutputParser()
+    tiers = tiers or {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    # Chunks of large files get their own slots so one big file does not serialize the rest
+    chunk_semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def analyze(name: str, change: Dict) -> str:
+        tier = tiers.get(name) or ROUTER.default_tier(ANALYZE)
+        diff = change.get("diff", "")
+        # A diff has no more tokens than characters, so short ones skip the count
+        if CHUNKING_ENABLED and len(diff) > CHUNK_TOKENS and await asyncio.to_thread(count_tokens, diff) > CHUNK_TOKENS:
+            return await analyze_chunked_file(change, chains, combine_chains, tier, chunk_semaphore, repo_index)
+        return await analyze_file(change, chains, tier, semaphore, repo_index)
+
+    reports = await asyncio.gather(*(analyze(name, change) for name, change in file_changes.items()))
+    return dict(zip(file_changes.keys(), reports))
+
+def merge_file_analyses(file_changes: Dict[str, Dict], reports: Dict[str, str]) -> str:
+    """Reduce step: merge per-file reports into a single analysis string."""
+    if not reports:
+        return "No file changes to analyze."
+    sections = [f"# Code Analysis ({len(reports)} file(s) changed)"]
+    for filename, report in reports.items():
+        change = file_changes.get(filename, {})
+        sections.append(
+            f"\n### File: {filename} (+{change.get('additions', 0)}/-{change.get('deletions', 0)})\n"
+            f"{report.strip()}"
+        )
+    return "\n".join(sections)
+
+async def code_analyzer(pr_data: Dict) -> str:
+    """Analyze every changed file in parallel and merge the reports."""
+    file_changes = extract_file_changes(pr_data)
+    reports = await analyze_files(file_changes)
+    return merge_file_analyses(file_changes, reports)
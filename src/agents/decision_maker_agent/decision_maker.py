@@ -1,9 +1,22 @@
-import os 
+import os
+import logging
+from typing import Dict, Optional
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
 from langgraph.prebuilt import create_react_agent
-from langchain_openai import ChatOpenAI
 
-from src.tools.react_tool import merge_decision_tool
+from src.tools.react_tool import (
+    RiskLevel,
+    Verdict,
+    evaluate_merge_rules,
+    format_decision,
+    merge_decision_tool,
+    parse_decision,
+)
+from src.utils.config_loader import read_base_config
+from src.utils.llm_registry import get_prompt_template
+from src.utils.model_router import DECISION, ROUTER
+from src.utils.review_log import get_logger, log_event
 
 load_dotenv()
 
@@ -12,16 +25,54 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 if not OPENAI_API_KEY:
     print("WARNING: OPENAI_API_KEY is not set in the .env file.")
-    
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+
+logger = get_logger("decision")
+
+DECISION_CONFIG = read_base_config().get("DECISION", {})
+# "structured": one structured-output call; "react": the ReAct agent loop
+DECISION_MODE = DECISION_CONFIG.get("mode", "structured")
+
+STRUCTURED_DECISION_PROMPT = """You are a senior software engineer deciding whether a pull request can be merged.
+
+Code Analysis:
+{code_analysis}
+
+Review Comments:
+{review_comments}
+
+Rule engine pre-check: {rules_verdict} (risk {rules_risk}): {rules_rationale}
+The rule engine matches keywords only; use it as a signal, not as the answer.
+
+Return the verdict, the risk level and a one or two sentence rationale."""
+
+
+class MergeDecision(BaseModel):
+    verdict: Verdict = Field(description="merge if the PR is safe to merge, otherwise do_not_merge")
+    risk: RiskLevel = Field(description="Overall risk of merging the PR")
+    rationale: str = Field(description="Brief justification of the verdict")
+
+
 tools = [merge_decision_tool]
-react_agent_executor = create_react_agent(llm, tools=tools)
+_REACT_AGENT = None
+_REACT_AGENT_LLM = None
 
-async def run_react_agent(code_analysis: str, review_comments: list) -> str:
+def get_react_agent():
+    """Builds the ReAct agent once per shared chat model instance."""
+    global _REACT_AGENT, _REACT_AGENT_LLM
+    llm = ROUTER.chat_model(ROUTER.default_tier(DECISION), temperature=0)
+    if _REACT_AGENT is None or _REACT_AGENT_LLM is not llm:
+        _REACT_AGENT = create_react_agent(llm, tools=tools)
+        _REACT_AGENT_LLM = llm
+    return _REACT_AGENT
 
-    comments_str = "\n".join(
+def format_review_comments(review_comments: list) -> str:
+    return "\n".join(
         [f"- [{c.get('comment_type', '').upper()}] {c.get('content', '')}" for c in review_comments]
     )
+
+async def run_react_agent(code_analysis: str, review_comments: list) -> str:
+
+    comments_str = format_review_comments(review_comments)
     query = (
         f"You are a senior software engineer evaluating a pull request.\n\n"
         f"Code Analysis:\n{code_analysis}\n\n"
@@ -30,6 +81,58 @@ async def run_react_agent(code_analysis: str, review_comments: list) -> str:
         "- YES, it is safe to merge. [brief reason]\n"
         "- NO, do not merge. [brief reason]\n"
     )
-    result = await react_agent_executor.ainvoke({"messages": [("human", query)]})
+    result = await get_react_agent().ainvoke({"messages": [("human", query)]})
     messages = result["messages"]
-    return messages[-1].content if messages else "No decision made."
\ No newline at end of file
+    return messages[-1].content if messages else "No decision made."
+
+async def run_structured_decision(code_analysis: str, review_comments: list, plan: Optional[Dict] = None) -> Dict:
+    """
+    One structured-output call returning verdict, risk and rationale. The rule
+    engine's result is part of the prompt, picks the model tier with the
+    review's model plan, and is used as is if every tier fails.
+    """
+    comments_str = format_review_comments(review_comments)
+    rules = evaluate_merge_rules(code_analysis, comments_str)
+    prompt = get_prompt_template("structured_decision", STRUCTURED_DECISION_PROMPT)
+    inputs = {
+        "code_analysis": code_analysis,
+        "review_comments": comments_str or "(none)",
+        "rules_verdict": rules["verdict"].value,
+        "rules_risk": rules["risk"].value,
+        "rules_rationale": rules["rationale"],
+    }
+
+    async def decide(tier: str):
+        structured = ROUTER.chat_model(tier, temperature=0).with_structured_output(MergeDecision, method="function_calling")
+        return await (prompt | structured).ainvoke(inputs)
+
+    tier = ROUTER.decision_tier(rules["risk"].value, review_comments, plan)
+    try:
+        # No tool call parses to None, which counts as unparseable
+        decision, tier = await ROUTER.invoke(DECISION, tier, decide, lambda d: isinstance(d, MergeDecision))
+        if decision is None:
+            raise ValueError("no structured decision returned")
+        verdict, risk, rationale, source = decision.verdict, decision.risk, decision.rationale, "llm"
+    except Exception as e:
+        log_event(logger, logging.WARNING, "decision.llm_failed", fallback="rules", error=repr(e))
+        verdict, risk, rationale, source = rules["verdict"], rules["risk"], rules["rationale"], "rules"
+    return {
+        "verdict": Verdict(verdict).value,
+        "risk": RiskLevel(risk).value,
+        "rationale": rationale,
+        "source": source,
+        "message": format_decision(verdict, risk, rationale),
+    }
+
+async def make_merge_decision(code_analysis: str, review_comments: list, mode: str = None,
+                              plan: Optional[Dict] = None) -> Dict:
+    """
+    Runs the configured decision mode and returns verdict, risk, rationale and
+    the message. plan is the review's model plan (see model_router); the ReAct
+    loop always runs on the stage's default tier.
+    """
+    mode = mode or DECISION_MODE
+    if mode == "react":
+        message = await run_react_agent(code_analysis, review_comments)
+        return {**parse_decision(message), "source": "react", "message": message}
+    return await run_structured_decision(code_analysis, review_comments, plan)
@@ -11,6 +11,7 @@ async def pr_retriever_agent(repo_owner: str, repo_name: str, pr_number: int) ->
         "pr_author": pr_raw.get("user", {}).get("login") or "",
         "pr_state": pr_raw.get("state") or "",
         "pr_url": pr_raw.get("html_url") or "",
+        "pr_head_sha": (pr_raw.get("head") or {}).get("sha") or "",
         "pr_files": [],
         "pr_commits": [],
         "pr_diff": pr_raw.get("pr_diff", ""),
@@ -1,9 +1,19 @@
-import json
-import re
-from typing import Dict, List, Optional
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables.config import ensure_config, merge_configs
+
+from src.utils.json_stream import DONE, JsonArrayStreamParser
+from src.utils.llm_registry import get_prompt_template
+from src.utils.model_router import COMMENT, ROUTER
+from src.utils.review_log import get_logger, log_event
+
+logger = get_logger("reviewer")
+
+_END = object()
 
 # Prompt for generating individual review comments
 GENERATE_COMMENTS_PROMPT = """
@@ -40,12 +50,131 @@ Example:
 ]
 """
 
-def extract_json_array(text: str) -> Optional[str]:
+class _CommentStreamHandler(AsyncCallbackHandler):
+    """Feeds streamed tokens to the parser and queues every comment as soon as it closes."""
+
+    def __init__(self, parser: JsonArrayStreamParser, queue: asyncio.Queue):
+        self.parser = parser
+        self.queue = queue
+        self.streamed = False
+
+    async def on_llm_new_token(self, token: str, **kwargs):
+        self.streamed = True
+        for comment in self.parser.feed(token):
+            self.queue.put_nowait(comment)
+
+
+def _fallback_comment(content: Optional[str]) -> Dict:
+    return {
+        "content": content if content else "Could not parse comment output.",
+        "file_path": None,
+        "line_number": None,
+        "comment_type": "comment",
+        "severity": None
+    }
+
+
+def _normalize_comment(comment: Dict) -> Optional[Dict]:
+    """
+    Fills the fields a comment cut off mid-stream (or written loosely) is
+    missing; None when it has no content to show.
+    """
+    content = comment.get("content")
+    if not isinstance(content, str) or not content.strip():
+        return None
+    comment_type = comment.get("comment_type")
+    line_number = comment.get("line_number")
+    return {
+        **comment,
+        "content": content,
+        "file_path": comment.get("file_path") if isinstance(comment.get("file_path"), str) else None,
+        "line_number": line_number if isinstance(line_number, int) and not isinstance(line_number, bool) else None,
+        "comment_type": comment_type if isinstance(comment_type, str) and comment_type else "comment",
+        "severity": comment.get("severity") if isinstance(comment.get("severity"), str) else None,
+    }
+
+
+async def _stream_attempt(analysis_result: str, tier: str, outcome: Dict) -> AsyncIterator[Dict]:
+    """
+    One completion on tier; yields each comment as soon as its JSON object
+    closes, normalized by _normalize_comment (comments without content are
+    dropped). Sets outcome["parsed"] when the output held comments or an
+    empty array, and outcome["raw"] to the full output.
     """
-    Extracts the first JSON array from a string using regex.
+    prompt = get_prompt_template("generate_comments", GENERATE_COMMENTS_PROMPT)
+    # stream=True makes the model stream inside ainvoke, so the response cache still applies
+    chain = prompt | ROUTER.chat_model(tier, temperature=0.2).bind(stream=True) | StrOutputParser()
+    parser = JsonArrayStreamParser()
+    queue: asyncio.Queue = asyncio.Queue()
+    handler = _CommentStreamHandler(parser, queue)
+
+    async def run():
+        try:
+            # Added to the inherited callbacks, so the workflow's own handlers still see the call
+            config = merge_configs(ensure_config(), {"callbacks": [handler]})
+            return await chain.ainvoke({"code_analysis": analysis_result}, config=config)
+        finally:
+            queue.put_nowait(_END)
+
+    task = asyncio.create_task(run())
+    yielded = 0
+    comments_str = None  # Predefine for error handling
+    try:
+        while (comment := await queue.get()) is not _END:
+            if (comment := _normalize_comment(comment)) is not None:
+                yielded += 1
+                yield comment
+        try:
+            comments_str = await task
+            if not comments_str or not comments_str.strip():
+                raise ValueError("LLM returned empty output.")
+            if not handler.streamed:
+                # Cache hits and non-streaming models deliver the whole text at once
+                for comment in parser.feed(comments_str):
+                    if (comment := _normalize_comment(comment)) is not None:
+                        yielded += 1
+                        yield comment
+        except Exception as e:
+            log_event(logger, logging.WARNING, "comments.llm_failed", tier=tier, error=repr(e))
+        # An empty array is a valid answer; anything else without comments is not
+        empty_array = parser.state == DONE
+        for comment in parser.close():
+            log_event(logger, logging.WARNING, "comments.truncated_recovered")
+            if (comment := _normalize_comment(comment)) is not None:
+                yielded += 1
+                yield {**comment, "truncated": True}
+        if parser.skipped:
+            log_event(logger, logging.WARNING, "comments.malformed_skipped", count=parser.skipped)
+        outcome["parsed"] = bool(yielded) or empty_array
+        outcome["raw"] = comments_str
+    finally:
+        task.cancel()
+
+
+async def stream_pr_comments(analysis_result: str, tier: Optional[str] = None) -> AsyncIterator[Dict]:
     """
-    match = re.search(r'(\[\s*{.*?}\s*\])', text, re.DOTALL)
-    return match.group(1) if match else None
+    Streams the completion and yields each review comment as soon as its JSON
+    object closes. A comment cut off partway is repaired and marked
+    "truncated". Output without any comment is retried on the next model
+    tier; on the last one, the raw output becomes a single comment.
+    """
+    tier = tier or ROUTER.default_tier(COMMENT)
+    while True:
+        outcome: Dict = {}
+        started = time.perf_counter()
+        async for comment in _stream_attempt(analysis_result, tier, outcome):
+            yield comment
+        ROUTER.record_call(COMMENT, tier, time.perf_counter() - started)
+        if outcome.get("parsed"):
+            return
+        next_tier = ROUTER.escalate(COMMENT, tier, "unparseable output")
+        if next_tier is None:
+            break
+        tier = next_tier
+    if outcome.get("raw"):
+        log_event(logger, logging.WARNING, "comments.unparsed_raw_output")
+    yield _fallback_comment(outcome.get("raw"))
+
 
 async def generate_pr_comments(pr_data: Dict, analysis_result: str) -> List[Dict]:
     """
@@ -58,42 +187,4 @@ async def generate_pr_comments(pr_data: Dict, analysis_result: str) -> List[Dict
     Returns:
         List of comment dicts.
     """
-    prompt = ChatPromptTemplate.from_template(GENERATE_COMMENTS_PROMPT)
-    chain = prompt | ChatOpenAI(model="gpt-4o", temperature=0.2) | StrOutputParser()
-
-    comments_str = None  # Predefine for error handling
-    try:
-        comments_str = await chain.ainvoke({"code_analysis": analysis_result})
-        # print(f"[DEBUG] Raw LLM output: {comments_str!r}")
-
-        if not comments_str or not comments_str.strip():
-            raise ValueError("LLM returned empty output.")
-
-        try:
-            comments = json.loads(comments_str)
-        except json.JSONDecodeError:
-            # Try to extract JSON array from the output
-            extracted = extract_json_array(comments_str)
-            if extracted:
-                comments = json.loads(extracted)
-            else:
-                raise
-
-        if isinstance(comments, dict) and 'comments' in comments:
-            comments = comments['comments']
-
-    except Exception as e:
-        print(f"[WARN] Failed to generate comments: {e}")
-        comments = [{
-            "content": comments_str if comments_str else "Could not parse comment output.",
-            "file_path": None,
-            "line_number": None,
-            "comment_type": "comment",
-            "severity": None
-        }]
-
-    return comments
-
-
-
-
+    return [comment async for comment in stream_pr_comments(analysis_result)]
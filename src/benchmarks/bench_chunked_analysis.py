@@ -0,0 +1,118 @@
+"""
+Benchmark: analysis of one very large file diff, whole vs. chunked.
+
+Generates single-file diffs of growing size and analyzes each through
+analyze_files() with a synthetic chat model whose context window is
+--context-tokens and whose latency grows with the prompt. "whole" sends the
+diff in one prompt (CHUNKED_ANALYSIS disabled), "chunked" splits it at hunk
+boundaries and combines the chunk reports FAN_IN at a time. Reports chunks,
+combine levels, LLM calls, wall time and peak traced memory per size.
+
+Usage:
+    python -m src.benchmarks.bench_chunked_analysis --lines 2000 10000 40000 160000
+"""
+
+import os
+import math
+import random
+import asyncio
+import argparse
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.agents.code_analyzer_agent import code_analyzer
+from src.agents.code_analyzer_agent.code_analyzer import ANALYSIS_FAILED_PREFIX, analyze_files
+from src.benchmarks.fake_llm import SyntheticChatModel
+from src.utils.diff_chunks import CHUNK_TOKENS, FAN_IN, chunk_diff
+from src.utils.llm_cache import set_cache_bypass
+from src.utils.llm_registry import set_chat_model_factory
+from src.utils.review_log import configure_logging
+
+MODES = ("whole", "chunked")
+
+
+def synth_file_diff(lines: int, seed: int = 11) -> dict:
+    """A migration-like diff: many hunks of varied size, some far larger than a chunk."""
+    rng = random.Random(seed)
+    out = ["--- a/db/migrations/0042_backfill.py", "+++ b/db/migrations/0042_backfill.py"]
+    old = new = 1
+    written = additions = deletions = 0
+    hunk = 0
+    while written < lines:
+        size = min(lines - written, rng.choice([8, 40, 120, 2500]))
+        body, old_count, new_count = [], 0, 0
+        for i in range(size):
+            kind = rng.choices(" +-", weights=(2, 5, 2))[0]
+            body.append(f"{kind}    op_{hunk}_{i} = migrate_row(table='t{hunk % 7}', row={i}, batch_size={rng.randint(1, 500)})")
+            old_count += kind in " -"
+            new_count += kind in " +"
+            additions += kind == "+"
+            deletions += kind == "-"
+        out.append(f"@@ -{old},{old_count} +{new},{new_count} @@ def step_{hunk}():")
+        out.extend(body)
+        old += old_count + 20
+        new += new_count + 20
+        written += size
+        hunk += 1
+    return {
+        "filename": "db/migrations/0042_backfill.py",
+        "status": "modified",
+        "additions": additions,
+        "deletions": deletions,
+        "diff": "\n".join(out),
+    }
+
+
+async def run(mode: str, change: dict, args) -> dict:
+    model = SyntheticChatModel(
+        model_name="gpt-4o",
+        base_latency_ms=args.llm_latency_ms,
+        ms_per_input_token=args.ms_per_input_token,
+        ms_per_output_token=args.ms_per_output_token,
+        context_tokens=args.context_tokens,
+    )
+    set_chat_model_factory(lambda name, temperature: model)
+    set_cache_bypass(True)
+    code_analyzer.CHUNKING_ENABLED = mode == "chunked"
+    tracemalloc.start()
+    started = asyncio.get_running_loop().time()
+    report = (await analyze_files({change["filename"]: change}))[change["filename"]]
+    wall = asyncio.get_running_loop().time() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    set_chat_model_factory(None)
+    return {
+        "ok": not report.startswith(ANALYSIS_FAILED_PREFIX),
+        "calls": model.stats["calls"],
+        "wall_s": wall,
+        "peak_mb": peak / 1e6,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[2000, 10000, 40000, 160000])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--context-tokens", type=int, default=128000, help="synthetic model context window")
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--ms-per-input-token", type=float, default=0.02)
+    parser.add_argument("--ms-per-output-token", type=float, default=0.5)
+    args = parser.parse_args()
+
+    configure_logging(stream=open(os.devnull, "w"))
+    print(f"chunk_tokens={CHUNK_TOKENS} fan_in={FAN_IN} context={args.context_tokens}")
+    print(f"{'lines':>8}{'diff MB':>9}{'mode':>9}{'chunks':>8}{'levels':>8}{'ok':>5}{'calls':>7}{'wall s':>9}{'peak MB':>9}")
+    for lines in args.lines:
+        change = synth_file_diff(lines)
+        chunks = len(chunk_diff(change["diff"], CHUNK_TOKENS))
+        levels = math.ceil(math.log(chunks, FAN_IN)) if chunks > 1 else 0
+        for mode in args.modes:
+            r = await run(mode, change, args)
+            print(f"{lines:>8}{len(change['diff']) / 1e6:>9.2f}{mode:>9}{chunks if mode == 'chunked' else 1:>8}"
+                  f"{levels if mode == 'chunked' else 0:>8}{'yes' if r['ok'] else 'no':>5}{r['calls']:>7}"
+                  f"{r['wall_s']:>9.2f}{r['peak_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Benchmark: ReAct decision loop vs. single structured-output decision.
+
+Replays recorded model responses for each case in
+fixtures/decision_cases.json through both decision modes and reports LLM
+calls, input/output tokens (counted with tiktoken on the prompts actually
+sent) and latency (recorded per response, scaled by --time-scale).
+
+Usage:
+    python -m src.benchmarks.bench_decision_modes --repeat 5 --time-scale 0.01
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.benchmarks.fake_llm import ReplayChatModel
+from src.agents.decision_maker_agent.decision_maker import make_merge_decision
+from src.utils.llm_registry import set_chat_model_factory
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "decision_cases.json")
+MODES = ("react", "structured")
+
+
+async def run_mode(mode: str, cases, repeat: int, time_scale: float):
+    totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "latency_s": 0.0}
+    verdicts = {}
+    started = time.perf_counter()
+    for case in cases:
+        model = ReplayChatModel(responses=case[mode], time_scale=time_scale)
+        set_chat_model_factory(lambda name, temperature: model)
+        for _ in range(repeat):
+            decision = await make_merge_decision(case["code_analysis"], case["comments"], mode=mode)
+        verdicts[case["name"]] = (decision["verdict"], decision["risk"])
+        for key in totals:
+            totals[key] += model.stats[key]
+    set_chat_model_factory(None)
+    return totals, verdicts, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="decisions per case")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="multiplier for recorded latencies")
+    args = parser.parse_args()
+
+    with open(FIXTURES) as f:
+        cases = json.load(f)
+    decisions = len(cases) * args.repeat
+
+    print(f"{len(cases)} cases x {args.repeat} decisions, recorded latency scaled by {args.time_scale}")
+    print(f"{'mode':<12}{'calls/dec':>10}{'in tok/dec':>12}{'out tok/dec':>12}{'model ms/dec':>14}{'wall s':>9}")
+    results = {}
+    for mode in MODES:
+        totals, verdicts, wall = await run_mode(mode, cases, args.repeat, args.time_scale)
+        results[mode] = verdicts
+        print(
+            f"{mode:<12}{totals['calls'] / decisions:>10.1f}{totals['input_tokens'] / decisions:>12.0f}"
+            f"{totals['output_tokens'] / decisions:>12.0f}"
+            f"{totals['latency_s'] / args.time_scale / decisions * 1000:>14.0f}{wall:>9.2f}"
+        )
+
+    print("\nverdicts (react | structured):")
+    for case in cases:
+        print(f"  {case['name']:<18}{str(results['react'][case['name']]):<32}{results['structured'][case['name']]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
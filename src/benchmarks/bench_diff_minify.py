@@ -0,0 +1,107 @@
+"""
+Benchmark: prompt tokens of file diffs before and after minification.
+
+For every cassette, parses the recorded diff the way the analyzer does and
+reports raw tokens, tokens after minification alone, tokens after the
+per-request budget, the share saved and the time spent. It also checks that
+every changed line kept in a minified diff carries the same old/new line
+number as in the raw diff, so comments still land on the right lines.
+
+Usage:
+    python -m src.benchmarks.bench_diff_minify --scenarios small_pr medium_pr huge_pr --budget 60000
+"""
+
+import json
+import time
+import argparse
+from typing import Dict, List, Tuple
+
+from src.agents.code_analyzer_agent.code_analyzer import MAX_FILE_DIFF_BYTES
+from src.benchmarks.mcp_cassette import fixture_path, load_cassette
+from src.utils.diff_minify import CONTEXT_RADIUS, MIN_FILE_TOKENS, fit_to_budget, split_diff
+from src.utils.diff_parser import iter_file_diffs
+
+
+def load_file_changes(scenario: str) -> Dict[str, Dict]:
+    cassette = load_cassette(fixture_path(scenario))
+    diff = next(i["result"] for i in cassette["interactions"] if i["tool"] == "get_pull_request_diff")
+    return {record["filename"]: dict(record) for record in iter_file_diffs(diff, max_file_bytes=MAX_FILE_DIFF_BYTES)}
+
+
+def numbered_changes(diff: str) -> List[Tuple[str, int, str]]:
+    """(marker, line number on its side, text) for every +/- line of a diff."""
+    _, hunks = split_diff(diff)
+    out = []
+    for match, lines in hunks:
+        old_no, new_no = int(match.group(1)), int(match.group(3))
+        for line in lines:
+            marker = line[:1]
+            if marker == "-":
+                out.append(("-", old_no, line[1:]))
+                old_no += 1
+            elif marker == "+":
+                out.append(("+", new_no, line[1:]))
+                new_no += 1
+            elif marker == " " or line == "":
+                old_no += 1
+                new_no += 1
+    return out
+
+
+def check_line_numbers(raw: Dict[str, Dict], minified: Dict[str, Dict]) -> int:
+    """Number of changed lines whose line number moved; 0 is correct."""
+    mismatches = 0
+    for name, change in minified.items():
+        expected = set(numbered_changes(raw[name]["diff"]))
+        mismatches += sum(1 for entry in numbered_changes(change["diff"]) if entry not in expected)
+    return mismatches
+
+
+def run_scenario(scenario: str, radius: int, budget: int, min_file_tokens: int) -> Dict:
+    file_changes = load_file_changes(scenario)
+    started = time.perf_counter()
+    minified, _, minify_report = fit_to_budget(file_changes, radius, None, min_file_tokens)
+    minify_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    budgeted, skipped, report = fit_to_budget(file_changes, radius, budget, min_file_tokens)
+    budget_ms = (time.perf_counter() - started) * 1000
+    return {
+        "scenario": scenario,
+        "files": len(file_changes),
+        "skipped": len(skipped),
+        "raw_tokens": report["raw_tokens"],
+        "minified_tokens": minify_report["prompt_tokens"],
+        "prompt_tokens": report["prompt_tokens"],
+        "saved_pct": report["saved_pct"],
+        "files_cut": sum(1 for f in report["files"].values() if "budget" in f),
+        "minify_ms": round(minify_ms, 1),
+        "budget_ms": round(budget_ms, 1),
+        "line_mismatches": check_line_numbers(file_changes, minified) + check_line_numbers(file_changes, budgeted),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["small_pr", "medium_pr", "huge_pr"])
+    parser.add_argument("--radius", type=int, default=CONTEXT_RADIUS)
+    parser.add_argument("--budget", type=int, default=60000)
+    parser.add_argument("--min-file-tokens", type=int, default=MIN_FILE_TOKENS)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = [run_scenario(s, args.radius, args.budget, args.min_file_tokens) for s in args.scenarios]
+    print(f"{'scenario':<12} {'files':>6} {'raw':>9} {'minified':>9} {'prompt':>9} {'saved':>7} {'cut':>5} {'ms':>8} {'bad':>4}")
+    for r in results:
+        print(
+            f"{r['scenario']:<12} {r['files']:>6} {r['raw_tokens']:>9} {r['minified_tokens']:>9} "
+            f"{r['prompt_tokens']:>9} {r['saved_pct']:>6}% {r['files_cut']:>5} {r['budget_ms']:>8} {r['line_mismatches']:>4}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if any(r["line_mismatches"] for r in results):
+        raise SystemExit("Minified diffs moved changed lines")
+
+
+if __name__ == "__main__":
+    main()
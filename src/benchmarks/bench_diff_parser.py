@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: streaming diff parser vs. the previous regex split.
+
+Generates multi-MB synthetic diffs and reports wall time, throughput, peak
+traced memory and the number of files recovered. "regex+cut" is the old
+end-to-end behaviour, where the diff was cut to 5000 chars before splitting.
+Timings are taken under tracemalloc, so absolute numbers are pessimistic.
+
+Usage:
+    python -m src.benchmarks.bench_diff_parser --sizes-mb 1 5 20
+"""
+
+import re
+import time
+import argparse
+import tracemalloc
+
+from src.utils.diff_parser import iter_file_diffs
+
+
+def make_diff(target_bytes: int, lines_per_hunk: int = 40, hunks_per_file: int = 5) -> str:
+    parts = []
+    size = 0
+    file_index = 0
+    while size < target_bytes:
+        name = f"pkg/module_{file_index}.py"
+        chunk = [f"diff --git a/{name} b/{name}\n", f"index 1111111..2222222 100644\n",
+                 f"--- a/{name}\n", f"+++ b/{name}\n"]
+        for h in range(hunks_per_file):
+            start = h * 100 + 1
+            chunk.append(f"@@ -{start},{lines_per_hunk} +{start},{lines_per_hunk} @@ def func_{h}():\n")
+            for i in range(lines_per_hunk):
+                prefix = "+" if i % 7 == 0 else "-" if i % 11 == 0 else " "
+                chunk.append(f"{prefix}    value_{i} = compute(value_{i - 1}, '{name}')\n")
+        text = "".join(chunk)
+        parts.append(text)
+        size += len(text)
+        file_index += 1
+    return "".join(parts)
+
+
+def legacy_extract(full_diff: str):
+    """The regex split previously used by extract_file_changes."""
+    file_pattern = r'diff --git a/(.*?) b/(.*?)\n'
+    file_splits = re.split(file_pattern, full_diff)
+    file_changes = {}
+    for i in range(1, len(file_splits), 3):
+        if i + 2 < len(file_splits):
+            filename = file_splits[i + 1]
+            diff_header = f"diff --git a/{file_splits[i]} b/{filename}" + "\n" + file_splits[i + 2]
+            file_changes[filename] = {"filename": filename, "diff": diff_header.strip()}
+    return file_changes
+
+
+def legacy_extract_truncated(full_diff: str):
+    """The old end-to-end path: fetch_pr_data cut the diff to 5000 chars first."""
+    return legacy_extract(full_diff[:5000])
+
+
+def streaming_extract(full_diff: str, max_file_bytes: int):
+    return {r["filename"]: r for r in iter_file_diffs(full_diff, max_file_bytes=max_file_bytes)}
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--max-file-bytes", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'files':>6} {'impl':>10} {'time (ms)':>10} {'MB/s':>8} {'peak (MB)':>10}")
+    for size_mb in args.sizes_mb:
+        diff = make_diff(int(size_mb * 1024 * 1024))
+        mb = len(diff) / (1024 * 1024)
+        for name, fn, fn_args in (
+            ("regex", legacy_extract, (diff,)),
+            ("regex+cut", legacy_extract_truncated, (diff,)),
+            ("streaming", streaming_extract, (diff, args.max_file_bytes)),
+        ):
+            elapsed, peak, result = measure(fn, *fn_args)
+            print(f"{mb:>7.1f}M {len(result):>6} {name:>10} {elapsed * 1000:>10.1f} "
+                  f"{mb / elapsed:>8.1f} {peak / (1024 * 1024):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
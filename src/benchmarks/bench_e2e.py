@@ -0,0 +1,189 @@
+"""
+Offline end-to-end benchmark of the review workflow and the FastAPI app.
+
+Every scenario replays a recorded MCP cassette (fixtures/cassettes) through
+CassettePool and answers every LLM call with SyntheticChatModel, so the whole
+pipeline runs without GitHub, OpenAI or network access. Each review uses its
+own PR number, so review-level caches do not short-circuit the runs.
+
+Per scenario and mode it reports throughput, latency percentiles, peak traced
+memory, and LLM and MCP calls per review. --output saves the results as JSON;
+--compare checks them against a saved baseline and exits 1 on a regression.
+
+Usage:
+    python -m src.benchmarks.bench_e2e --reviews 20 --concurrency 4
+    python -m src.benchmarks.bench_e2e --output baseline.json
+    python -m src.benchmarks.bench_e2e --compare baseline.json --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from contextlib import redirect_stdout
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import httpx
+
+from src.benchmarks.fake_llm import SyntheticChatModel
+from src.benchmarks.mcp_cassette import CassettePool, fixture_path, load_cassette
+from src.comms.server.rest_api.api import app
+from src.orchestrator.agent_orchestrator import build_initial_state, get_pr_workflow
+from src.orchestrator.batch_review import percentile
+from src.orchestrator.checkpoints import CHECKPOINTS
+from src.tools.github_mcp_tool import set_session_pool
+from src.utils.llm_registry import set_chat_model_factory
+from src.utils.review_log import configure_logging
+from src.utils.review_render import render_review_summary
+
+SCENARIOS = ("small_pr", "medium_pr", "huge_pr")
+MODES = ("workflow", "api")
+# Lower is better for these; throughput is compared the other way round
+COMPARED = ("p95_s", "peak_mb", "llm_calls_per_review", "input_tokens_per_review")
+
+_next_pr_number = 1000
+
+
+async def review_via_workflow(client, number: int):
+    state = build_initial_state("bench", "repo", number)
+    result = await get_pr_workflow().ainvoke(state)
+    # Rendered like the API does, so both modes do the same work
+    if not result.get("pr_data") or not render_review_summary(result):
+        raise RuntimeError("workflow returned no review")
+
+
+async def review_via_api(client: httpx.AsyncClient, number: int):
+    response = await client.post("/review-pr", json={"github_link": f"github.com/bench/repo/pull/{number}"})
+    response.raise_for_status()
+
+
+async def run_scenario(scenario: str, mode: str, args) -> dict:
+    global _next_pr_number
+    pool = CassettePool(load_cassette(fixture_path(scenario)), time_scale=args.mcp_time_scale)
+    model = SyntheticChatModel(
+        model_name="gpt-4o",
+        base_latency_ms=args.llm_latency_ms,
+        ms_per_output_token=args.ms_per_output_token,
+        output_tokens=args.output_tokens,
+    )
+    set_session_pool(pool)
+    set_chat_model_factory(lambda name, temperature: model)
+    review = review_via_workflow if mode == "workflow" else review_via_api
+
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    numbers = range(_next_pr_number, _next_pr_number + args.reviews)
+    _next_pr_number += args.reviews
+
+    async def one(client, number):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await review(client, number)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(repr(e))
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    # Node output is part of the workload but not of the report
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            await asyncio.gather(*(one(client, n) for n in numbers))
+    wall = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else 0
+    if args.tracemalloc:
+        tracemalloc.stop()
+
+    set_session_pool(None)
+    set_chat_model_factory(None)
+    done = max(1, len(latencies))
+    return {
+        "scenario": scenario,
+        "mode": mode,
+        "reviews": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_rps": round(len(latencies) / wall, 3),
+        "p50_s": round(percentile(latencies, 50) or 0, 4),
+        "p95_s": round(percentile(latencies, 95) or 0, 4),
+        "p99_s": round(percentile(latencies, 99) or 0, 4),
+        "peak_mb": round(peak / 1e6, 2),
+        "llm_calls_per_review": round(model.stats["calls"] / done, 2),
+        "input_tokens_per_review": round(model.stats["input_tokens"] / done),
+        "output_tokens_per_review": round(model.stats["output_tokens"] / done),
+        "mcp_calls_per_review": round(pool.calls / done, 2),
+    }
+
+
+def compare(results, baseline, tolerance: float):
+    """Returns human-readable regressions against a baseline run."""
+    previous = {(r["scenario"], r["mode"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["scenario"], result["mode"]))
+        if old is None:
+            continue
+        label = f"{result['scenario']}/{result['mode']}"
+        for key in COMPARED:
+            if old[key] and result[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{label}: {key} {old[key]} -> {result[key]}")
+        if old["throughput_rps"] and result["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput_rps {old['throughput_rps']} -> {result['throughput_rps']}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--reviews", type=int, default=10, help="reviews per scenario and mode")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="fake LLM base latency per call")
+    parser.add_argument("--ms-per-output-token", type=float, default=0.1)
+    parser.add_argument("--output-tokens", type=int, default=200, help="fake LLM output length")
+    parser.add_argument("--mcp-time-scale", type=float, default=0.1, help="multiplier for recorded MCP latencies")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="skip memory tracing (tracing slows every allocation)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from a previous --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    # Review logs are written as usual (on the logging thread) but not shown
+    configure_logging(stream=open(os.devnull, "w"))
+    header = f"{'scenario':<11}{'mode':<10}{'ok':>4}{'err':>4}{'rev/s':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}" \
+             f"{'peak MB':>9}{'llm/rev':>8}{'in tok/rev':>11}{'mcp/rev':>8}"
+    print(header)
+    results = []
+    for scenario in args.scenarios:
+        for mode in args.modes:
+            r = await run_scenario(scenario, mode, args)
+            results.append(r)
+            print(f"{r['scenario']:<11}{r['mode']:<10}{r['reviews']:>4}{r['errors']:>4}{r['throughput_rps']:>8.2f}"
+                  f"{r['p50_s']:>8.3f}{r['p95_s']:>8.3f}{r['p99_s']:>8.3f}{r['peak_mb']:>9.1f}"
+                  f"{r['llm_calls_per_review']:>8.1f}{r['input_tokens_per_review']:>11}{r['mcp_calls_per_review']:>8.1f}")
+            if r["first_error"]:
+                print(f"  first error: {r['first_error']}")
+    await CHECKPOINTS.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+Benchmark: event-loop lag of concurrent reviews under each logging mode.
+
+Runs --reviews offline reviews (recorded MCP cassette, SyntheticChatModel)
+with --concurrency in flight while a monitor task sleeps --interval-ms at a
+time and records how late it wakes up. The log sink is a pipe drained by a
+thread at --sink-kbps, like a terminal or a log shipper that falls behind.
+
+Modes:
+    sync        DEBUG records formatted and written on the event loop thread,
+                which is what the per-node colored prints used to do
+    queue       the same DEBUG records through the QueueListener thread
+    queue-info  the default: INFO records through the QueueListener thread
+
+Usage:
+    python -m src.benchmarks.bench_event_loop_lag --reviews 50 --concurrency 50 --sink-kbps 48
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+from typing import Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.benchmarks.fake_llm import SyntheticChatModel
+from src.benchmarks.mcp_cassette import CassettePool, fixture_path, load_cassette
+from src.orchestrator.agent_orchestrator import build_initial_state, get_pr_workflow
+from src.orchestrator.batch_review import percentile
+from src.tools.github_mcp_tool import set_session_pool
+from src.utils.llm_cache import set_cache_bypass
+from src.utils.llm_registry import set_chat_model_factory
+from src.utils.review_log import bind_review, configure_logging, shutdown_logging
+from src.utils.review_render import render_review_summary
+
+MODES = {
+    "sync": {"level": "DEBUG", "use_queue": False},
+    "queue": {"level": "DEBUG", "use_queue": True},
+    "queue-info": {"level": "INFO", "use_queue": True},
+}
+
+
+class ThrottledSink:
+    """Write end of a pipe whose read end is drained at a fixed rate, so writers block when it fills."""
+
+    def __init__(self, kbps: float):
+        read_fd, write_fd = os.pipe()
+        self.stream = os.fdopen(write_fd, "w", buffering=1)
+        self.bytes = 0
+        self._reader = threading.Thread(target=self._drain, args=(read_fd, kbps * 1024), daemon=True)
+        self._reader.start()
+
+    def _drain(self, fd: int, rate: float):
+        while True:
+            data = os.read(fd, 4096)
+            if not data:
+                break
+            self.bytes += len(data)
+            if rate > 0:
+                time.sleep(len(data) / rate)
+        os.close(fd)
+
+    def close(self):
+        self.stream.close()
+        self._reader.join()
+
+
+async def monitor_lag(interval: float, lags: List[float], stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def run_mode(mode: str, first_number: int, args) -> Dict:
+    sink = ThrottledSink(args.sink_kbps)
+    configure_logging(fmt="console", stream=sink.stream, **MODES[mode])
+
+    lags, latencies, errors = [], [], []
+    stop = asyncio.Event()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(number: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                with bind_review(pr=f"bench/repo#{number}"):
+                    result = await get_pr_workflow().ainvoke(build_initial_state("bench", "repo", number))
+                    render_review_summary(result)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(repr(e))
+
+    monitor = asyncio.create_task(monitor_lag(args.interval_ms / 1000, lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(first_number + i) for i in range(args.reviews)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    # Whatever is still queued is written after the reviews finished
+    started = time.perf_counter()
+    shutdown_logging()
+    sink.close()
+    flush = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "reviews": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "lag_p50_ms": round(percentile(lags, 50) or 0, 2),
+        "lag_p99_ms": round(percentile(lags, 99) or 0, 2),
+        "lag_max_ms": round(max(lags, default=0), 2),
+        "wall_s": round(wall, 3),
+        "review_p50_s": round(percentile(latencies, 50) or 0, 3),
+        "review_p95_s": round(percentile(latencies, 95) or 0, 3),
+        "flush_s": round(flush, 3),
+        "log_kb": round(sink.bytes / 1024, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="medium_pr")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--reviews", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval-ms", type=float, default=5, help="lag monitor sleep interval")
+    parser.add_argument("--sink-kbps", type=float, default=48, help="log sink drain rate; 0 is unthrottled")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="fake LLM base latency per call")
+    parser.add_argument("--output-tokens", type=int, default=200, help="fake LLM output length")
+    parser.add_argument("--mcp-time-scale", type=float, default=0.1, help="multiplier for recorded MCP latencies")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    pool = CassettePool(load_cassette(fixture_path(args.scenario)), time_scale=args.mcp_time_scale)
+    model = SyntheticChatModel(
+        model_name="gpt-4o",
+        base_latency_ms=args.llm_latency_ms,
+        ms_per_output_token=0.1,
+        output_tokens=args.output_tokens,
+    )
+    set_session_pool(pool)
+    set_chat_model_factory(lambda name, temperature: model)
+    # Every mode does the same LLM work instead of replaying the previous mode's answers
+    set_cache_bypass(True)
+
+    results = []
+    print(f"{'mode':<12}{'ok':>4}{'err':>4}{'lag p50':>9}{'lag p99':>9}{'lag max':>9}{'wall s':>8}{'p95 s':>8}{'flush s':>9}{'log KB':>9}")
+    for i, mode in enumerate(args.modes):
+        r = await run_mode(mode, 1000 + i * args.reviews, args)
+        results.append(r)
+        print(f"{r['mode']:<12}{r['reviews']:>4}{r['errors']:>4}{r['lag_p50_ms']:>9.2f}{r['lag_p99_ms']:>9.2f}"
+              f"{r['lag_max_ms']:>9.2f}{r['wall_s']:>8.2f}{r['review_p95_s']:>8.2f}{r['flush_s']:>9.2f}{r['log_kb']:>9.1f}")
+        if r["first_error"]:
+            print(f"  first error: {r['first_error']}")
+    set_session_pool(None)
+    set_chat_model_factory(None)
+    configure_logging()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Benchmark: model routing on vs. off.
+
+Runs offline reviews of a cassette (see bench_e2e) with two synthetic chat
+models standing in for the tiers of MODEL_ROUTING: the cheap one answers
+fast, the strong one slowly. Per variant it reports review latency, calls
+per model, cost at METRICS.model_prices, and escalations.
+
+- off:        routing disabled, every call on the stages' default tier
+- on:         per-file and per-stage routing
+- budget:     routing with --max-cost-usd as the per-review budget
+- malformed:  routing with --malformed-rate of the cheap model's answers
+              unparseable, so those calls escalate
+
+Usage:
+    python -m src.benchmarks.bench_model_routing --scenario medium_pr --reviews 8
+"""
+
+import os
+import asyncio
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.benchmarks.fake_llm import SyntheticChatModel
+from src.benchmarks.mcp_cassette import CassettePool, fixture_path, load_cassette
+from src.orchestrator.agent_orchestrator import build_initial_state, get_pr_workflow
+from src.orchestrator.batch_review import percentile
+from src.orchestrator.checkpoints import CHECKPOINTS
+from src.tools.github_mcp_tool import set_session_pool
+from src.utils.llm_cache import set_cache_bypass
+from src.utils.llm_registry import set_chat_model_factory
+from src.utils.metrics import estimate_cost
+from src.utils.model_router import ROUTER, set_routing_budget
+from src.utils.review_log import configure_logging
+
+VARIANTS = ("off", "on", "budget", "malformed")
+
+_next_pr_number = 5000
+
+
+def make_models(args, malformed_rate: float):
+    """One synthetic model per tier, the cheapest fastest, each slower by --slowdown."""
+    models = {}
+    for i, tier in enumerate(ROUTER.order):
+        factor = args.slowdown ** i
+        models[ROUTER.model(tier)] = SyntheticChatModel(
+            model_name=ROUTER.model(tier),
+            base_latency_ms=args.llm_latency_ms * factor,
+            ms_per_output_token=args.ms_per_output_token * factor,
+            malformed_rate=malformed_rate if i == 0 else 0.0,
+        )
+    return models
+
+
+async def run_variant(variant: str, args) -> dict:
+    global _next_pr_number
+    models = make_models(args, args.malformed_rate if variant == "malformed" else 0.0)
+    set_session_pool(CassettePool(load_cassette(fixture_path(args.scenario)), time_scale=args.mcp_time_scale))
+    set_chat_model_factory(lambda name, temperature: models[name])
+    ROUTER.enabled = variant != "off"
+    ROUTER.routes, ROUTER.escalations = {}, {}
+    # Every call reaches a model; each review gets its own PR number so review-level caches miss
+    set_cache_bypass(True)
+    set_routing_budget(max_cost_usd=args.max_cost_usd if variant == "budget" else None)
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    numbers = range(_next_pr_number, _next_pr_number + args.reviews)
+    _next_pr_number += args.reviews
+
+    async def one(number):
+        async with semaphore:
+            started = asyncio.get_running_loop().time()
+            await get_pr_workflow().ainvoke(build_initial_state("bench", "repo", number))
+            latencies.append(asyncio.get_running_loop().time() - started)
+
+    await asyncio.gather(*(one(n) for n in numbers))
+    set_session_pool(None)
+    set_chat_model_factory(None)
+    ROUTER.enabled = True
+
+    cost = sum(estimate_cost(name, m.stats["input_tokens"], m.stats["output_tokens"]) for name, m in models.items())
+    return {
+        "variant": variant,
+        "p50_s": percentile(latencies, 50) or 0,
+        "p95_s": percentile(latencies, 95) or 0,
+        "calls": {name: m.stats["calls"] / args.reviews for name, m in models.items()},
+        "cost_usd": cost / args.reviews,
+        "escalations": sum(ROUTER.escalations.values()) / args.reviews,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="medium_pr")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=VARIANTS)
+    parser.add_argument("--reviews", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=100, help="cheap model base latency per call")
+    parser.add_argument("--ms-per-output-token", type=float, default=0.2)
+    parser.add_argument("--slowdown", type=float, default=3.0, help="latency multiplier per stronger tier")
+    parser.add_argument("--max-cost-usd", type=float, default=0.05, help="review budget of the 'budget' variant")
+    parser.add_argument("--malformed-rate", type=float, default=0.3)
+    parser.add_argument("--mcp-time-scale", type=float, default=0.1)
+    args = parser.parse_args()
+
+    configure_logging(stream=open(os.devnull, "w"))
+    names = [ROUTER.model(tier) for tier in ROUTER.order]
+    print(f"{args.scenario}, {args.reviews} reviews per variant, tiers {' < '.join(names)}")
+    print(f"{'variant':<11}{'p50 s':>8}{'p95 s':>8}" + "".join(f"{name + '/rev':>16}" for name in names)
+          + f"{'USD/rev':>10}{'escal/rev':>11}")
+    for variant in args.variants:
+        r = await run_variant(variant, args)
+        print(f"{r['variant']:<11}{r['p50_s']:>8.3f}{r['p95_s']:>8.3f}"
+              + "".join(f"{r['calls'][name]:>16.1f}" for name in names)
+              + f"{r['cost_usd']:>10.4f}{r['escalations']:>11.1f}")
+    await CHECKPOINTS.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Benchmark: publishing review comments as one GitHub review vs. one call per comment.
+
+Generates N review comments against a cassette's diff (most on changed
+lines, some outside the diff, some repeated, some without a line) and
+publishes them through publish_review() to fake review tools with
+GitHub-like latency, behind the real rate limiter: one read of the PR's
+existing reviews, then one create-review call. "per_comment" posts every
+comment that survives the same filtering with its own call, as a
+comment-at-a-time publisher would. Reports GitHub calls, wall time and what
+was posted or dropped.
+
+Usage:
+    python -m src.benchmarks.bench_publish --comments 10 100 400
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.benchmarks.mcp_cassette import fixture_path, load_cassette
+from src.orchestrator.review_publisher import build_review, publish_review
+from src.tools import github_mcp_tool
+from src.tools.github_mcp_tool import set_session_pool
+from src.utils.diff_parser import new_line_positions, parse_diff
+from src.utils.review_log import configure_logging
+
+MODES = ("single_review", "per_comment")
+
+
+class FakeGitHubTool:
+    def __init__(self, latency_ms: float, calls: list, result):
+        self.latency_ms = latency_ms
+        self.calls = calls
+        self.result = result
+
+    async def ainvoke(self, args):
+        self.calls.append(args)
+        await asyncio.sleep(self.latency_ms / 1000)
+        return json.dumps(self.result)
+
+
+class FakeReviewPool:
+    def __init__(self, latency_ms: float):
+        self.calls = []
+        review = {"id": 1, "html_url": "https://github.com/bench/repo/pull/1#pullrequestreview-1"}
+        self.tools = {
+            github_mcp_tool.REVIEW_TOOL: FakeGitHubTool(latency_ms, self.calls, review),
+            github_mcp_tool.REVIEWS_TOOL: FakeGitHubTool(latency_ms, self.calls, []),
+        }
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self.tools
+
+
+def synth_comments(files: dict, count: int, seed: int = 5):
+    """Comments on diff lines, plus 10% outside the diff, 10% repeats and 5% without a line."""
+    rng = random.Random(seed)
+    lines = [(name, line) for name, record in files.items() for line in new_line_positions(record["hunks"])]
+    comments = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.1 and comments:
+            comments.append(dict(rng.choice(comments)))
+            continue
+        path, line = rng.choice(lines)
+        if roll < 0.2:
+            line += 100000
+        comments.append({
+            "content": f"Consider handling the error path here ({i}).",
+            "file_path": path,
+            "line_number": None if roll > 0.95 else line,
+            "comment_type": rng.choice(["issue", "suggestion", "question"]),
+            "severity": rng.choice(["major", "minor", "trivial"]),
+        })
+    return comments
+
+
+def make_state(number: int, files: dict, comments):
+    return {
+        "repo_owner": "bench", "repo_name": "repo", "pr_number": number,
+        "pr_data": {"pr_head_sha": f"{number:040x}"},
+        "file_changes": files,
+        "comments": comments,
+        "merge_decision": "NO, do not merge. Two error paths are unhandled. Risk level: MEDIUM.",
+    }
+
+
+async def run(mode: str, number: int, files: dict, comments, latency_ms: float) -> dict:
+    pool = FakeReviewPool(latency_ms)
+    set_session_pool(pool)
+    started = time.perf_counter()
+    if mode == "single_review":
+        publication = await publish_review(make_state(number, files, comments))
+        posted, dropped = publication["inline_comments"], publication["dropped"]
+    else:
+        review = build_review(files, comments, "do_not_merge", None)
+        for comment in review["comments"]:
+            await github_mcp_tool.create_pr_review("bench", "repo", number, body="", event="COMMENT", comments=[comment])
+        posted, dropped = len(review["comments"]), review["dropped"]
+    wall = time.perf_counter() - started
+    set_session_pool(None)
+    return {"calls": len(pool.calls), "wall_s": wall, "posted": posted, **dropped}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="medium_pr")
+    parser.add_argument("--comments", type=int, nargs="+", default=[10, 100, 400])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--latency-ms", type=float, default=150, help="fake GitHub latency per call")
+    args = parser.parse_args()
+
+    configure_logging(stream=open(os.devnull, "w"))
+    cassette = load_cassette(fixture_path(args.scenario))
+    files = parse_diff(next(i["result"] for i in cassette["interactions"] if i["tool"] == "get_pull_request_diff"))
+    print(f"{args.scenario}, GitHub latency {args.latency_ms:.0f} ms, rate limit "
+          f"{github_mcp_tool.RATE_LIMITER.requests_per_second}/s")
+    print(f"{'comments':>9}{'mode':>15}{'calls':>7}{'wall s':>9}{'posted':>8}{'outside':>9}{'dupes':>7}{'over cap':>10}")
+    number = 1
+    for count in args.comments:
+        comments = synth_comments(files, count)
+        for mode in args.modes:
+            r = await run(mode, number, files, comments, args.latency_ms)
+            number += 1
+            print(f"{count:>9}{mode:>15}{r['calls']:>7}{r['wall_s']:>9.2f}{r['posted']:>8}"
+                  f"{r['outside_diff']:>9}{r['duplicate']:>7}{r['over_limit']:>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark: GitHub rate-limit handling and PR revalidation.
+
+Starts the fake github-mcp-server from fake_github_mcp.py (which enforces a
+primary and a secondary rate limit), then fetches many PRs concurrently
+through a real MCPSessionPool twice: once with a limiter that gives up on the
+first rate-limit error and once with the configured limiter. A second round
+over the same PRs shows how many listings are served by revalidation.
+
+Usage:
+    python -m src.benchmarks.bench_rate_limiter --prs 40 --concurrency 16
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+from src.tools import github_mcp_tool
+from src.tools.github_mcp_tool import fetch_pr_data, set_session_pool
+from src.tools.github_rate_limiter import GitHubRateLimiter
+from src.tools.mcp_session_pool import MCPSessionPool
+from src.tools.pr_resource_cache import PRResourceCache
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_github_mcp.py")
+
+
+async def fetch_all(prs: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = partial = 0
+
+    async def fetch(number):
+        nonlocal failed, partial
+        async with semaphore:
+            try:
+                pr_data = await fetch_pr_data("bench", "repo", number)
+                if pr_data.get("fetch_errors"):
+                    partial += 1
+            except Exception:
+                failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(fetch(n) for n in range(1, prs + 1)))
+    return time.perf_counter() - started, failed, partial
+
+
+async def run_case(label: str, limiter: GitHubRateLimiter, args):
+    env = {
+        **os.environ,
+        "FAKE_GH_PRIMARY_LIMIT": str(args.primary_limit),
+        "FAKE_GH_SECONDARY_CONCURRENCY": str(args.secondary_concurrency),
+    }
+    pool = MCPSessionPool(
+        {"transport": "stdio", "command": sys.executable, "args": [FAKE_SERVER], "env": env},
+        size=args.pool_size,
+    )
+    await pool.start()
+    set_session_pool(pool)
+    github_mcp_tool.RATE_LIMITER = limiter
+    # details_ttl 0 forces every revalidation to spend one details call
+    github_mcp_tool.PR_CACHE = PRResourceCache(details_ttl_seconds=0)
+    try:
+        for round_name in ("cold", "warm"):
+            elapsed, failed, partial = await fetch_all(args.prs, args.concurrency)
+            print(f"{label:<12} {round_name:<5} {elapsed:8.2f}s  complete={args.prs - failed - partial:<4} "
+                  f"partial={partial:<4} failed={failed:<4} {limiter.stats()} {github_mcp_tool.PR_CACHE.stats()}")
+    finally:
+        set_session_pool(None)
+        await pool.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prs", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    # Each pooled session is its own fake server process with its own limits,
+    # so one session models the single shared quota of a real token
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--primary-limit", type=int, default=60, help="fake server calls per second")
+    parser.add_argument("--secondary-concurrency", type=int, default=8, help="fake server max in-flight calls")
+    args = parser.parse_args()
+
+    await run_case("no-retry", GitHubRateLimiter(requests_per_second=1000, burst=1000, max_retries=0), args)
+    await run_case("limited", GitHubRateLimiter(requests_per_second=args.primary_limit, burst=args.secondary_concurrency,
+                                                base_backoff=0.1, max_backoff=2), args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
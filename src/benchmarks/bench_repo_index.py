@@ -0,0 +1,121 @@
+"""
+Benchmark: repository index build time, incremental updates and query latency.
+
+Builds the index of a local git checkout from scratch at --base-rev,
+updates it incrementally to HEAD, reloads the persisted snapshot, then
+times related_context() on pseudo-hunks cut from random Python files of the
+tree (definition lookup plus BM25 top-up, including the git reads).
+
+Usage:
+    python -m src.benchmarks.bench_repo_index --repo ~/src/cpython --base-rev HEAD~20 --queries 300
+"""
+
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+from typing import Dict, List
+
+from src.utils.repo_index import GitCheckout, RepoIndexStore, related_context
+from src.utils.tokens import count_tokens
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100)))]
+
+
+def pseudo_hunk(rng: random.Random, path: str, text: str, lines: int) -> Dict:
+    """A fake change adding `lines` lines of an existing file, as the analyzer would see it."""
+    source = text.split("\n")
+    start = rng.randrange(max(1, len(source) - lines))
+    body = source[start:start + lines]
+    diff = f"@@ -{start + 1},0 +{start + 1},{len(body)} @@\n" + "\n".join("+" + line for line in body)
+    return {"filename": path, "diff": diff, "hunks": [{"new_start": start + 1, "new_count": len(body)}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", required=True, help="path of a local git checkout")
+    parser.add_argument("--base-rev", default="HEAD~10", help="revision of the full build; HEAD skips the incremental step")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--hunk-lines", type=int, default=20)
+    parser.add_argument("--chunk-lines", type=int, default=40)
+    parser.add_argument("--max-definitions", type=int, default=5)
+    parser.add_argument("--max-context-tokens", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    checkout = GitCheckout(os.path.expanduser(args.repo))
+    base_sha, head_sha = checkout.resolve(args.base_rev), checkout.resolve("HEAD")
+    if head_sha is None:
+        raise SystemExit(f"{args.repo} is not a git checkout with commits")
+    base_sha = base_sha or head_sha
+    cache_dir = tempfile.mkdtemp(prefix="repo_index_bench_")
+    results = {"repo": args.repo, "base": base_sha[:12], "head": head_sha[:12]}
+    try:
+        store = RepoIndexStore({"bench/repo": checkout.path}, cache_dir=cache_dir, ref=base_sha, chunk_lines=args.chunk_lines)
+        started = time.perf_counter()
+        index = store.base_index("bench/repo")
+        results["full_build_seconds"] = round(time.perf_counter() - started, 3)
+        results["files"] = len(index.files)
+        results["symbols"] = sum(len(v) for v in index.symbols.values())
+        results["chunks"] = len(index.doc_lengths)
+        results["terms"] = len(index.postings)
+
+        if head_sha != base_sha:
+            store.ref = head_sha
+            before = store.files_indexed
+            started = time.perf_counter()
+            store.base_index("bench/repo")
+            results["incremental_seconds"] = round(time.perf_counter() - started, 3)
+            results["incremental_files"] = store.files_indexed - before
+
+        snapshot_dir = os.path.join(cache_dir, "bench__repo")
+        results["snapshot_mb"] = round(sum(
+            os.path.getsize(os.path.join(snapshot_dir, f)) for f in os.listdir(snapshot_dir)
+        ) / 1e6, 2)
+        started = time.perf_counter()
+        fresh = RepoIndexStore({"bench/repo": checkout.path}, cache_dir=cache_dir, ref=head_sha, chunk_lines=args.chunk_lines)
+        fresh.base_index("bench/repo")
+        results["snapshot_load_seconds"] = round(time.perf_counter() - started, 3)
+
+        view = store.view("bench", "repo")
+        rng = random.Random(args.seed)
+        python_files = sorted(p for p in view.base.files if p.endswith(".py"))
+        sample = [rng.choice(python_files) for _ in range(args.queries)]
+        texts = checkout.read_blobs(view.base.files[p]["blob"] for p in set(sample))
+        latencies, definitions, tokens, empty = [], [], [], 0
+        for path in sample:
+            change = pseudo_hunk(rng, path, texts[view.base.files[path]["blob"]], args.hunk_lines)
+            started = time.perf_counter()
+            context = related_context(view, change, args.max_definitions, args.max_context_tokens)
+            latencies.append((time.perf_counter() - started) * 1000)
+            definitions.append(context.count("\n# "))
+            tokens.append(count_tokens(context))
+            empty += not context
+        results["query_ms"] = {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+        }
+        results["context_items_per_query"] = round(statistics.mean(definitions), 2)
+        results["context_tokens_per_query"] = round(statistics.mean(tokens), 1)
+        results["queries_without_context"] = empty
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
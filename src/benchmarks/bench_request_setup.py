@@ -0,0 +1,75 @@
+"""
+Benchmark: per-request setup overhead removed by the process-wide registry.
+
+Compares what every /review-pr request used to build (compile the LangGraph
+workflow, one ChatPromptTemplate and one ChatOpenAI client per analyzed file
+plus the reviewer) with looking the same objects up in the registry. No
+network calls are made.
+
+Usage:
+    python -m src.benchmarks.bench_request_setup --requests 200 --files 5
+"""
+
+import os
+import time
+import argparse
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+from src.agents.code_analyzer_agent.code_analyzer import ANALYZE_CHANGES_PROMPT
+from src.agents.pr_reviewer_agent.pr_reviewer import GENERATE_COMMENTS_PROMPT
+from src.orchestrator.agent_orchestrator import create_pr_workflow, get_pr_workflow
+from src.utils.llm_registry import get_chat_model, get_prompt_template
+
+
+def per_request_setup(files: int):
+    create_pr_workflow()
+    for _ in range(files):
+        ChatPromptTemplate.from_template(ANALYZE_CHANGES_PROMPT)
+        ChatOpenAI(model="gpt-4o", temperature=0)
+    ChatPromptTemplate.from_template(GENERATE_COMMENTS_PROMPT)
+    ChatOpenAI(model="gpt-4o", temperature=0.2)
+
+
+def registry_setup(files: int):
+    get_pr_workflow()
+    for _ in range(files):
+        get_prompt_template("analyze_changes", ANALYZE_CHANGES_PROMPT)
+        get_chat_model("gpt-4o", temperature=0)
+    get_prompt_template("generate_comments", GENERATE_COMMENTS_PROMPT)
+    get_chat_model("gpt-4o", temperature=0.2)
+
+
+def run(fn, requests: int, files: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn(files)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--files", type=int, default=5, help="Analyzed files per simulated PR")
+    args = parser.parse_args()
+
+    registry_setup(args.files)  # warm the registry, as the API lifespan does
+    print(f"{'mode':>12} {'mean (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for name, fn in (("per-request", per_request_setup), ("registry", registry_setup)):
+        stats = run(fn, args.requests, args.files)
+        print(f"{name:>12} {stats['mean']:>10.3f} {stats['p50']:>10.3f} {stats['p95']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Fake github-mcp-server (stdio) that enforces GitHub-style rate limits.
+
+Primary limit: at most PRIMARY_LIMIT calls per PRIMARY_WINDOW seconds, after
+which calls fail with go-github's "API rate limit ... exceeded ... [rate reset
+in Xs]" message. Secondary limit: more than SECONDARY_CONCURRENCY calls in
+flight fail with a "secondary rate limit ... retry after Ns" message.
+
+Used by bench_rate_limiter; not meant to be run by hand.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+
+from mcp.server.fastmcp import FastMCP
+
+PRIMARY_LIMIT = int(os.environ.get("FAKE_GH_PRIMARY_LIMIT", "60"))
+PRIMARY_WINDOW = float(os.environ.get("FAKE_GH_PRIMARY_WINDOW", "1.0"))
+SECONDARY_CONCURRENCY = int(os.environ.get("FAKE_GH_SECONDARY_CONCURRENCY", "8"))
+LATENCY = float(os.environ.get("FAKE_GH_LATENCY", "0.02"))
+FILES_PER_PR = int(os.environ.get("FAKE_GH_FILES", "5"))
+
+server = FastMCP("github", log_level="WARNING")
+state = {"window_start": time.monotonic(), "calls": 0, "in_flight": 0, "served": 0, "limited": 0}
+
+
+async def limited(handler):
+    now = time.monotonic()
+    if now - state["window_start"] >= PRIMARY_WINDOW:
+        state["window_start"], state["calls"] = now, 0
+    state["calls"] += 1
+    if state["calls"] > PRIMARY_LIMIT:
+        state["limited"] += 1
+        reset = PRIMARY_WINDOW - (now - state["window_start"])
+        return (f"failed to call GitHub: 403 API rate limit of {PRIMARY_LIMIT} still exceeded, "
+                f"not making remote request. [rate reset in {reset:.3f}s]")
+    if state["in_flight"] >= SECONDARY_CONCURRENCY:
+        state["limited"] += 1
+        return "failed to call GitHub: 403 You have exceeded a secondary rate limit. retry after 0.2s"
+    state["in_flight"] += 1
+    try:
+        await asyncio.sleep(LATENCY)
+        state["served"] += 1
+        return handler()
+    finally:
+        state["in_flight"] -= 1
+
+
+def pr_details(number):
+    return {
+        "number": number, "title": f"PR {number}", "state": "open",
+        "user": {"login": "bench"}, "head": {"sha": f"sha-{number}"},
+        "updated_at": "2024-01-01T00:00:00Z", "changed_files": FILES_PER_PR, "commits": 1,
+    }
+
+
+def pr_diff(number):
+    return "".join(
+        f"diff --git a/f{i}.py b/f{i}.py\n--- a/f{i}.py\n+++ b/f{i}.py\n@@ -1,1 +1,2 @@\n x\n+y{number}\n"
+        for i in range(FILES_PER_PR)
+    )
+
+
+@server.tool()
+async def get_pull_request(owner: str, repo: str, pullNumber: int, state: str = "open") -> str:
+    return await limited(lambda: json.dumps(pr_details(pullNumber)))
+
+
+@server.tool()
+async def get_pull_request_files(owner: str, repo: str, pullNumber: int, state: str = "open", page: int = 1, perPage: int = 30) -> str:
+    files = [{"filename": f"f{i}.py", "status": "modified", "additions": 1, "deletions": 0} for i in range(FILES_PER_PR)]
+    return await limited(lambda: json.dumps(files[(page - 1) * perPage:page * perPage]))
+
+
+@server.tool()
+async def get_pull_request_diff(owner: str, repo: str, pullNumber: int, state: str = "open") -> str:
+    return await limited(lambda: pr_diff(pullNumber))
+
+
+@server.tool()
+async def list_commits(owner: str, repo: str, pullNumber: int = 0, state: str = "open", page: int = 1, perPage: int = 30) -> str:
+    commits = [{"sha": f"sha-{pullNumber}", "commit": {"message": "bench", "author": {"name": "bench"}}}]
+    return await limited(lambda: json.dumps(commits if page == 1 else []))
+
+
+@server.tool()
+async def get_server_stats() -> str:
+    return json.dumps({k: v for k, v in state.items() if k != "window_start"})
+
+
+if __name__ == "__main__":
+    server.run()
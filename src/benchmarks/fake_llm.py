@@ -0,0 +1,210 @@
+"""
+Fake chat models for offline benchmarks.
+
+- ReplayChatModel returns recorded AIMessages in order (text or tool calls),
+  sleeping for each response's recorded latency.
+- SyntheticChatModel answers every prompt deterministically, shaped like the
+  real agents expect (analysis markdown, a JSON array of review comments, or
+  a tool call when tools are bound), with configurable latency and length.
+
+Both count input tokens of what was actually sent with tiktoken, so
+prompt-size changes show up in the numbers without calling a provider, and
+report usage the same way ChatOpenAI does so callbacks and metrics see it.
+Asked to stream, they emit the content in small chunks over the latency.
+"""
+
+import json
+import time
+import zlib
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.utils.tokens import count_tokens
+
+
+def message_tokens(message: BaseMessage) -> int:
+    # Roughly OpenAI's chat accounting: content, tool calls and a small per-message overhead
+    tokens = 4 + count_tokens(message.content if isinstance(message.content, str) else str(message.content))
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(call["name"]) + count_tokens(str(call["args"]))
+    return tokens
+
+
+class _FakeChatModel(BaseChatModel):
+    model_name: str = "fake"
+    time_scale: float = 1.0
+    stats: Dict[str, float] = {}
+
+    def model_post_init(self, __context: Any) -> None:
+        self.stats = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "latency_s": 0.0}
+
+    def _respond(self, messages: List[BaseMessage]):
+        """Returns (content, tool_calls, latency_ms) for the next call."""
+        raise NotImplementedError
+
+    def _message(self, messages: List[BaseMessage]):
+        content, tool_calls, latency_ms = self._respond(messages)
+        self.stats["calls"] += 1
+        message = AIMessage(
+            content=content,
+            tool_calls=[
+                {"name": call["name"], "args": call["args"], "id": f"call_{self.stats['calls']}_{i}", "type": "tool_call"}
+                for i, call in enumerate(tool_calls)
+            ],
+            response_metadata={"model_name": self.model_name},
+        )
+        input_tokens = sum(message_tokens(m) for m in messages)
+        output_tokens = message_tokens(message)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        self.stats["input_tokens"] += input_tokens
+        self.stats["output_tokens"] += output_tokens
+        delay = latency_ms / 1000 * self.time_scale
+        self.stats["latency_s"] += delay
+        result = ChatResult(generations=[ChatGeneration(message=message)], llm_output={"model_name": self.model_name})
+        return result, delay
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        result, delay = self._message(messages)
+        time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        result, delay = self._message(messages)
+        await asyncio.sleep(delay)
+        return result
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        # Used when the caller asks for streaming: the content arrives in ~4 character
+        # pieces spread over the latency, then a final chunk with tool calls and usage
+        result, delay = self._message(messages)
+        message = result.generations[0].message
+        pieces = [message.content[i:i + 4] for i in range(0, len(message.content), 4)]
+        for piece in pieces:
+            await asyncio.sleep(delay / len(pieces))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        if not pieces:
+            await asyncio.sleep(delay)
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+            response_metadata=message.response_metadata,
+        ))
+
+
+class ReplayChatModel(_FakeChatModel):
+    """
+    Each response is {"content": str} or {"tool_calls": [{"name", "args"}]},
+    optionally with "latency_ms". Responses are replayed in a cycle.
+    """
+
+    responses: List[Dict[str, Any]]
+    model_name: str = "replay"
+    index: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool schemas are not sent anywhere; the recorded response decides the tool call
+        return self
+
+    def _respond(self, messages):
+        response = self.responses[self.index % len(self.responses)]
+        self.index += 1
+        return response.get("content", ""), response.get("tool_calls", []), response.get("latency_ms", 0)
+
+
+FILLER = (
+    "the change updates handling of edge cases in this module and keeps the public "
+    "interface stable while callers should verify error paths and add tests for boundary values"
+).split()
+
+COMMENT_TYPES = ("suggestion", "issue", "praise", "question")
+
+TOOL_ARGS = {
+    "MergeDecision": {"verdict": "merge", "risk": "low", "rationale": "Synthetic decision."},
+    "merge_decision_tool": {"code_analysis": "No issues found.", "review_comments": "Looks good."},
+}
+
+
+class SyntheticChatModel(_FakeChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI. Latency is
+    base_latency_ms + ms_per_input_token * input + ms_per_output_token * output_tokens.
+    A malformed_rate share of prompts (chosen by a hash of the prompt, so
+    reruns agree) gets a rambling answer without headings, JSON or tool call.
+    A prompt longer than context_tokens (0: unlimited) is rejected like
+    OpenAI rejects it.
+    """
+
+    model_name: str = "synthetic"
+    base_latency_ms: float = 300.0
+    ms_per_input_token: float = 0.0
+    ms_per_output_token: float = 10.0
+    output_tokens: int = 200
+    malformed_rate: float = 0.0
+    context_tokens: int = 0
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "synthetic"
+
+    def bind_tools(self, tools, **kwargs):
+        # Copies share the stats dict, so calls made through bound models are counted too
+        bound = self.model_copy(update={"tool_names": [convert_to_openai_tool(t)["function"]["name"] for t in tools]})
+        bound.stats = self.stats
+        return bound
+
+    def _filler(self, words: int, offset: int = 0) -> str:
+        return " ".join(FILLER[(offset + i) % len(FILLER)] for i in range(words))
+
+    def _respond(self, messages):
+        prompt = "\n".join(m.content for m in messages if isinstance(m.content, str))
+        prompt_tokens = count_tokens(prompt)
+        if self.context_tokens and prompt_tokens > self.context_tokens:
+            raise ValueError(
+                f"context_length_exceeded: {prompt_tokens} tokens requested, the model's context is {self.context_tokens}"
+            )
+        latency_ms = self.base_latency_ms + self.ms_per_input_token * prompt_tokens
+        latency_ms += self.ms_per_output_token * self.output_tokens
+
+        if zlib.crc32(prompt.encode()) % 1000 < self.malformed_rate * 1000:
+            return f"Sure! {self._filler(30, 3)}", [], latency_ms
+        if self.tool_names and not isinstance(messages[-1], ToolMessage):
+            name = self.tool_names[0]
+            return "", [{"name": name, "args": TOOL_ARGS.get(name, {})}], latency_ms
+        if isinstance(messages[-1], ToolMessage):
+            return f"YES, it is safe to merge. {self._filler(20)}", [], latency_ms
+        if "JSON array of comment objects" in prompt:
+            count = max(1, self.output_tokens // 60)
+            comments = [{
+                "content": self._filler(40, i),
+                "file_path": None,
+                "line_number": None,
+                "comment_type": COMMENT_TYPES[i % len(COMMENT_TYPES)],
+                "severity": "minor",
+            } for i in range(count)]
+            return json.dumps(comments), [], latency_ms
+        words = max(1, self.output_tokens - 20)
+        return (
+            f"## Summary of Changes\n{self._filler(words // 2)}\n\n"
+            f"## Code Quality Issues\nNo issues found.\n\n"
+            f"## Recommendations\n{self._filler(words - words // 2, 7)}"
+        ), [], latency_ms
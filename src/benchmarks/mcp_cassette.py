@@ -0,0 +1,250 @@
+"""
+Record/replay stand-in for the github-mcp-server tools.
+
+A cassette is a JSON file (optionally gzipped) holding the tool calls made
+while fetching one PR: {"name", "interactions": [{"tool", "args", "result",
+"latency_ms"}]}. CassettePool can be installed with set_session_pool() in
+place of an MCPSessionPool; its tools answer from the cassette, matching on
+the tool name and the page number, so one recording can serve any owner/repo/PR
+number and page size.
+
+Usage:
+    # Record the MCP traffic of one real PR (needs github-mcp-server and a token)
+    python -m src.benchmarks.mcp_cassette record --pr-url github.com/owner/repo/pull/1 --out pr.json
+
+    # Regenerate the synthetic small/medium/huge fixtures
+    python -m src.benchmarks.mcp_cassette synth
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "cassettes")
+
+# Arguments ignored when matching: the PR's identity and the page size
+IGNORED_ARGS = {"owner", "repo", "pullNumber", "state", "perPage", "per_page"}
+
+
+def load_cassette(path: str) -> Dict:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cassette(cassette: Dict, path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(cassette, f, indent=None if path.endswith(".gz") else 1)
+
+
+def fixture_path(name: str) -> str:
+    for suffix in (".json", ".json.gz"):
+        path = os.path.join(FIXTURES_DIR, name + suffix)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No cassette named {name!r} in {FIXTURES_DIR}")
+
+
+def _match_key(tool: str, args: Dict) -> str:
+    return tool + json.dumps({k: v for k, v in sorted(args.items()) if k not in IGNORED_ARGS})
+
+
+class CassetteTool:
+    def __init__(self, pool: "CassettePool", name: str):
+        self.pool = pool
+        self.name = name
+
+    async def ainvoke(self, args: Dict) -> Any:
+        interaction = self.pool.lookup(self.name, args)
+        self.pool.calls += 1
+        await asyncio.sleep(interaction.get("latency_ms", 0) / 1000 * self.pool.time_scale)
+        return interaction["result"]
+
+
+class CassettePool:
+    """Replays a cassette through the same lease() interface as MCPSessionPool."""
+
+    def __init__(self, cassette: Dict, time_scale: float = 1.0):
+        self.name = cassette.get("name", "cassette")
+        self.time_scale = time_scale
+        self.calls = 0
+        self._interactions: Dict[str, Dict] = {}
+        self._by_tool: Dict[str, Dict] = {}
+        for interaction in cassette["interactions"]:
+            self._interactions.setdefault(_match_key(interaction["tool"], interaction["args"]), interaction)
+            self._by_tool.setdefault(interaction["tool"], interaction)
+        self._tools = {name: CassetteTool(self, name) for name in self._by_tool}
+
+    def lookup(self, tool: str, args: Dict) -> Dict:
+        interaction = self._interactions.get(_match_key(tool, args))
+        if interaction is not None:
+            return interaction
+        # Pages past the recording are empty, like GitHub's
+        if "page" in args and tool in self._by_tool:
+            return {"result": "[]", "latency_ms": self._by_tool[tool].get("latency_ms", 0)}
+        raise KeyError(f"Cassette {self.name!r} has no recording for {tool} {args}")
+
+    async def start(self):
+        return self
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self._tools
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict:
+        return {"calls": self.calls}
+
+
+class _RecordingTool:
+    def __init__(self, tool, interactions: List[Dict]):
+        self.tool = tool
+        self.interactions = interactions
+
+    async def ainvoke(self, args: Dict) -> Any:
+        started = time.perf_counter()
+        result = await self.tool.ainvoke(args)
+        self.interactions.append({
+            "tool": self.tool.name,
+            "args": args,
+            "result": result,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+        return result
+
+
+class RecordingPool:
+    """Wraps a live pool and records every tool call made through it."""
+
+    def __init__(self, pool, name: str):
+        self.pool = pool
+        self.name = name
+        self.interactions: List[Dict] = []
+
+    @asynccontextmanager
+    async def lease(self):
+        async with self.pool.lease() as tools:
+            yield {name: _RecordingTool(tool, self.interactions) for name, tool in tools.items()}
+
+    def cassette(self) -> Dict:
+        return {"name": self.name, "interactions": self.interactions}
+
+
+# ---------- synthetic fixtures ----------
+
+SYNTH_PROFILES = {
+    # files, hunks per file, lines per hunk, commits
+    "small_pr": (3, 2, 12, 2),
+    "medium_pr": (25, 4, 20, 8),
+    "huge_pr": (180, 8, 30, 40),
+}
+
+IDENTIFIERS = ["config", "session", "request", "payload", "result", "client", "retries", "timeout", "record", "buffer"]
+
+
+def _synth_file_diff(rng: random.Random, path: str, hunks: int, lines: int):
+    out = [f"diff --git a/{path} b/{path}\n", "index 3f2a1c4..9b8e7d6 100644\n", f"--- a/{path}\n", f"+++ b/{path}\n"]
+    additions = deletions = 0
+    start = 1
+    for h in range(hunks):
+        start += rng.randint(10, 60)
+        body = []
+        for i in range(lines):
+            name = rng.choice(IDENTIFIERS)
+            roll = rng.random()
+            if roll < 0.25:
+                body.append(f"+        {name} = self._load_{name}({rng.choice(IDENTIFIERS)}, retries={rng.randint(1, 5)})\n")
+                additions += 1
+            elif roll < 0.4:
+                body.append(f"-        {name} = load_{name}({rng.choice(IDENTIFIERS)})\n")
+                deletions += 1
+            else:
+                body.append(f"         if {name} is None:\n" if i % 5 == 0 else f"             return {name}\n")
+        old_count = sum(1 for line in body if not line.startswith("+"))
+        new_count = sum(1 for line in body if not line.startswith("-"))
+        out.append(f"@@ -{start},{old_count} +{start},{new_count} @@ def handle_{h}(self, {rng.choice(IDENTIFIERS)}):\n")
+        out.extend(body)
+    return "".join(out), additions, deletions
+
+
+def synth_cassette(name: str, files: int, hunks: int, lines: int, commits: int, seed: int = 7) -> Dict:
+    rng = random.Random(seed)
+    diffs, file_entries = [], []
+    for i in range(files):
+        path = f"src/pkg_{i % 7}/module_{i}.py"
+        diff, additions, deletions = _synth_file_diff(rng, path, hunks, lines)
+        diffs.append(diff)
+        file_entries.append({
+            "filename": path, "status": "modified", "additions": additions,
+            "deletions": deletions, "changes": additions + deletions,
+        })
+    details = {
+        "number": 1, "title": f"Synthetic {name.replace('_', ' ')}", "state": "open",
+        "body": "Refactors loading helpers and adds retries.", "html_url": "https://github.com/bench/repo/pull/1",
+        "user": {"login": "bench"}, "head": {"sha": f"{seed:040x}"}, "updated_at": "2024-01-01T00:00:00Z",
+        "changed_files": files, "commits": commits,
+    }
+    commit_entries = [
+        {"sha": f"{seed + i:040x}", "commit": {"message": f"Step {i + 1}", "author": {"name": "bench"}}}
+        for i in range(commits)
+    ]
+    interactions = [
+        {"tool": "get_pull_request", "args": {}, "result": json.dumps(details), "latency_ms": 180},
+        {"tool": "get_pull_request_diff", "args": {}, "result": "".join(diffs), "latency_ms": 250 + files * 4},
+    ]
+    for tool, entries in (("get_pull_request_files", file_entries), ("list_commits", commit_entries)):
+        for page in range(max(1, -(-len(entries) // 100))):
+            interactions.append({
+                "tool": tool, "args": {"page": page + 1, "perPage": 100},
+                "result": json.dumps(entries[page * 100:(page + 1) * 100]), "latency_ms": 200,
+            })
+    return {"name": name, "interactions": interactions}
+
+
+async def record(pr_url: str, out: str):
+    from src.tools.github_mcp_tool import create_session_pool, fetch_pr_data, set_session_pool
+    from src.utils.github_urls import parse_github_pr_url
+
+    owner, repo, number = parse_github_pr_url(pr_url)
+    pool = await create_session_pool().start()
+    recorder = RecordingPool(pool, name=f"{owner}/{repo}#{number}")
+    set_session_pool(recorder)
+    try:
+        await fetch_pr_data(owner, repo, number)
+    finally:
+        set_session_pool(None)
+        await pool.close()
+    save_cassette(recorder.cassette(), out)
+    print(f"Recorded {len(recorder.interactions)} tool calls to {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record the MCP calls made while fetching a PR")
+    rec.add_argument("--pr-url", required=True)
+    rec.add_argument("--out", required=True, help="cassette path (.json or .json.gz)")
+    sub.add_parser("synth", help="regenerate the synthetic fixtures")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.pr_url, args.out))
+        return
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, (files, hunks, lines, commits) in SYNTH_PROFILES.items():
+        path = os.path.join(FIXTURES_DIR, name + (".json.gz" if files > 100 else ".json"))
+        save_cassette(synth_cassette(name, files, hunks, lines, commits), path)
+        print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
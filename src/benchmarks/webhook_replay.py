@@ -0,0 +1,177 @@
+"""
+Replays recorded GitHub webhook deliveries, signed like GitHub signs them.
+
+A recording is a JSON file {"name", "deliveries": [{"at", "event",
+"delivery", "payload"}]}, "at" being seconds since the first delivery.
+Payloads copied from a repository's Settings > Webhooks > Recent Deliveries
+page can be pasted in as they are.
+
+"send" posts the deliveries to a running server at their recorded pace
+(scaled by --time-scale). "offline" runs them against the app in process,
+with the medium_pr cassette and the synthetic chat model standing in for
+GitHub and OpenAI, and reports how many reviews the pushes cost.
+
+Usage:
+    python -m src.benchmarks.webhook_replay send --url http://localhost:8000/webhooks/github --secret $GITHUB_WEBHOOK_SECRET
+    python -m src.benchmarks.webhook_replay offline --time-scale 0.05
+    python -m src.benchmarks.webhook_replay synth
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import hashlib
+from typing import Dict, List
+
+import httpx
+
+from src.comms.server.rest_api.webhooks import sign_payload
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "webhooks")
+DEFAULT_RECORDING = os.path.join(FIXTURES_DIR, "push_burst.json")
+SECRET_ENV = "GITHUB_WEBHOOK_SECRET"
+
+
+def load_recording(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sha(seed: str) -> str:
+    return hashlib.sha1(seed.encode()).hexdigest()
+
+
+def pull_request_payload(action: str, number: int, head_sha: str, updated_at: str) -> Dict:
+    """The fields of a pull_request delivery the service reads, plus a few for context."""
+    return {
+        "action": action,
+        "number": number,
+        "pull_request": {
+            "number": number,
+            "state": "open",
+            "draft": False,
+            "title": "Add retry to the sync client",
+            "html_url": f"https://github.com/bench/repo/pull/{number}",
+            "updated_at": updated_at,
+            "head": {"ref": "feature/retry", "sha": head_sha},
+            "base": {"ref": "main"},
+            "user": {"login": "octocat"},
+        },
+        "repository": {"name": "repo", "full_name": "bench/repo", "owner": {"login": "bench"}},
+        "sender": {"login": "octocat"},
+    }
+
+
+def synth_push_burst(number: int = 42) -> Dict:
+    """
+    A PR opened and pushed to three times within 21 s, then once more a
+    minute in, while the review of the burst would be running.
+    """
+    timeline = [(0, "opened"), (8, "synchronize"), (15, "synchronize"), (21, "synchronize"), (60, "synchronize")]
+    deliveries = []
+    for i, (at, action) in enumerate(timeline):
+        deliveries.append({
+            "at": at,
+            "event": "pull_request",
+            "delivery": _sha(f"delivery-{i}")[:32],
+            "payload": pull_request_payload(action, number, _sha(f"commit-{i}"), f"2024-05-01T10:{at // 60:02d}:{at % 60:02d}Z"),
+        })
+    return {"name": "push_burst", "deliveries": deliveries}
+
+
+async def send_deliveries(client: httpx.AsyncClient, url: str, recording: Dict, secret: str, time_scale: float) -> List[Dict]:
+    started = time.monotonic()
+    responses = []
+    for delivery in recording["deliveries"]:
+        await asyncio.sleep(max(0.0, started + delivery["at"] * time_scale - time.monotonic()))
+        body = json.dumps(delivery["payload"]).encode()
+        response = await client.post(url, content=body, headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": delivery.get("event", "pull_request"),
+            "X-GitHub-Delivery": delivery.get("delivery", ""),
+            "X-Hub-Signature-256": sign_payload(secret, body),
+        })
+        entry = {"at": delivery["at"], "status_code": response.status_code, **response.json()}
+        print(json.dumps(entry))
+        responses.append(entry)
+    return responses
+
+
+async def replay_offline(recording: Dict, time_scale: float, llm_latency_ms: float) -> Dict:
+    # Imported here so "send" does not load the workflow
+    from src.benchmarks.fake_llm import SyntheticChatModel
+    from src.benchmarks.mcp_cassette import CassettePool, fixture_path, load_cassette
+    from src.comms.server.rest_api.api import JOB_MANAGER, WEBHOOK_CONFIG, WEBHOOKS, app
+    from src.orchestrator.checkpoints import CHECKPOINTS
+    from src.tools.github_mcp_tool import set_session_pool
+    from src.utils.llm_registry import set_chat_model_factory
+
+    secret = "replay-secret"
+    os.environ[WEBHOOK_CONFIG.get("secret_env", SECRET_ENV)] = secret
+    model = SyntheticChatModel(model_name="gpt-4o", base_latency_ms=llm_latency_ms, ms_per_output_token=0.1)
+    set_session_pool(CassettePool(load_cassette(fixture_path("medium_pr")), time_scale=0.1))
+    set_chat_model_factory(lambda name, temperature: model)
+    # Recorded gaps are scaled, so the windows are too
+    WEBHOOKS.debounce_seconds *= time_scale
+    WEBHOOKS.max_wait_seconds *= time_scale
+    await JOB_MANAGER.start()
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay") as client:
+            await send_deliveries(client, "/webhooks/github", recording, secret, time_scale)
+        while WEBHOOKS.stats()["pending"]:
+            await asyncio.sleep(0.01)
+        await JOB_MANAGER.join()
+    finally:
+        await WEBHOOKS.stop()
+        await JOB_MANAGER.stop()
+        await CHECKPOINTS.close()
+        set_session_pool(None)
+        set_chat_model_factory(None)
+    jobs = [job for job in JOB_MANAGER.jobs() if job.source == "webhook"]
+    return {
+        "wall_s": round(time.perf_counter() - started, 3),
+        **WEBHOOKS.stats(),
+        "jobs": {job.head_sha[:12]: job.status for job in jobs},
+        "llm_calls": model.stats["calls"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    send = sub.add_parser("send", help="post the deliveries to a running server")
+    send.add_argument("--url", default="http://localhost:8000/webhooks/github")
+    send.add_argument("--secret", default=os.getenv(SECRET_ENV), help=f"defaults to ${SECRET_ENV}")
+    offline = sub.add_parser("offline", help="replay in process against cassettes and a synthetic LLM")
+    offline.add_argument("--llm-latency-ms", type=float, default=50)
+    for command in (send, offline):
+        command.add_argument("--recording", default=DEFAULT_RECORDING)
+        command.add_argument("--time-scale", type=float, default=1.0 if command is send else 0.05,
+                             help="multiplier for the recorded gaps")
+    sub.add_parser("synth", help="regenerate the synthetic recording")
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        with open(DEFAULT_RECORDING, "w", encoding="utf-8") as f:
+            json.dump(synth_push_burst(), f, indent=1)
+        print(f"Wrote {DEFAULT_RECORDING}")
+    elif args.command == "send":
+        if not args.secret:
+            raise SystemExit(f"Pass --secret or set {SECRET_ENV}")
+
+        async def run():
+            async with httpx.AsyncClient(timeout=30) as client:
+                await send_deliveries(client, args.url, load_recording(args.recording), args.secret, args.time_scale)
+        asyncio.run(run())
+    else:
+        os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+        result = asyncio.run(replay_offline(load_recording(args.recording), args.time_scale, args.llm_latency_ms))
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
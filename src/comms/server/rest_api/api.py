@@ -1,13 +1,74 @@
-import re
+import os
+import json
 import asyncio
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
 
 
 from src.utils.config_loader import read_base_config
-from src.orchestrator.agent_orchestrator import create_pr_workflow  
+from src.orchestrator.agent_orchestrator import build_initial_state, get_pr_workflow
+from src.tools import github_mcp_tool
+from src.tools.github_mcp_tool import create_session_pool, set_session_pool
+from src.utils.llm_cache import get_llm_cache, set_cache_bypass
+from src.utils.llm_registry import close_llm_registry
+from src.utils.model_router import ROUTER, set_routing_budget
+from src.utils.review_render import render_review_summary
+from src.utils.github_urls import parse_github_pr_url
+from src.utils.repo_index import REPO_INDEX
+from src.comms.server.rest_api.jobs import ReviewJobManager
+from src.comms.server.rest_api.webhooks import WebhookDebouncer, parse_pull_request_event, verify_signature
+from src.orchestrator.batch_review import BatchStats, iter_batch_reviews, resolve_targets
+from src.orchestrator.single_flight import SINGLE_FLIGHT
+from src.orchestrator.triage import TRIAGE_STATS
+from src.orchestrator.review_publisher import PUBLISH_LOG
+from src.orchestrator.checkpoints import CHECKPOINTS, run_review
+from src.orchestrator.review_stream import STREAM_MEDIA_TYPES, encode_event, iter_review_events
+from src.utils.metrics import WEBHOOK_EVENTS
 CONFIG = read_base_config()     
+JOB_MANAGER = ReviewJobManager(
+    workers=CONFIG.get("JOBS", {}).get("workers", 4),
+    max_retained=CONFIG.get("JOBS", {}).get("max_retained", 1000)
+)
+WEBHOOK_CONFIG = CONFIG.get("WEBHOOK", {})
+WEBHOOKS = WebhookDebouncer(
+    JOB_MANAGER,
+    debounce_seconds=WEBHOOK_CONFIG.get("debounce_seconds", 30),
+    max_wait_seconds=WEBHOOK_CONFIG.get("max_wait_seconds", 180),
+    review_drafts=WEBHOOK_CONFIG.get("review_drafts", False),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep warm github-mcp-server sessions for the lifetime of the app
+    pool = create_session_pool()
+    await pool.start()
+    set_session_pool(pool)
+    # Compile the graph and build the shared LLM clients once per process
+    get_pr_workflow()
+    for tier in ROUTER.order:
+        ROUTER.chat_model(tier, temperature=0)
+        ROUTER.chat_model(tier, temperature=0.2)
+    if CHECKPOINTS.enabled:
+        await CHECKPOINTS.start()
+    await JOB_MANAGER.start()
+    # Build repository indexes in the background; reviews before it finishes wait on the same lock
+    warm_index = asyncio.create_task(REPO_INDEX.warm()) if REPO_INDEX.enabled else None
+    try:
+        yield
+    finally:
+        if warm_index is not None:
+            warm_index.cancel()
+        await WEBHOOKS.stop()
+        await JOB_MANAGER.stop()
+        await CHECKPOINTS.close()
+        set_session_pool(None)
+        await pool.close()
+        await close_llm_registry()
 
 # Create FastAPI app with config
 app = FastAPI(
@@ -15,7 +76,8 @@ app = FastAPI(
     description=CONFIG["API"]["description"],
     version=CONFIG["API"]["version"],
     docs_url=CONFIG["API"]["docs_url"],
-    redoc_url=CONFIG["API"]["redoc_url"]
+    redoc_url=CONFIG["API"]["redoc_url"],
+    lifespan=lifespan
 )
 
 # Add CORS middleware using config
@@ -30,48 +92,248 @@ app.add_middleware(
 
 class PRLinkRequest(BaseModel):
     github_link: str
+    bypass_cache: bool = False
+    # Review budget for model routing; unset fields use MODEL_ROUTING.budget
+    max_cost_usd: Optional[float] = None
+    max_latency_s: Optional[float] = None
+    # /review-pr only: stream tokens and events as SSE or NDJSON instead of one JSON response
+    stream: Optional[Literal["sse", "ndjson"]] = None
 
-def parse_github_pr_url(url: str):
-    """
-    Parses a GitHub PR URL and returns (owner, repo, pr_number)
-    Accepts URL with or without https:// prefix.
-    """
-    pattern = r"^(https://)?github\.com/([^/]+)/([^/]+)/pull/(\d+)$"
-    match = re.match(pattern, url)
-    if match:
-        _, owner, repo, pr_number = match.groups()
-        return owner, repo, int(pr_number)
-    raise ValueError("Invalid GitHub PR URL format.")
-
-def strip_ansi_codes(text):
-    ansi_escape = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
-    return ansi_escape.sub('', text)
+class BatchReviewRequest(BaseModel):
+    repos: List[str] = []
+    pr_urls: List[str] = []
+    global_limit: Optional[int] = None
+    per_repo_limit: Optional[int] = None
+    bypass_cache: bool = False
+    max_cost_usd: Optional[float] = None
+    max_latency_s: Optional[float] = None
 
 @app.post("/review-pr")
 async def analyze_pr(req: PRLinkRequest):
+    """Reviews a PR; with "stream" set, streams the review as it runs (see stream_review)."""
     try:
         repo_owner, repo_name, pr_number = parse_github_pr_url(req.github_link)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    state = {
-        "repo_owner": repo_owner,
-        "repo_name": repo_name,
-        "pr_number": pr_number,
-        "messages": [{
-            "role": "system",
-            "content": f"Starting PR analysis for {repo_owner}/{repo_name} PR #{pr_number}"
-        }]
-    }
+    # Scoped to this request's context; skips cached LLM responses
+    set_cache_bypass(req.bypass_cache)
+    set_routing_budget(req.max_cost_usd, req.max_latency_s)
+
+    state = build_initial_state(repo_owner, repo_name, pr_number)
+    if req.stream:
+        return StreamingResponse(
+            stream_review(state, req.bypass_cache, req.stream, req.max_cost_usd, req.max_latency_s),
+            media_type=STREAM_MEDIA_TYPES[req.stream]
+        )
 
-    workflow = create_pr_workflow()
     try:
-        result = await workflow.ainvoke(state)
-        summary = result.get("review_summary", "No summary available")
+        # Concurrent requests for the same PR revision share one workflow run;
+        # a retry after a failure resumes from its last checkpoint
+        key = await SINGLE_FLIGHT.make_key(repo_owner, repo_name, pr_number)
+        result = await SINGLE_FLIGHT.run(key, lambda: run_review(state, key), use_cache=not req.bypass_cache)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Workflow error: {str(e)}")
 
-    return {"final_review_summary": strip_ansi_codes(summary)}
+    return {"final_review_summary": render_review_summary(result)}
+
+async def stream_review(state, bypass_cache: bool, stream_format: str,
+                        max_cost_usd: Optional[float] = None, max_latency_s: Optional[float] = None):
+    """
+    Streams LLM tokens (tagged with stage and file), comments, node transitions
+    and the decision while the review runs, then the final result. A request
+    coalesced onto a run already in flight only receives the final result.
+    """
+    set_cache_bypass(bypass_cache)
+    set_routing_budget(max_cost_usd, max_latency_s)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            key = await SINGLE_FLIGHT.make_key(state["repo_owner"], state["repo_name"], state["pr_number"])
+
+            async def review():
+                final_state = {}
+                async for event in iter_review_events(state, key, final_state):
+                    queue.put_nowait(event)
+                return final_state
+
+            result = await SINGLE_FLIGHT.run(
+                key, review,
+                use_cache=not bypass_cache,
+                on_coalesced=lambda: queue.put_nowait({"type": "coalesced"})
+            )
+            queue.put_nowait({
+                "type": "result",
+                "final_review_summary": render_review_summary(result),
+                "merge_decision": result.get("merge_decision"),
+                "decision": result.get("decision"),
+                "publication": result.get("publication"),
+            })
+        except Exception as e:
+            queue.put_nowait({"type": "error", "detail": f"Workflow error: {str(e)}"})
+        finally:
+            queue.put_nowait(None)
+
+    # The run is shielded inside SINGLE_FLIGHT, so a client disconnecting does not cancel it
+    task = asyncio.create_task(run())
+    try:
+        yield encode_event({"type": "started", "pr_number": state["pr_number"]}, stream_format)
+        while (event := await queue.get()) is not None:
+            yield encode_event(event, stream_format)
+    finally:
+        if not task.done():
+            task.cancel()
+
+@app.post("/review-jobs", status_code=202)
+async def submit_review_job(req: PRLinkRequest):
+    """Queues a review and returns immediately with a job ID."""
+    try:
+        repo_owner, repo_name, pr_number = parse_github_pr_url(req.github_link)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = JOB_MANAGER.submit(
+        repo_owner, repo_name, pr_number, bypass_cache=req.bypass_cache,
+        budget={"max_cost_usd": req.max_cost_usd, "max_latency_s": req.max_latency_s}
+    )
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/review-jobs/{job.job_id}",
+        "events_url": f"/review-jobs/{job.job_id}/events"
+    }
+
+@app.get("/review-jobs/{job_id}")
+async def get_review_job(job_id: str):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+    return job.to_dict()
+
+@app.get("/review-jobs/{job_id}/events")
+async def stream_review_job(job_id: str):
+    """Server-sent events for each node transition, ending with completed/failed/cancelled."""
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+
+    async def event_stream():
+        async for event in JOB_MANAGER.subscribe(job):
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/webhooks/github", status_code=202)
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(""),
+    x_github_delivery: Optional[str] = Header(None),
+    x_hub_signature_256: Optional[str] = Header(None),
+):
+    """
+    Receives GitHub pull_request webhooks. Pushes are debounced per PR and
+    reviewed as jobs (see webhooks.py); the response says what was done.
+    """
+    if not WEBHOOK_CONFIG.get("enabled", True):
+        raise HTTPException(status_code=404, detail="Webhooks are disabled.")
+    secret = os.getenv(WEBHOOK_CONFIG.get("secret_env", "GITHUB_WEBHOOK_SECRET"))
+    if not secret:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured.")
+    body = await request.body()
+    if not verify_signature(secret, body, x_hub_signature_256):
+        WEBHOOK_EVENTS.labels("rejected").inc()
+        raise HTTPException(status_code=401, detail="Invalid signature.")
+
+    if x_github_event == "ping":
+        return {"status": "pong", "delivery": x_github_delivery}
+    if x_github_event != "pull_request":
+        WEBHOOK_EVENTS.labels("ignored").inc()
+        return {"status": "ignored", "delivery": x_github_delivery}
+    try:
+        event = parse_pull_request_event(json.loads(body))
+    except ValueError:
+        event = None
+    if event is None:
+        raise HTTPException(status_code=400, detail="Not a pull_request payload.")
+    return {"delivery": x_github_delivery, **WEBHOOKS.handle(event)}
+
+@app.post("/review-batch")
+async def review_batch(req: BatchReviewRequest):
+    """
+    Reviews every open PR of the given repos plus the given PR URLs. Streams one
+    NDJSON line per PR as it finishes, then a final summary line.
+    """
+    if not req.repos and not req.pr_urls:
+        raise HTTPException(status_code=400, detail="Provide at least one repo or PR URL.")
+    try:
+        targets = await resolve_targets(req.repos, req.pr_urls)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def result_stream():
+        set_cache_bypass(req.bypass_cache)
+        set_routing_budget(req.max_cost_usd, req.max_latency_s)
+        stats = BatchStats()
+        async for result in iter_batch_reviews(targets, req.global_limit, req.per_repo_limit, stats):
+            yield json.dumps({"type": "result", **result}) + "\n"
+        yield json.dumps({"type": "summary", **stats.summary()}) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@app.get("/cache-stats")
+async def cache_stats():
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+@app.get("/coalescing-stats")
+async def coalescing_stats():
+    return SINGLE_FLIGHT.stats()
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/triage-stats")
+async def triage_stats():
+    return TRIAGE_STATS.stats()
+
+@app.get("/model-routing-stats")
+async def model_routing_stats():
+    return ROUTER.stats()
+
+@app.get("/publish-stats")
+async def publish_stats():
+    return PUBLISH_LOG.stats()
+
+@app.get("/webhook-stats")
+async def webhook_stats():
+    return WEBHOOKS.stats()
+
+@app.get("/repo-index-stats")
+async def repo_index_stats():
+    return REPO_INDEX.stats()
+
+@app.get("/checkpoints")
+async def list_checkpoints():
+    """Saved threads of failed reviews, which the next review of the same revision resumes."""
+    if not CHECKPOINTS.enabled:
+        return {**CHECKPOINTS.stats(), "threads": []}
+    return {**CHECKPOINTS.stats(), "threads": await CHECKPOINTS.list_threads()}
+
+@app.post("/checkpoints/prune")
+async def prune_checkpoints(max_age_hours: Optional[float] = None, max_threads: Optional[int] = None):
+    if not CHECKPOINTS.enabled:
+        raise HTTPException(status_code=400, detail="Checkpoints are disabled.")
+    max_age = max_age_hours * 3600 if max_age_hours is not None else None
+    return await CHECKPOINTS.prune(max_age, max_threads)
+
+@app.get("/github-stats")
+async def github_stats():
+    return {
+        "rate_limiter": github_mcp_tool.RATE_LIMITER.stats(),
+        "pr_cache": github_mcp_tool.PR_CACHE.stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
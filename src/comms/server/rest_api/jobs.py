@@ -0,0 +1,211 @@
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.orchestrator.agent_orchestrator import build_initial_state
+from src.orchestrator.cancellation import CancelToken, ReviewCancelled, cancel_scope
+from src.orchestrator.checkpoints import review_run
+from src.orchestrator.single_flight import SINGLE_FLIGHT
+from src.utils.llm_cache import set_cache_bypass
+from src.utils.model_router import set_routing_budget
+from src.utils.review_render import render_review_summary
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class ReviewJob:
+    def __init__(self, repo_owner: str, repo_name: str, pr_number: int, bypass_cache: bool = False,
+                 head_sha: Optional[str] = None, source: str = "api", budget: Optional[Dict] = None):
+        self.job_id = uuid.uuid4().hex
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.pr_number = pr_number
+        self.bypass_cache = bypass_cache
+        # Known up front for webhook jobs; otherwise fetched when the job starts
+        self.head_sha = head_sha
+        self.source = source
+        # {"max_cost_usd", "max_latency_s"} for model routing
+        self.budget = budget or {}
+        self.cancel_token = CancelToken()
+        self.status = QUEUED
+        self.current_node: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict] = []
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def cancel(self, reason: str):
+        """Stops the job before its next workflow node (or before it starts, if queued)."""
+        if not self.done:
+            self.cancel_token.cancel(reason)
+
+    def emit(self, event: str, **data):
+        record = {"event": event, "job_id": self.job_id, "ts": time.time(), **data}
+        self.events.append(record)
+        for queue in self._subscribers:
+            queue.put_nowait(record)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "repo_owner": self.repo_owner,
+            "repo_name": self.repo_name,
+            "pr_number": self.pr_number,
+            "head_sha": self.head_sha,
+            "source": self.source,
+            "status": self.status,
+            "current_node": self.current_node,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ReviewJobManager:
+    """
+    In-process queue of review jobs drained by a fixed pool of worker tasks.
+    Finished jobs are retained (up to max_retained) for status polling.
+    """
+
+    def __init__(self, workers: int = 4, max_retained: int = 1000):
+        self.workers = max(1, int(workers))
+        self.max_retained = max_retained
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: "OrderedDict[str, ReviewJob]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, repo_owner: str, repo_name: str, pr_number: int, bypass_cache: bool = False,
+               head_sha: Optional[str] = None, source: str = "api", budget: Optional[Dict] = None) -> ReviewJob:
+        job = ReviewJob(repo_owner, repo_name, pr_number, bypass_cache, head_sha, source, budget)
+        self._jobs[job.job_id] = job
+        self._evict()
+        job.emit("queued", position=self._queue.qsize() + 1)
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ReviewJob]:
+        return list(self._jobs.values())
+
+    async def join(self):
+        """Waits until every job submitted so far has finished."""
+        await self._queue.join()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_retained)]:
+            del self._jobs[job_id]
+
+    async def subscribe(self, job: ReviewJob) -> AsyncIterator[Dict]:
+        """Replays the job's events so far, then follows it until it finishes."""
+        # Snapshot and subscribe together so no event is missed or repeated
+        queue: asyncio.Queue = asyncio.Queue()
+        replay = list(job.events)
+        job._subscribers.append(queue)
+        try:
+            for event in replay:
+                yield event
+            if replay and replay[-1]["event"] in FINISHED:
+                return
+            while True:
+                event = await queue.get()
+                yield event
+                if event["event"] in FINISHED:
+                    return
+        finally:
+            job._subscribers.remove(queue)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ReviewJob):
+        set_cache_bypass(job.bypass_cache)
+        set_routing_budget(**job.budget)
+        if job.cancel_token.cancelled:
+            job.error = job.cancel_token.reason
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.emit(CANCELLED, error=job.error)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.emit("started")
+        state = build_initial_state(job.repo_owner, job.repo_name, job.pr_number)
+
+        try:
+            # A job for a PR revision already under review attaches to that run
+            key = await SINGLE_FLIGHT.make_key(job.repo_owner, job.repo_name, job.pr_number, job.head_sha)
+
+            async def stream_review() -> Dict:
+                final_state: Dict = {}
+                async with review_run(state, key, job.job_id) as run:
+                    if run.resumed:
+                        job.emit("resumed")
+                    async for chunk in run.astream(stream_mode="updates"):
+                        for node, update in chunk.items():
+                            update = update or {}
+                            final_state.update(update)
+                            job.current_node = node
+                            job.emit("node", node=node, step=update.get("step"))
+                    return await run.values(final_state)
+
+            # The shared run stops early only if every job waiting on it is cancelled
+            with cancel_scope(job.cancel_token):
+                final_state = await SINGLE_FLIGHT.run(
+                    key, stream_review,
+                    use_cache=not job.bypass_cache,
+                    on_coalesced=lambda: job.emit("coalesced")
+                )
+            job.result = {
+                "final_review_summary": render_review_summary(final_state),
+                "merge_decision": final_state.get("merge_decision"),
+                "decision": final_state.get("decision"),
+                "token_report": final_state.get("token_report"),
+                "model_plan": final_state.get("model_plan"),
+                "publication": final_state.get("publication"),
+            }
+            job.status = COMPLETED
+            job.finished_at = time.time()
+            job.emit(COMPLETED, result=job.result)
+        except ReviewCancelled as e:
+            job.error = str(e)
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.emit(CANCELLED, error=job.error)
+        except Exception as e:
+            job.error = f"Workflow error: {e}"
+            job.status = FAILED
+            job.finished_at = time.time()
+            job.emit(FAILED, error=job.error)
@@ -0,0 +1,199 @@
+"""
+GitHub pull_request webhook ingestion with per-PR debouncing.
+
+Deliveries are verified against the X-Hub-Signature-256 HMAC of the raw
+body. A push (opened, reopened, synchronize, ready_for_review) does not
+start a review right away: it (re)arms a timer for the PR, and the review
+job for the latest head SHA is submitted once no push arrived for
+debounce_seconds (or max_wait_seconds after the first push of a burst, so a
+busy PR is still reviewed). A push that supersedes a queued or running job
+cancels it before its next workflow node, and closing the PR cancels both
+the timer and the job. A burst of N pushes therefore costs one review.
+"""
+
+import hmac
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.comms.server.rest_api.jobs import COMPLETED, ReviewJob, ReviewJobManager
+from src.tools.github_mcp_tool import PR_CACHE
+from src.utils.metrics import WEBHOOK_EVENTS
+from src.utils.review_log import get_logger, log_event
+
+logger = get_logger("webhooks")
+
+REVIEW_ACTIONS = ("opened", "reopened", "synchronize", "ready_for_review")
+
+PRKey = Tuple[str, str, int]
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Constant-time check of GitHub's X-Hub-Signature-256 header."""
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def parse_pull_request_event(payload: Dict) -> Optional[Dict]:
+    """The PR coordinates of a pull_request payload, or None if it is not one."""
+    if not isinstance(payload, dict):
+        return None
+    pr = payload.get("pull_request") or {}
+    repository = payload.get("repository") or {}
+    owner = (repository.get("owner") or {}).get("login")
+    head_sha = (pr.get("head") or {}).get("sha")
+    number = pr.get("number") or payload.get("number")
+    if not (owner and repository.get("name") and number and head_sha):
+        return None
+    return {
+        "action": payload.get("action", ""),
+        "repo_owner": owner,
+        "repo_name": repository["name"],
+        "pr_number": int(number),
+        "head_sha": head_sha,
+        "draft": bool(pr.get("draft")),
+    }
+
+
+class _PendingPR:
+    """Debounce state of one PR: the latest head seen, its timer and the last job submitted."""
+
+    def __init__(self, head_sha: str):
+        self.head_sha = head_sha
+        self.burst_started: Optional[float] = None
+        self.timer: Optional[asyncio.Task] = None
+        self.job: Optional[ReviewJob] = None
+
+    @property
+    def idle(self) -> bool:
+        return self.timer is None and (self.job is None or self.job.done)
+
+
+class WebhookDebouncer:
+    def __init__(
+        self,
+        jobs: ReviewJobManager,
+        debounce_seconds: float = 30,
+        max_wait_seconds: float = 180,
+        review_drafts: bool = False,
+        max_tracked_prs: int = 10000,
+    ):
+        self.jobs = jobs
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.review_drafts = review_drafts
+        self.max_tracked_prs = max_tracked_prs
+        self.deliveries = 0
+        self.debounced = 0
+        self.duplicates = 0
+        self.superseded = 0
+        self.stopped = 0
+        self.ignored = 0
+        self.reviews_started = 0
+        self._prs: "OrderedDict[PRKey, _PendingPR]" = OrderedDict()
+
+    def _count(self, outcome: str) -> Dict:
+        WEBHOOK_EVENTS.labels(outcome).inc()
+        return {"status": outcome}
+
+    def handle(self, event: Dict) -> Dict:
+        """Applies one parsed pull_request event; returns what was done with it."""
+        self.deliveries += 1
+        key = PR_CACHE.key(event["repo_owner"], event["repo_name"], event["pr_number"])
+        action = event["action"]
+        if action == "closed" or (action == "converted_to_draft" and not self.review_drafts):
+            self._stop(key, f"pull request {action}")
+            self.stopped += 1
+            return self._count("stopped")
+        if action not in REVIEW_ACTIONS or (event["draft"] and not self.review_drafts):
+            self.ignored += 1
+            return self._count("ignored")
+
+        head_sha = event["head_sha"]
+        pending = self._prs.get(key)
+        if pending is not None and pending.head_sha == head_sha and (
+            not pending.idle or (pending.job is not None and pending.job.status == COMPLETED)
+        ):
+            # Redelivery, or reopened/ready_for_review without a new commit
+            self.duplicates += 1
+            return {**self._count("duplicate"), "head_sha": head_sha}
+        if pending is None:
+            pending = self._prs[key] = _PendingPR(head_sha)
+        self._prs.move_to_end(key)
+        if pending.head_sha != head_sha:
+            # The diff changed; the next fetch must not reuse the cached details
+            PR_CACHE.expire_details(key)
+            pending.head_sha = head_sha
+        if pending.job is not None and not pending.job.done and pending.job.head_sha != head_sha:
+            pending.job.cancel(f"superseded by {head_sha[:12]}")
+            self.superseded += 1
+            WEBHOOK_EVENTS.labels("superseded").inc()
+            log_event(logger, logging.INFO, "webhook.superseded", job_id=pending.job.job_id, head_sha=head_sha)
+
+        now = time.monotonic()
+        if pending.timer is not None:
+            pending.timer.cancel()
+            self.debounced += 1
+        else:
+            pending.burst_started = now
+        delay = max(0.0, min(self.debounce_seconds, pending.burst_started + self.max_wait_seconds - now))
+        pending.timer = asyncio.create_task(self._fire(key, pending, delay))
+        self._evict()
+        log_event(logger, logging.INFO, "webhook.scheduled", pr=self._label(key), head_sha=head_sha, delay=round(delay, 2))
+        return {**self._count("scheduled"), "head_sha": head_sha, "review_in_seconds": round(delay, 2)}
+
+    async def _fire(self, key: PRKey, pending: _PendingPR, delay: float):
+        await asyncio.sleep(delay)
+        pending.timer = None
+        pending.burst_started = None
+        repo_owner, repo_name, pr_number = key
+        pending.job = self.jobs.submit(repo_owner, repo_name, pr_number, head_sha=pending.head_sha, source="webhook")
+        self.reviews_started += 1
+        log_event(logger, logging.INFO, "webhook.review_submitted", pr=self._label(key),
+                  head_sha=pending.head_sha, job_id=pending.job.job_id)
+
+    def _stop(self, key: PRKey, reason: str):
+        pending = self._prs.pop(key, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        if pending.job is not None:
+            pending.job.cancel(reason)
+
+    def _evict(self):
+        """Forgets the least recently pushed PRs with nothing pending beyond max_tracked_prs."""
+        excess = len(self._prs) - self.max_tracked_prs
+        for key in [key for key, pending in self._prs.items() if pending.idle][:max(0, excess)]:
+            del self._prs[key]
+
+    @staticmethod
+    def _label(key: PRKey) -> str:
+        return f"{key[0]}/{key[1]}#{key[2]}"
+
+    async def stop(self):
+        timers = [pending.timer for pending in self._prs.values() if pending.timer is not None]
+        for timer in timers:
+            timer.cancel()
+        await asyncio.gather(*timers, return_exceptions=True)
+        self._prs.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "deliveries": self.deliveries,
+            "reviews_started": self.reviews_started,
+            "debounced": self.debounced,
+            "duplicates": self.duplicates,
+            "superseded": self.superseded,
+            "stopped": self.stopped,
+            "ignored": self.ignored,
+            "pending": sum(1 for pending in self._prs.values() if pending.timer is not None),
+        }
@@ -1,6 +1,8 @@
 import os
 import asyncio
+import logging
 from dotenv import load_dotenv
+from langgraph.config import get_stream_writer
 from langgraph.types import Command
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Optional, Dict, List, Any, Literal
@@ -10,15 +12,38 @@ from src.schema.schema import PRState
 from src.utils.config_loader import read_base_config
 from src.agents.pr_retriver_agent.pr_retriver import pr_retriever_agent
 from src.tools.github_mcp_tool import list_prs
-from src.agents.pr_reviewer_agent.pr_reviewer import generate_pr_comments
-from src.agents.code_analyzer_agent.code_analyzer import code_analyzer
-from src.agents.decision_maker_agent.decision_maker import run_react_agent
+from src.agents.pr_reviewer_agent.pr_reviewer import stream_pr_comments
+from src.agents.code_analyzer_agent.code_analyzer import (
+    ANALYSIS_FAILED_PREFIX,
+    analyze_files,
+    extract_file_changes,
+    fingerprint_file_change,
+    merge_file_analyses,
+)
+from src.orchestrator.cancellation import cancellable_node
+from src.orchestrator.review_publisher import PUBLISH_ENABLED, publish_review
+from src.orchestrator.review_store import REVIEW_STORE
+from src.orchestrator.triage import (
+    LIGHT,
+    RULES,
+    TRIAGE_STATS,
+    rules_decision,
+    skipped_file_report,
+    triage_pr,
+)
+from src.agents.decision_maker_agent.decision_maker import make_merge_decision
+from src.tools.react_tool import parse_decision
+from src.utils.diff_chunks import CHUNK_TOKENS, CHUNKING_ENABLED
+from src.utils.diff_minify import MINIFY_ENABLED, fit_to_budget
+from src.utils.llm_cache import cache_bypassed
+from src.utils.repo_index import REPO_INDEX
+from src.utils.metrics import DIFF_TOKENS, NODE_ERRORS, instrument_node
+from src.utils.model_router import ROUTER
+from src.utils.tokens import count_tokens
+from src.utils.review_log import bind_review, get_logger, log_event
+from src.utils.review_render import render_review_summary
 
-# ---------- COLORS FOR OUTPUT ----------
-def color_block(text, color_code):
-    return f"{color_code}{text}\033[0m"
-
-COLORS = read_base_config()["COLORS"]   
+logger = get_logger("workflow")
 
 # ---------- ENVIRONMENT ----------
 load_dotenv()
@@ -26,7 +51,7 @@ load_dotenv()
 REPO_OWNER = "artkulak"
 REPO_NAME = "repo2file"
 
-# ---------- AGENT NODES WITH FULL OUTPUT COLOR ----------
+# ---------- AGENT NODES ----------
 
 async def fetch_node(state: PRState) -> Command[Literal["supervisor"]]:
     pr_data = await pr_retriever_agent(
@@ -37,46 +62,162 @@ async def fetch_node(state: PRState) -> Command[Literal["supervisor"]]:
     # Determine if any .py files are changed
     pr_files = pr_data.get("pr_files", [])
     has_code_changes = any(f.get("filename", "").endswith(".py") for f in pr_files)
+    if pr_data.get("fetch_errors"):
+        NODE_ERRORS.labels("fetch").inc(len(pr_data["fetch_errors"]))
 
-    output = []
-    output.append("\n======== PR RETRIEVER AGENT ========")
-    output.append(print_pr_structured(pr_data, return_str=True))
-    output.append(f"Has code changes (.py files): {has_code_changes}")
-    print(color_block('\n'.join(output), COLORS["fetch"]))
+    log_event(
+        logger, logging.INFO, "pr.fetched", stage="fetch",
+        title=pr_data.get("pr_title", ""), head_sha=pr_data.get("pr_head_sha", ""),
+        files=len(pr_files), commits=len(pr_data.get("pr_commits", [])),
+        has_code_changes=has_code_changes, fetch_errors=sorted(pr_data.get("fetch_errors") or {}),
+    )
 
     return Command(
         update={"pr_data": pr_data, "step": "fetch", "has_code_changes": has_code_changes},
         goto="supervisor"
     )
 
+def _parse_and_triage(pr_data: Dict, has_code_changes: bool):
+    file_changes = extract_file_changes(pr_data)
+    return file_changes, triage_pr(file_changes, has_code_changes)
+
+async def triage_node(state: PRState) -> Command[Literal["supervisor"]]:
+    pr_data = state.get("pr_data", {})
+    # The diff is parsed once, here; later nodes read the file changes from state.
+    # Parsing and classifying a large diff is CPU work, kept off the event loop
+    file_changes, triage = await asyncio.to_thread(_parse_and_triage, pr_data, state.get("has_code_changes", False))
+    TRIAGE_STATS.record(triage)
+    update = {"triage": triage, "file_changes": file_changes, "step": "triage"}
+
+    log_event(
+        logger, logging.INFO, "triage.routed", stage="triage",
+        route=triage["route"], changed_lines=triage["changed_lines"],
+        files_skipped=sum(1 for kind in triage["files"].values() if kind != "review"),
+        llm_calls_avoided=triage["llm_calls_avoided"],
+    )
+    log_event(logger, logging.DEBUG, "triage.files", stage="triage", files=triage["files"])
+    if triage["route"] == RULES:
+        update.update({
+            "analysis": "\n".join(
+                f"### File: {name}\n{skipped_file_report(kind)}"
+                for name, kind in triage["files"].items() if kind != "review"
+            ) or "No file changes to analyze.",
+            "comments": [],
+            "merge_decision": rules_decision(triage, []),
+        })
+    return Command(update=update, goto="supervisor")
+
 async def analyze_node(state: PRState) -> Command[Literal["supervisor"]]:
     pr_data = state.get("pr_data", {})
-    result_sub_state = await code_analyzer(pr_data)
-    output = []
-    output.append("\n======== CODE ANALYZER AGENT ========")
-    output.append(result_sub_state)
-    print(color_block('\n'.join(output), COLORS["analyze"]))
+    file_changes = state.get("file_changes")
+    if file_changes is None:
+        # Runs checkpointed before triage kept the file changes
+        file_changes = await asyncio.to_thread(extract_file_changes, pr_data)
+    triaged_files = (state.get("triage") or {}).get("files", {})
+    skipped = {
+        name: skipped_file_report(triaged_files[name])
+        for name in file_changes if triaged_files.get(name, "review") != "review"
+    }
+    fingerprints = {name: fingerprint_file_change(change) for name, change in file_changes.items()}
+
+    # Carry forward analyses of files whose diff is unchanged since the last review,
+    # unless the request asked for a fresh review
+    previous = REVIEW_STORE.get(state["repo_owner"], state["repo_name"], state["pr_number"]) or {}
+    previous_files = {} if cache_bypassed() else previous.get("files", {})
+    reused = {
+        name: previous_files[name]["analysis"]
+        for name in file_changes
+        if name in previous_files and previous_files[name]["fingerprint"] == fingerprints[name]
+    }
+    to_analyze = {
+        name: change for name, change in file_changes.items() if name not in reused and name not in skipped
+    }
+    token_report = None
+    if MINIFY_ENABLED and to_analyze:
+        # Prompts get the minified, budgeted diffs; fingerprints above use the raw ones.
+        # Tokenizing multi-MB diffs is CPU work, kept off the event loop other reviews share
+        to_analyze, minify_skipped, token_report = await asyncio.to_thread(
+            fit_to_budget, to_analyze, chunk_tokens=CHUNK_TOKENS if CHUNKING_ENABLED else None
+        )
+        for name, kind in minify_skipped.items():
+            skipped[name] = skipped_file_report(kind)
+        DIFF_TOKENS.labels("raw").inc(token_report["raw_tokens"])
+        DIFF_TOKENS.labels("prompt").inc(token_report["prompt_tokens"])
+    model_plan = repo_index = None
+    if to_analyze:
+        # Model tier per file, fitted to the request's cost/latency budget
+        prompt_tokens = (
+            {name: token_report["files"][name]["prompt_tokens"] for name in to_analyze}
+            if token_report else await asyncio.to_thread(
+                lambda: {name: count_tokens(change.get("diff", "")) for name, change in to_analyze.items()}
+            )
+        )
+        model_plan = ROUTER.plan_review(to_analyze, prompt_tokens, (state.get("triage") or {}).get("route"))
+        try:
+            repo_index = await REPO_INDEX.get(
+                state["repo_owner"], state["repo_name"], pr_data.get("pr_head_sha", ""), state["pr_number"]
+            )
+        except Exception as e:
+            log_event(logger, logging.WARNING, "repo_index.unavailable", stage="analyze", error=repr(e))
+    fresh = await analyze_files(to_analyze, repo_index, model_plan["files"]) if to_analyze else {}
+    failed = sum(1 for report in fresh.values() if report.startswith(ANALYSIS_FAILED_PREFIX))
+    if failed:
+        NODE_ERRORS.labels("analyze").inc(failed)
+    file_analyses = {name: skipped.get(name) or reused.get(name) or fresh.get(name, "") for name in file_changes}
+    result_sub_state = merge_file_analyses(file_changes, file_analyses)
+
+    REVIEW_STORE.save(
+        state["repo_owner"], state["repo_name"], state["pr_number"],
+        head_sha=pr_data.get("pr_head_sha", ""),
+        files={
+            name: {"fingerprint": fingerprints[name], "analysis": report}
+            for name, report in file_analyses.items()
+            if not report.startswith(ANALYSIS_FAILED_PREFIX) and name not in skipped
+        }
+    )
+
+    log_event(
+        logger, logging.INFO, "analysis.done", stage="analyze",
+        analyzed=len(to_analyze), reused=len(reused), skipped=len(skipped), failed=failed,
+        since_sha=previous.get("head_sha", "")[:7] if previous else None,
+        repo_index_sha=repo_index.sha[:7] if repo_index is not None else None,
+        raw_tokens=token_report["raw_tokens"] if token_report else None,
+        prompt_tokens=token_report["prompt_tokens"] if token_report else None,
+        estimated_cost_usd=model_plan["estimated_cost_usd"] if model_plan else None,
+        downgraded=model_plan["downgraded"] if model_plan else None,
+    )
+    log_event(logger, logging.DEBUG, "analysis.report", stage="analyze", analysis=result_sub_state)
     return Command(
         update={
             "analysis": result_sub_state,
+            "file_analyses": file_analyses,
+            "token_report": token_report,
+            "model_plan": model_plan,
             "step": "analyze"
         },
         goto="supervisor"
     )
 
 async def comment_node(state: PRState) -> Command[Literal["supervisor"]]:
+    # Streaming callers receive each comment as soon as it is parsed
+    writer = get_stream_writer()
+    # Files triage found unparseable are reported alongside the reviewer's comments
+    comments = list((state.get("triage") or {}).get("syntax_comments") or [])
+    for comment in comments:
+        writer({"type": "comment", "comment": comment})
     try:
-        comments = await generate_pr_comments(state["pr_data"], state.get("analysis"))
-        output = []
-        output.append("\n======== PR REVIEWER AGENT ========")
-
-        for comment in comments:
-            output.append(f"- {comment['comment_type'].upper()} [{comment.get('file_path')}:{comment.get('line_number')}]")
-            output.append(f"  {comment['content']}\n")
-        print(color_block('\n'.join(output), COLORS["comment"]))
+        tier = ROUTER.comment_tier(state.get("model_plan"))
+        async for comment in stream_pr_comments(state.get("analysis"), tier):
+            comments.append(comment)
+            writer({"type": "comment", "comment": comment})
+            log_event(logger, logging.DEBUG, "comment", stage="comment", **comment)
+        log_event(
+            logger, logging.INFO, "comments.generated", stage="comment",
+            count=len(comments), critical=sum(1 for c in comments if c.get("severity") == "critical"),
+        )
     except Exception as e:
-        print(color_block(f"Error generating comments: {e}", COLORS["error"]))
-        comments = []
+        NODE_ERRORS.labels("comment").inc()
+        log_event(logger, logging.ERROR, "comments.failed", stage="comment", error=repr(e))
     return Command(
         update={
             "comments": comments,
@@ -88,152 +229,122 @@ async def comment_node(state: PRState) -> Command[Literal["supervisor"]]:
 async def react_node(state: PRState) -> Command[Literal["supervisor", END]]:
     code_analysis = state.get("analysis", "")
     comments = state.get("comments", [])
+    triage = state.get("triage") or {}
 
-    decision_message = await run_react_agent(code_analysis, comments)
-    # Color green if merge, red if not
-    if "YES, it is safe to merge" in decision_message:
-        color = COLORS["merge_green"]
-    elif "NO, do not merge" in decision_message:
-        color = COLORS["merge_red"]
+    if triage.get("route") == LIGHT or triage.get("syntax_comments"):
+        # Small changes, and PRs with files that do not parse, are decided by the rules tool without an LLM call
+        decision_message = rules_decision(triage, comments)
+        decision = {**parse_decision(decision_message), "source": "rules", "message": decision_message}
+    else:
+        decision = await make_merge_decision(code_analysis, comments, plan=state.get("model_plan"))
+        decision_message = decision["message"]
+    log_event(
+        logger, logging.INFO, "decision.made", stage="react",
+        verdict=decision["verdict"], source=decision["source"], risk=decision.get("risk"),
+    )
+    return Command(
+        update={"merge_decision": decision_message, "decision": decision, "step": "react"},
+        goto="supervisor"
+    )
+
+async def publish_node(state: PRState) -> Command[Literal["supervisor"]]:
+    try:
+        publication = await publish_review(state)
+    except Exception as e:
+        NODE_ERRORS.labels("publish").inc()
+        log_event(logger, logging.ERROR, "review.publish_failed", stage="publish", error=repr(e))
+        publication = {"status": "failed", "error": repr(e)}
     else:
-        color = COLORS["react"]
-    print(color_block(f"\n[REACT AGENT]\n{decision_message}", color))
+        log_event(
+            logger, logging.INFO, "review.published", stage="publish",
+            status=publication["status"], head_sha=publication.get("head_sha"),
+            review_event=publication.get("event"), inline=publication.get("inline_comments"),
+            general=publication.get("general_comments"), url=publication.get("url"),
+            **{f"dropped_{key}": count for key, count in (publication.get("dropped") or {}).items()},
+        )
     return Command(
-        update={"merge_decision": decision_message, "step": "react"},
+        update={"publication": publication, "step": "publish"},
         goto="supervisor"
     )
 
-async def supervisor_node(state: PRState) -> Command[Literal["fetch", "analyze", "comment", "react", END]]:
+async def supervisor_node(state: PRState) -> Command[Literal["fetch", "triage", "analyze", "comment", "react", "publish", END]]:
     current_step = state.get("step")
     has_code_changes = state.get("has_code_changes", False)
-    output = []
-    output.append("\n======== SUPERVISOR NODE ========")
+    # A finished review is posted to the PR when publishing is enabled
+    finish = "publish" if PUBLISH_ENABLED else END
 
     if current_step is None:
-        output.append("[Supervisor] Starting workflow. Routing to PR RETRIEVER agent.")
-        print(color_block('\n'.join(output), COLORS["supervisor"]))
-        return Command(update={}, goto="fetch")
-
+        next_step = "fetch"
     elif current_step == "fetch":
-        output.append("[Supervisor] Data fetched.")
-        if has_code_changes:
-            output.append("Code changes detected. Routing to CODE ANALYZER agent.")
-            next_step = "analyze"
+        next_step = "triage"
+    elif current_step == "triage":
+        if state["triage"]["route"] == RULES:
+            # Triage settled the PR by rules
+            next_step = finish
         else:
-            output.append("No code changes detected. Routing directly to PR REVIEWER agent.")
-            next_step = "comment"
-        print(color_block('\n'.join(output), COLORS["supervisor"]))
-        return Command(update={}, goto=next_step)
-
+            next_step = "analyze" if has_code_changes else "comment"
     elif current_step == "analyze":
-        output.append("[Supervisor] Analysis complete. Routing to PR REVIEWER agent.")
-        print(color_block('\n'.join(output), COLORS["supervisor"]))
-        return Command(update={}, goto="comment")
-
+        next_step = "comment"
     elif current_step == "comment":
-        output.append("[Supervisor] Comments generated.")
-        pr_data = state.get("pr_data", {})
-        comments = state.get("comments", [])
-        analysis = state.get("analysis", "No code analysis for non-code changes.")
-
-        if has_code_changes:
-            output.append("Code changes present, routing to DECISION MAKER agent.")
-            print(color_block('\n'.join(output), COLORS["supervisor"]))
-            return Command(update={}, goto="react")
-        else:
-            output.append("No code changes, ending workflow with final summary.")
-            # Build final summary for non-code changes
-            summary = []
-            summary.append("\n======== FINAL REVIEW SUMMARY ========")
-            summary.append("\n--- PR DETAILS ---")
-            summary.append(print_pr_structured(pr_data, return_str=True))
-            summary.append("\n--- REVIEW COMMENTS ---")
-            for comment in comments:
-                summary.append(f"- {comment['comment_type'].upper()} [{comment.get('file_path')}:{comment.get('line_number')}]")
-                summary.append(f"  {comment['content']}\n")
-            summary.append("\n--- MERGE DECISION ---")
-            summary.append(color_block("After reviewing your pull request, I am happy to inform you that the changes have been successfully reviewed and are ready to be merged.", COLORS["merge_green"]))
-            summary.append("====================================\n")
-
-            print(color_block('\n'.join(output), COLORS["supervisor"]))
-            return Command(update={"review_summary": '\n'.join(summary)}, goto=END)
-
+        # Non-code changes end without a merge decision
+        next_step = "react" if has_code_changes else finish
     elif current_step == "react":
-        pr_data = state.get("pr_data", {})
-        analysis = state.get("analysis", "No analysis available.")
-        comments = state.get("comments", [])
-        merge_decision = state.get("merge_decision", "")
-        if "YES, it is safe to merge" in merge_decision:
-            merge_color = COLORS["merge_green"]
-        elif "NO, do not merge" in merge_decision:
-            merge_color = COLORS["merge_red"]
-        else:
-            merge_color = COLORS["react"]
-        summary = []
-        summary.append("\n======== FINAL REVIEW SUMMARY ========")
-        summary.append("\n--- PR DETAILS ---")
-        summary.append(print_pr_structured(pr_data, return_str=True))
-        summary.append("\n--- CODE ANALYSIS ---")
-        summary.append(analysis)
-        summary.append("\n--- REVIEW COMMENTS ---")
-        for comment in comments:
-            summary.append(f"- {comment['comment_type'].upper()} [{comment.get('file_path')}:{comment.get('line_number')}]")
-            summary.append(f"  {comment['content']}\n")
-        summary.append("\n--- MERGE DECISION ---")
-        summary.append(color_block(merge_decision, merge_color))
-        summary.append("====================================\n")
-        print(color_block('\n'.join(output), COLORS["supervisor"]))
-        return Command(update={"review_summary": '\n'.join(summary)}, goto=END)
-
+        next_step = finish
+    elif current_step == "publish":
+        next_step = END
     else:
-        output.append(f"[Supervisor] Unknown step: {current_step}. Ending workflow.")
-        print(color_block('\n'.join(output), COLORS["error"]))
+        log_event(logger, logging.ERROR, "supervisor.unknown_step", stage="supervisor", step=current_step)
         return Command(update={}, goto=END)
+    log_event(logger, logging.DEBUG, "supervisor.route", stage="supervisor", step=current_step, goto=next_step)
+    return Command(update={}, goto=next_step)
+
+def create_pr_workflow(checkpointer=None):
+    def node(name, fn):
+        # Superseded reviews stop before the next node; the check is not counted as node time
+        return cancellable_node(name, instrument_node(name, fn))
 
-def create_pr_workflow():
     workflow = StateGraph(PRState)
-    workflow.add_node("supervisor", supervisor_node)
-    workflow.add_node("fetch", fetch_node)
-    workflow.add_node("analyze", analyze_node)
-    workflow.add_node("comment", comment_node)
-    workflow.add_node("react", react_node)
+    workflow.add_node("supervisor", node("supervisor", supervisor_node))
+    workflow.add_node("fetch", node("fetch", fetch_node))
+    workflow.add_node("triage", node("triage", triage_node))
+    workflow.add_node("analyze", node("analyze", analyze_node))
+    workflow.add_node("comment", node("comment", comment_node))
+    workflow.add_node("react", node("react", react_node))
+    workflow.add_node("publish", node("publish", publish_node))
     workflow.add_edge(START, "supervisor")
     workflow.add_edge("fetch", "supervisor")
+    workflow.add_edge("triage", "supervisor")
     workflow.add_edge("analyze", "supervisor")
     workflow.add_edge("comment", "supervisor")
     workflow.add_edge("react", "supervisor")
+    workflow.add_edge("publish", "supervisor")
     workflow.set_entry_point("supervisor")
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
-def print_pr_structured(pr: Dict, return_str=False):
-    lines = []
-    lines.append("======== PR DETAILS ========")
-    lines.append(f"PR #{pr.get('pr_number')}: {pr.get('pr_title', 'Unknown')}")
-    lines.append(f"Author: {pr.get('pr_author', 'Unknown')}")
-    lines.append(f"State: {pr.get('pr_state', 'Unknown')}")
-    lines.append(f"URL: {pr.get('pr_url', '')}")
-    lines.append(f"\nDescription:\n{pr.get('pr_description', '')}\n")
-    lines.append("--- FILES CHANGED ---")
-    for f in pr.get("pr_files", []):
-        lines.append(f"- {f.get('filename', '')} ({f.get('status', '')}) [+{f.get('additions', 0)}/-{f.get('deletions', 0)}]")
-    lines.append("\n--- COMMITS ---")
-    for c in pr.get("pr_commits", []):
-        sha_short = c.get('sha','')[:7]
-        author = c.get('author','')
-        msg_line = c.get('message','').splitlines()[0] if c.get('message') else ''
-        lines.append(f"- {sha_short} by {author}: {msg_line}")
-    if pr.get("pr_diff"):
-        lines.append("\n--- DIFF (First 200 chars) ---")
-        lines.append(pr["pr_diff"][:200])
-    lines.append("============================\n")
-    if return_str:
-        return '\n'.join(lines)
-    print('\n'.join(lines))
+def build_initial_state(repo_owner: str, repo_name: str, pr_number: int) -> PRState:
+    return {
+        "repo_owner": repo_owner,
+        "repo_name": repo_name,
+        "pr_number": pr_number,
+        "messages": [{
+            "role": "system",
+            "content": f"Starting PR analysis for {repo_owner}/{repo_name} PR #{pr_number}"
+        }]
+    }
+
+_PR_WORKFLOW = None
+
+def get_pr_workflow():
+    """Returns the process-wide compiled workflow, compiling it on first use."""
+    global _PR_WORKFLOW
+    if _PR_WORKFLOW is None:
+        _PR_WORKFLOW = create_pr_workflow()
+    return _PR_WORKFLOW
 
 async def get_latest_open_pr_number(repo_owner, repo_name):
     prs = await list_prs(repo_owner, repo_name, state="open")
     if not prs:
-        print(color_block(f"No open PRs found in {repo_owner}/{repo_name}", COLORS["error"]))
+        log_event(logger, logging.WARNING, "prs.none_open", repo=f"{repo_owner}/{repo_name}")
         return None
     return sorted(
         prs,
@@ -244,20 +355,12 @@ async def get_latest_open_pr_number(repo_owner, repo_name):
 async def run_workflow():
     pr_number = await get_latest_open_pr_number(REPO_OWNER, REPO_NAME)
     if not pr_number:
-        print(color_block("No open PR to analyze.", COLORS["error"]))
         return
-    state = {
-        "repo_owner": REPO_OWNER,
-        "repo_name": REPO_NAME,
-        "pr_number": pr_number,
-        "messages": [{
-            "role": "system",
-            "content": f"Starting PR analysis for {REPO_OWNER}/{REPO_NAME} PR #{pr_number}"
-        }]
-    }
-    workflow = create_pr_workflow()
-    result = await workflow.ainvoke(state)
-    print(result.get("review_summary", "No summary available"))
+    state = build_initial_state(REPO_OWNER, REPO_NAME, pr_number)
+    workflow = get_pr_workflow()
+    with bind_review(pr=f"{REPO_OWNER}/{REPO_NAME}#{pr_number}"):
+        result = await workflow.ainvoke(state)
+    print(render_review_summary(result, color=True))
 
 if __name__ == "__main__":
     asyncio.run(run_workflow())
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Bulk review of many PRs: every open PR of one or more repositories and/or an
+explicit list of PR URLs. Reviews run concurrently under a global limit and a
+per-repository limit, results are yielded as each PR finishes, and a summary
+reports throughput and latency percentiles.
+
+Usage:
+    python -m src.orchestrator.batch_review --repo owner/name
+    python -m src.orchestrator.batch_review --pr-url https://github.com/o/r/pull/1 --pr-url ...
+"""
+
+import time
+import json
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from src.orchestrator.agent_orchestrator import build_initial_state
+from src.orchestrator.checkpoints import CHECKPOINTS, run_review
+from src.orchestrator.single_flight import SINGLE_FLIGHT
+from src.tools.github_mcp_tool import list_prs
+from src.utils.config_loader import read_base_config
+from src.utils.review_render import render_review_summary
+from src.utils.github_urls import parse_github_pr_url, parse_github_repo
+
+BATCH_CONFIG = read_base_config().get("BATCH", {})
+
+PRTarget = Tuple[str, str, int]
+
+
+async def resolve_targets(repos: Iterable[str] = (), pr_urls: Iterable[str] = ()) -> List[PRTarget]:
+    """Expands repositories to their open PRs and parses PR URLs, dropping duplicates."""
+    targets: List[PRTarget] = [parse_github_pr_url(url) for url in pr_urls]
+    parsed_repos = [parse_github_repo(repo) for repo in repos]
+    listings = await asyncio.gather(*(list_prs(owner, name, state="open") for owner, name in parsed_repos))
+    for (owner, name), prs in zip(parsed_repos, listings):
+        targets.extend((owner, name, int(pr["number"])) for pr in prs if pr.get("number"))
+    return list(dict.fromkeys(targets))
+
+
+async def review_pr(repo_owner: str, repo_name: str, pr_number: int) -> Dict:
+    start = time.perf_counter()
+    record = {"repo_owner": repo_owner, "repo_name": repo_name, "pr_number": pr_number}
+    try:
+        state = build_initial_state(repo_owner, repo_name, pr_number)
+        key = await SINGLE_FLIGHT.make_key(repo_owner, repo_name, pr_number)
+        result = await SINGLE_FLIGHT.run(key, lambda: run_review(state, key))
+        record.update({
+            "status": "completed",
+            "merge_decision": result.get("merge_decision"),
+            "decision": result.get("decision"),
+            "publication": result.get("publication"),
+            "tokens_saved": (result.get("token_report") or {}).get("tokens_saved", 0),
+            "final_review_summary": render_review_summary(result),
+        })
+    except Exception as e:
+        record.update({"status": "failed", "error": f"Workflow error: {e}"})
+    record["latency_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class BatchStats:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.latencies: List[float] = []
+        self.completed = 0
+        self.failed = 0
+        self.tokens_saved = 0
+
+    def record(self, result: Dict):
+        self.latencies.append(result["latency_seconds"])
+        if result["status"] == "completed":
+            self.completed += 1
+            self.tokens_saved += result.get("tokens_saved", 0)
+        else:
+            self.failed += 1
+
+    def summary(self) -> Dict:
+        wall = time.perf_counter() - self.started_at
+        total = self.completed + self.failed
+        return {
+            "total": total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wall_seconds": round(wall, 3),
+            "throughput_per_minute": round(total / wall * 60, 2) if wall > 0 else 0.0,
+            "diff_tokens_saved": self.tokens_saved,
+            "latency_seconds": {
+                name: round(value, 3) if value is not None else None
+                for name, value in (
+                    ("p50", percentile(self.latencies, 50)),
+                    ("p90", percentile(self.latencies, 90)),
+                    ("p95", percentile(self.latencies, 95)),
+                    ("p99", percentile(self.latencies, 99)),
+                    ("max", max(self.latencies) if self.latencies else None),
+                )
+            },
+        }
+
+
+async def iter_batch_reviews(
+    targets: List[PRTarget],
+    global_limit: Optional[int] = None,
+    per_repo_limit: Optional[int] = None,
+    stats: Optional[BatchStats] = None,
+) -> AsyncIterator[Dict]:
+    """Reviews all targets concurrently and yields each result as soon as it finishes."""
+    global_semaphore = asyncio.Semaphore(global_limit or BATCH_CONFIG.get("global_limit", 8))
+    repo_limit = per_repo_limit or BATCH_CONFIG.get("per_repo_limit", 4)
+    repo_semaphores = defaultdict(lambda: asyncio.Semaphore(repo_limit))
+
+    async def bounded(target: PRTarget) -> Dict:
+        owner, name, number = target
+        async with repo_semaphores[(owner.lower(), name.lower())], global_semaphore:
+            return await review_pr(owner, name, number)
+
+    tasks = [asyncio.create_task(bounded(target)) for target in targets]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if stats is not None:
+                stats.record(result)
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_batch(args):
+    targets = await resolve_targets(args.repo, args.pr_url)
+    if not targets:
+        print("No PRs to review.")
+        return
+    print(f"Reviewing {len(targets)} PR(s)...")
+    stats = BatchStats()
+    output = open(args.output, "w") if args.output else None
+    try:
+        async for result in iter_batch_reviews(targets, args.global_limit, args.per_repo_limit, stats):
+            print(f"[{result['status'].upper()}] {result['repo_owner']}/{result['repo_name']}#{result['pr_number']} "
+                  f"in {result['latency_seconds']}s")
+            if output:
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+    finally:
+        if output:
+            output.close()
+        await CHECKPOINTS.close()
+    print(json.dumps(stats.summary(), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", action="append", default=[], help="owner/name; reviews all open PRs (repeatable)")
+    parser.add_argument("--pr-url", action="append", default=[], help="GitHub PR URL (repeatable)")
+    parser.add_argument("--global-limit", type=int, default=None, help="Max concurrent reviews overall")
+    parser.add_argument("--per-repo-limit", type=int, default=None, help="Max concurrent reviews per repository")
+    parser.add_argument("--output", help="Write one JSON result per line to this file")
+    args = parser.parse_args()
+    if not args.repo and not args.pr_url:
+        parser.error("Provide at least one --repo or --pr-url.")
+    asyncio.run(run_batch(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Cooperative cancellation of review runs.
+
+A run bound to a CancelToken with cancel_scope() checks the token before
+every workflow node (see cancellable_node) and raises ReviewCancelled once
+it is cancelled, so a node that already started finishes its LLM calls but
+no further node runs. Used to drop reviews of a head SHA a newer push has
+superseded.
+"""
+
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class ReviewCancelled(Exception):
+    """Raised between workflow nodes when the run's token was cancelled."""
+
+
+class CancelToken:
+    def __init__(self):
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.reason is None:
+            self.reason = reason
+
+    def raise_if_cancelled(self, stage: Optional[str] = None):
+        if self.reason is not None:
+            raise ReviewCancelled(f"{self.reason} (before {stage})" if stage else self.reason)
+
+
+class CancelGroup(CancelToken):
+    """
+    Token of a run shared by several callers (see single_flight). It counts as
+    cancelled only once every caller's token is; a caller without a token
+    keeps the run going.
+    """
+
+    def __init__(self):
+        self.tokens: List[Optional[CancelToken]] = []
+
+    def add(self, token: Optional[CancelToken]):
+        self.tokens.append(token)
+
+    @property
+    def reason(self) -> Optional[str]:
+        if not self.tokens or any(token is None or not token.cancelled for token in self.tokens):
+            return None
+        return self.tokens[-1].reason
+
+    def cancel(self, reason: str = "cancelled"):
+        for token in self.tokens:
+            if token is not None:
+                token.cancel(reason)
+
+
+# Token of the review the current task works on; tasks started inside the scope inherit it
+CANCEL_TOKEN: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    context = CANCEL_TOKEN.set(token)
+    try:
+        yield token
+    finally:
+        CANCEL_TOKEN.reset(context)
+
+
+def raise_if_cancelled(stage: Optional[str] = None):
+    token = CANCEL_TOKEN.get()
+    if token is not None:
+        token.raise_if_cancelled(stage)
+
+
+def cancellable_node(name: str, node):
+    """Wraps a workflow node so it does not start once the run's token is cancelled."""
+    @functools.wraps(node)
+    async def wrapper(state):
+        raise_if_cancelled(name)
+        return await node(state)
+    return wrapper
@@ -0,0 +1,317 @@
+"""
+Durable checkpoints of review runs, so a failed review resumes from the last
+completed node instead of starting over.
+
+Reviews run through review_run() use a workflow compiled with a SQLite
+checkpointer and a thread ID per PR revision (owner/repo#number@head_sha).
+When a node raises (a timeout, a provider 5xx), the state saved after the
+last completed node stays on disk; the next review of the same revision
+resumes there, so fetch and analyze are not paid for twice. Completed and
+cancelled runs delete their thread, and failed threads are pruned by age
+and count.
+
+Usage:
+    python -m src.orchestrator.checkpoints list
+    python -m src.orchestrator.checkpoints prune --max-age-hours 24 --max-threads 200
+"""
+
+import os
+import time
+import json
+import asyncio
+import logging
+import argparse
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from src.orchestrator.agent_orchestrator import create_pr_workflow, get_pr_workflow
+from src.orchestrator.cancellation import ReviewCancelled
+from src.orchestrator.single_flight import ReviewKey
+from src.utils.config_loader import read_base_config
+from src.utils.review_log import bind_review, get_logger, log_event
+
+RUNNING = "running"
+FAILED = "failed"
+
+logger = get_logger("checkpoints")
+
+
+def make_thread_id(key: ReviewKey) -> str:
+    repo_owner, repo_name, pr_number, head_sha = key
+    return f"{repo_owner}/{repo_name}#{pr_number}@{head_sha}"
+
+
+class ReviewRun:
+    """One review execution: a fresh run, or the resumption of a failed one."""
+
+    def __init__(self, workflow, state: Optional[Dict], config: Optional[Dict] = None,
+                 durability: Optional[str] = None, resumed: bool = False):
+        self.workflow = workflow
+        # None resumes from the thread's last checkpoint
+        self.input = state
+        self.config = config
+        self.resumed = resumed
+        self._kwargs = {"durability": durability} if durability else {}
+
+    async def ainvoke(self) -> Dict:
+        return await self.workflow.ainvoke(self.input, self.config, **self._kwargs)
+
+    def astream(self, **kwargs):
+        return self.workflow.astream(self.input, self.config, **self._kwargs, **kwargs)
+
+    async def values(self, streamed: Dict) -> Dict:
+        """Full final state; streamed updates alone miss what ran before a resume."""
+        if self.config is None:
+            return streamed
+        return (await self.workflow.aget_state(self.config)).values
+
+
+class ReviewCheckpoints:
+    def __init__(
+        self,
+        path: str = ".cache/checkpoints.sqlite",
+        enabled: bool = True,
+        max_threads: int = 200,
+        max_age_seconds: float = 24 * 3600,
+        durability: str = "exit",
+        prune_interval_seconds: float = 300,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.max_threads = max_threads
+        self.max_age_seconds = max_age_seconds
+        # "exit" writes once when a run ends; "async"/"sync" write after every node
+        self.durability = durability
+        self.prune_interval_seconds = prune_interval_seconds
+        self.resumed = 0
+        self.failed = 0
+        self.completed = 0
+        self.pruned = 0
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._saver: Optional[AsyncSqliteSaver] = None
+        self._workflow = None
+        self._lock = asyncio.Lock()
+        self._last_prune = 0.0
+
+    async def start(self):
+        async with self._lock:
+            if self._conn is not None:
+                return
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = await aiosqlite.connect(self.path)
+            # Only takes effect on a new file; lets prune() hand pages back to the OS
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS review_threads ("
+                "thread_id TEXT PRIMARY KEY, repo_owner TEXT, repo_name TEXT, pr_number INTEGER, "
+                "head_sha TEXT, status TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL, updated_at REAL)"
+            )
+            await conn.commit()
+            saver = AsyncSqliteSaver(conn)
+            await saver.setup()
+            # review_threads shares the saver's connection, so statements on it hold saver.lock;
+            # otherwise a commit can land while a saver cursor is still open
+            self._conn, self._saver = conn, saver
+            self._workflow = create_pr_workflow(checkpointer=saver)
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+        self._conn = self._saver = self._workflow = None
+
+    async def workflow(self):
+        await self.start()
+        return self._workflow
+
+    async def _record(self, thread_id: str, key: ReviewKey, status: str):
+        now = time.time()
+        async with self._saver.lock:
+            await self._conn.execute(
+                "INSERT INTO review_threads (thread_id, repo_owner, repo_name, pr_number, head_sha, status, attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+                "attempts = attempts + (excluded.status = 'running')",
+                (thread_id, *key, status, now, now)
+            )
+            await self._conn.commit()
+
+    async def delete_thread(self, thread_id: str):
+        await self.start()
+        await self._saver.adelete_thread(thread_id)
+        async with self._saver.lock:
+            await self._conn.execute("DELETE FROM review_threads WHERE thread_id = ?", (thread_id,))
+            await self._conn.commit()
+
+    async def list_threads(self) -> List[Dict]:
+        await self.start()
+        async with self._saver.lock, self._conn.execute(
+            "SELECT t.thread_id, t.status, t.attempts, t.created_at, t.updated_at, "
+            "COUNT(c.checkpoint_id), COALESCE(SUM(LENGTH(c.checkpoint)), 0) "
+            "FROM review_threads t LEFT JOIN checkpoints c ON c.thread_id = t.thread_id "
+            "GROUP BY t.thread_id ORDER BY t.updated_at DESC"
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {
+                "thread_id": thread_id, "status": status, "attempts": attempts,
+                "created_at": created_at, "updated_at": updated_at,
+                "checkpoints": checkpoints, "bytes": size,
+            }
+            for thread_id, status, attempts, created_at, updated_at, checkpoints, size in rows
+        ]
+
+    async def prune(self, max_age_seconds: Optional[float] = None, max_threads: Optional[int] = None) -> Dict:
+        """
+        Deletes threads older than max_age_seconds or beyond the max_threads most
+        recent, plus checkpoints left by runs that never recorded a thread, and
+        keeps only the latest checkpoint of every failed thread.
+        """
+        await self.start()
+        max_age_seconds = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        max_threads = self.max_threads if max_threads is None else max_threads
+        cutoff = time.time() - max_age_seconds
+
+        async with self._saver.lock:
+            async with self._conn.execute("SELECT thread_id, updated_at FROM review_threads ORDER BY updated_at DESC") as cursor:
+                rows = await cursor.fetchall()
+            stale = [thread_id for i, (thread_id, updated_at) in enumerate(rows) if updated_at < cutoff or i >= max_threads]
+            async with self._conn.execute(
+                "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id NOT IN (SELECT thread_id FROM review_threads)"
+            ) as cursor:
+                stale.extend(row[0] for row in await cursor.fetchall())
+        for thread_id in stale:
+            await self.delete_thread(thread_id)
+
+        # Resuming needs only the newest root checkpoint and its pending writes
+        async with self._saver.lock:
+            cursor = await self._conn.execute(
+                "DELETE FROM checkpoints WHERE checkpoint_ns = '' "
+                "AND thread_id IN (SELECT thread_id FROM review_threads WHERE status = ?) "
+                "AND checkpoint_id < (SELECT MAX(c.checkpoint_id) FROM checkpoints c "
+                "WHERE c.thread_id = checkpoints.thread_id AND c.checkpoint_ns = '')",
+                (FAILED,)
+            )
+            compacted = cursor.rowcount
+            await self._conn.execute(
+                "DELETE FROM writes WHERE checkpoint_ns = '' AND NOT EXISTS (SELECT 1 FROM checkpoints c "
+                "WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = '' AND c.checkpoint_id = writes.checkpoint_id)"
+            )
+            await self._conn.commit()
+            await self._conn.execute("PRAGMA incremental_vacuum")
+            await self._conn.commit()
+        self.pruned += len(stale)
+        self._last_prune = time.monotonic()
+        return {"threads_deleted": len(stale), "checkpoints_compacted": compacted}
+
+    async def maybe_prune(self):
+        if time.monotonic() - self._last_prune >= self.prune_interval_seconds:
+            try:
+                await self.prune()
+            except Exception as e:
+                log_event(logger, logging.WARNING, "checkpoints.prune_failed", error=repr(e))
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "durability": self.durability,
+            "resumed": self.resumed,
+            "failed": self.failed,
+            "completed": self.completed,
+            "pruned": self.pruned,
+        }
+
+
+_CHECKPOINT_CONFIG = read_base_config().get("CHECKPOINTS", {})
+CHECKPOINTS = ReviewCheckpoints(
+    path=_CHECKPOINT_CONFIG.get("path", ".cache/checkpoints.sqlite"),
+    enabled=_CHECKPOINT_CONFIG.get("enabled", True),
+    max_threads=_CHECKPOINT_CONFIG.get("max_threads", 200),
+    max_age_seconds=_CHECKPOINT_CONFIG.get("max_age_hours", 24) * 3600,
+    durability=_CHECKPOINT_CONFIG.get("durability", "exit"),
+    prune_interval_seconds=_CHECKPOINT_CONFIG.get("prune_interval_seconds", 300),
+)
+
+
+@asynccontextmanager
+async def review_run(state: Dict, key: ReviewKey, review_id: Optional[str] = None) -> AsyncIterator[ReviewRun]:
+    """
+    Yields the run to execute for state. With checkpoints enabled and a known
+    head SHA, a failed earlier run of the same revision is resumed; the thread
+    is kept if this run fails too and deleted once it completes. Logs inside
+    the block carry review_id (a new one if not given) and the PR.
+    """
+    with bind_review(review_id, pr=f"{state['repo_owner']}/{state['repo_name']}#{state['pr_number']}"):
+        async with _review_run(state, key) as run:
+            yield run
+
+
+@asynccontextmanager
+async def _review_run(state: Dict, key: ReviewKey) -> AsyncIterator[ReviewRun]:
+    if not CHECKPOINTS.enabled or not key[3]:
+        yield ReviewRun(get_pr_workflow(), state)
+        return
+
+    workflow = await CHECKPOINTS.workflow()
+    thread_id = make_thread_id(key)
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await workflow.aget_state(config)
+    resumed = bool(snapshot.next)
+    if resumed:
+        CHECKPOINTS.resumed += 1
+        log_event(logger, logging.INFO, "checkpoint.resumed", thread_id=thread_id, next=list(snapshot.next))
+    elif snapshot.values:
+        # A finished run whose thread was not cleaned up; start over
+        await CHECKPOINTS.delete_thread(thread_id)
+    await CHECKPOINTS._record(thread_id, key, RUNNING)
+
+    try:
+        yield ReviewRun(workflow, None if resumed else state, config, CHECKPOINTS.durability, resumed)
+    except ReviewCancelled:
+        # A superseded revision is not reviewed again, so there is nothing to resume
+        await CHECKPOINTS.delete_thread(thread_id)
+        raise
+    except BaseException:
+        CHECKPOINTS.failed += 1
+        await CHECKPOINTS._record(thread_id, key, FAILED)
+        raise
+    else:
+        CHECKPOINTS.completed += 1
+        await CHECKPOINTS.delete_thread(thread_id)
+    finally:
+        await CHECKPOINTS.maybe_prune()
+
+
+async def run_review(state: Dict, key: ReviewKey, review_id: Optional[str] = None) -> Dict:
+    """Runs (or resumes) a review to completion and returns the final state."""
+    async with review_run(state, key, review_id) as run:
+        return await run.ainvoke()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list saved review threads")
+    prune = sub.add_parser("prune", help="delete old threads and compact the rest")
+    prune.add_argument("--max-age-hours", type=float, default=None)
+    prune.add_argument("--max-threads", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            for thread in await CHECKPOINTS.list_threads():
+                print(json.dumps(thread))
+        else:
+            max_age = args.max_age_hours * 3600 if args.max_age_hours is not None else None
+            print(json.dumps(await CHECKPOINTS.prune(max_age, args.max_threads)))
+    finally:
+        await CHECKPOINTS.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,297 @@
+"""
+Posts a finished review back to the PR as a single GitHub review.
+
+Inline comments are anchored by diff position: each file with comments gets
+an index from new-file line to position, built from its parsed hunks
+(diff_parser.new_line_positions), and comments on lines the diff does not
+show are dropped. Duplicates are dropped too, both within the review and
+against comments an earlier review of the PR already posted. The remaining
+inline comments, the merge verdict and the comments that name no line (in
+the review body) go out in one create-review call, pinned to the reviewed
+head commit, so publishing writes one GitHub request however many comments
+there are.
+
+Each review body ends with a hidden marker naming the head SHA and the
+comment keys it posted. Before publishing, the PR's existing reviews are
+read back and their markers merged into the in-process PublishLog, so a
+head SHA is published at most once and comments are not repeated across
+restarts and workers. Two workers publishing the same head at the same
+moment can still both post; the log only serializes publishes within one
+process.
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.tools.github_mcp_tool import create_pr_review, list_pr_reviews
+from src.tools.react_tool import parse_decision
+from src.utils.config_loader import read_base_config
+from src.utils.diff_parser import parse_diff, new_line_positions
+from src.utils.metrics import PUBLISHED_COMMENTS
+from src.utils.review_log import get_logger, log_event
+
+logger = get_logger("publish")
+
+PUBLISH_CONFIG = read_base_config().get("PUBLISH", {})
+PUBLISH_ENABLED = PUBLISH_CONFIG.get("enabled", False)
+# GitHub accepts large reviews, but a wall of bot comments helps nobody
+MAX_INLINE_COMMENTS = PUBLISH_CONFIG.get("max_comments", 50)
+# Review event per verdict; APPROVE and REQUEST_CHANGES fail on the token owner's own PRs
+EVENTS = {"merge": "COMMENT", "do_not_merge": "REQUEST_CHANGES", **PUBLISH_CONFIG.get("events", {})}
+
+SEVERITY_ORDER = {"critical": 0, "major": 1, "minor": 2, "trivial": 3}
+
+# Hidden in the review body; lets later runs recognize what was already posted
+MARKER = re.compile(r"<!-- pr-review-agent head=(?P<head>[0-9a-f]+) keys=(?P<keys>[0-9a-f,]*) -->")
+
+PRKey = Tuple[str, str, int]
+
+
+def comment_key(path: str, line: Optional[int], content: str) -> str:
+    """Identity of a comment for deduplication: where it points and what it says, ignoring case and spacing."""
+    text = " ".join(content.lower().split())
+    return hashlib.sha1(f"{path}\0{line}\0{text}".encode("utf-8")).hexdigest()[:16]
+
+
+def _location(comment: Dict) -> Tuple[str, Optional[int]]:
+    path = (comment.get("file_path") or "").strip()
+    for prefix in ("./", "/"):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+    try:
+        line = int(comment.get("line_number"))
+    except (TypeError, ValueError):
+        line = None
+    return path, line
+
+
+def _comment_body(comment: Dict) -> str:
+    label = (comment.get("comment_type") or "comment").capitalize()
+    severity = comment.get("severity")
+    return f"**{label}**{f' ({severity})' if severity else ''}: {(comment.get('content') or '').strip()}"
+
+
+def review_marker(head_sha: str, keys: Iterable[str]) -> str:
+    return f"<!-- pr-review-agent head={head_sha} keys={','.join(keys)} -->"
+
+
+def published_history(reviews: List[Dict]) -> Tuple[Set[str], Set[str]]:
+    """Head SHAs and comment keys recorded in the markers of a PR's existing reviews."""
+    heads: Set[str] = set()
+    keys: Set[str] = set()
+    for review in reviews:
+        match = MARKER.search((review or {}).get("body") or "")
+        if match:
+            heads.add(match.group("head"))
+            keys.update(key for key in match.group("keys").split(",") if key)
+    return heads, keys
+
+
+def build_review(files: Dict[str, Dict], comments: List[Dict], verdict: Optional[str], merge_decision: Optional[str],
+                 posted: Iterable[str] = (), head_sha: str = "") -> Dict:
+    """
+    The review to create: {"event", "body", "comments": [{"path", "position",
+    "body"}], "keys", "general", "dropped": {"outside_diff", "duplicate", "over_limit"}}.
+    files maps filename to its parsed diff record (with "hunks"); posted holds
+    comment keys an earlier review of the PR already published.
+    """
+    located = [(comment, *_location(comment)) for comment in comments if (comment.get("content") or "").strip()]
+    paths = {path for _, path, line in located if path and line is not None}
+    # Only files that comments point at are indexed
+    index = {path: new_line_positions(files[path].get("hunks") or []) for path in paths if path in files}
+
+    posted = set(posted)
+    seen: Set[str] = set()
+    inline: List[Dict] = []
+    general: List[str] = []
+    keys: List[str] = []
+    dropped = {"outside_diff": 0, "duplicate": 0, "over_limit": 0}
+    # Most severe first, so the cap drops trivia
+    located.sort(key=lambda item: SEVERITY_ORDER.get(item[0].get("severity"), len(SEVERITY_ORDER)))
+    for comment, path, line in located:
+        position = None
+        if path and line is not None:
+            position = index.get(path, {}).get(line)
+            if position is None:
+                dropped["outside_diff"] += 1
+                continue
+        key = comment_key(path, line, comment["content"])
+        if key in seen or key in posted:
+            dropped["duplicate"] += 1
+            continue
+        if position is not None and len(inline) >= MAX_INLINE_COMMENTS:
+            dropped["over_limit"] += 1
+            continue
+        seen.add(key)
+        keys.append(key)
+        if position is None:
+            general.append(f"- {f'`{path}`: ' if path else ''}{_comment_body(comment)}")
+        else:
+            inline.append({"path": path, "position": position, "body": _comment_body(comment)})
+
+    body = [f"### Automated review\n\n{merge_decision or 'No merge decision was made for this PR.'}"]
+    if general:
+        body.append("#### General comments\n\n" + "\n".join(general))
+    if dropped["outside_diff"] or dropped["over_limit"]:
+        body.append(
+            f"_{dropped['outside_diff'] + dropped['over_limit']} comment(s) on lines outside the diff "
+            f"or past the limit of {MAX_INLINE_COMMENTS} were not posted._"
+        )
+    if head_sha:
+        body.append(review_marker(head_sha, keys))
+    return {
+        "event": EVENTS.get(verdict, "COMMENT") if verdict else "COMMENT",
+        "body": "\n\n".join(body),
+        "comments": inline,
+        "keys": keys,
+        "general": len(general),
+        "dropped": dropped,
+    }
+
+
+class PublishLog:
+    """
+    Per PR, the head SHAs already published and the keys of comments posted,
+    so retries and resumed runs do not post a review twice and later pushes
+    do not repeat comments. Bounded LRU over PRs, in process memory; seed()
+    merges in what the PR's existing reviews record.
+    """
+
+    def __init__(self, max_prs: int = 1000):
+        self.max_prs = max_prs
+        self._prs: "OrderedDict[PRKey, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.skipped = 0
+        self.failed = 0
+        self.no_head_sha = 0
+        self.history_unavailable = 0
+        self.comments_posted = 0
+
+    @staticmethod
+    def key(repo_owner: str, repo_name: str, pr_number: int) -> PRKey:
+        return (repo_owner.lower(), repo_name.lower(), int(pr_number))
+
+    def seed(self, key: PRKey, head_shas: Iterable[str], comment_keys: Iterable[str]):
+        """Merges head SHAs and comment keys already published on GitHub into the PR's record."""
+        with self._lock:
+            record = self._prs.setdefault(key, {"head_shas": set(), "comment_keys": set()})
+            self._prs.move_to_end(key)
+            record["head_shas"].update(head_shas)
+            record["comment_keys"].update(comment_keys)
+            while len(self._prs) > self.max_prs:
+                self._prs.popitem(last=False)
+
+    def count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def claim(self, key: PRKey, head_sha: str) -> Optional[Set[str]]:
+        """Reserves head_sha for publishing; returns the PR's posted comment keys, or None if it is taken."""
+        with self._lock:
+            record = self._prs.setdefault(key, {"head_shas": set(), "comment_keys": set()})
+            self._prs.move_to_end(key)
+            if head_sha in record["head_shas"]:
+                self.skipped += 1
+                return None
+            record["head_shas"].add(head_sha)
+            while len(self._prs) > self.max_prs:
+                self._prs.popitem(last=False)
+            return set(record["comment_keys"])
+
+    def release(self, key: PRKey, head_sha: str):
+        """Gives a claim back after the review could not be created."""
+        with self._lock:
+            self.failed += 1
+            record = self._prs.get(key)
+            if record is not None:
+                record["head_shas"].discard(head_sha)
+
+    def record(self, key: PRKey, comment_keys: List[str], posted: int):
+        with self._lock:
+            self.published += 1
+            self.comments_posted += posted
+            record = self._prs.get(key)
+            if record is not None:
+                record["comment_keys"].update(comment_keys)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": PUBLISH_ENABLED,
+                "published": self.published,
+                "already_published": self.skipped,
+                "failed": self.failed,
+                "no_head_sha": self.no_head_sha,
+                "history_unavailable": self.history_unavailable,
+                "comments_posted": self.comments_posted,
+                "tracked_prs": len(self._prs),
+            }
+
+
+PUBLISH_LOG = PublishLog(PUBLISH_CONFIG.get("max_tracked_prs", 1000))
+
+
+def _review_link(result) -> Dict:
+    if not isinstance(result, dict):
+        return {}
+    return {"review_id": result.get("id"), "url": result.get("html_url")}
+
+
+async def publish_review(state: Dict) -> Dict:
+    """Publishes the review in a finished workflow state; returns what was posted and dropped."""
+    pr_data = state.get("pr_data") or {}
+    head_sha = pr_data.get("pr_head_sha", "")
+    repo_owner, repo_name, pr_number = state["repo_owner"], state["repo_name"], state["pr_number"]
+    if not head_sha:
+        # Without the head SHA neither the positions nor the at-most-once check can be trusted
+        PUBLISH_LOG.count("no_head_sha")
+        log_event(logger, logging.WARNING, "review.publish_skipped", reason="missing head SHA")
+        return {"status": "skipped", "reason": "missing head SHA"}
+
+    key = PUBLISH_LOG.key(repo_owner, repo_name, pr_number)
+    try:
+        PUBLISH_LOG.seed(key, *published_history(await list_pr_reviews(repo_owner, repo_name, pr_number)))
+    except Exception as e:
+        # Still published; only this process's log guards against repeats
+        PUBLISH_LOG.count("history_unavailable")
+        log_event(logger, logging.WARNING, "review.publish_history_unavailable", error=repr(e))
+    posted = PUBLISH_LOG.claim(key, head_sha)
+    if posted is None:
+        return {"status": "already_published", "head_sha": head_sha}
+
+    merge_decision = state.get("merge_decision")
+    decision = state.get("decision") or (parse_decision(merge_decision) if merge_decision else {})
+    # Reuses the diff parsed by triage; runs checkpointed before that parse it here
+    files = state.get("file_changes")
+    if files is None:
+        files = parse_diff(pr_data.get("pr_diff", ""))
+    review = build_review(
+        files, state.get("comments") or [], decision.get("verdict"), merge_decision, posted, head_sha
+    )
+    try:
+        result = await create_pr_review(
+            repo_owner, repo_name, pr_number,
+            body=review["body"], event=review["event"], comments=review["comments"], commit_id=head_sha
+        )
+    except Exception:
+        PUBLISH_LOG.release(key, head_sha)
+        raise
+    PUBLISH_LOG.record(key, review["keys"], len(review["comments"]))
+    PUBLISHED_COMMENTS.labels("inline").inc(len(review["comments"]))
+    PUBLISHED_COMMENTS.labels("general").inc(review["general"])
+    for outcome, count in review["dropped"].items():
+        PUBLISHED_COMMENTS.labels(outcome).inc(count)
+    return {
+        "status": "published",
+        "head_sha": head_sha,
+        "event": review["event"],
+        "inline_comments": len(review["comments"]),
+        "general_comments": review["general"],
+        "dropped": review["dropped"],
+        **_review_link(result),
+    }
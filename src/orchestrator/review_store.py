@@ -0,0 +1,40 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.utils.config_loader import read_base_config
+
+class ReviewStore:
+    """
+    Remembers, per PR, the last reviewed head SHA and each file's diff
+    fingerprint with its analysis, so a new push only re-analyzes changed files.
+    Bounded LRU over PRs.
+    """
+
+    def __init__(self, max_prs: int = 1000):
+        self.max_prs = max_prs
+        self._reviews: "OrderedDict[Tuple[str, str, int], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(repo_owner: str, repo_name: str, pr_number: int):
+        return (repo_owner.lower(), repo_name.lower(), int(pr_number))
+
+    def get(self, repo_owner: str, repo_name: str, pr_number: int) -> Optional[Dict]:
+        key = self._key(repo_owner, repo_name, pr_number)
+        with self._lock:
+            record = self._reviews.get(key)
+            if record is not None:
+                self._reviews.move_to_end(key)
+            return record
+
+    def save(self, repo_owner: str, repo_name: str, pr_number: int, head_sha: str, files: Dict[str, Dict]):
+        """files maps filename -> {"fingerprint": str, "analysis": str}."""
+        key = self._key(repo_owner, repo_name, pr_number)
+        with self._lock:
+            self._reviews[key] = {"head_sha": head_sha, "files": files}
+            self._reviews.move_to_end(key)
+            while len(self._reviews) > self.max_prs:
+                self._reviews.popitem(last=False)
+
+REVIEW_STORE = ReviewStore(read_base_config().get("REVIEW_STORE", {}).get("max_prs", 1000))
@@ -0,0 +1,75 @@
+"""
+Token-level event stream of one review run.
+
+Runs the workflow with LangGraph's "messages", "updates" and "custom" stream
+modes and turns them into flat events:
+
+- {"type": "node", "node", "step"} when a node finishes
+- {"type": "token", "stage", "file", "text"} for every LLM token of the
+  analyze, comment and react stages; "file" is set for per-file analysis
+- {"type": "comment", "comment"} for each review comment as soon as it is parsed
+- {"type": "decision", ...} with the structured merge decision once made
+- {"type": "resumed"} first, when a failed run of the revision is resumed
+
+Callers add the final result themselves (see /review-pr with "stream").
+"""
+
+import json
+from typing import AsyncIterator, Dict
+
+from src.agents.code_analyzer_agent.code_analyzer import FILE_METADATA_KEY
+from src.orchestrator.checkpoints import review_run
+from src.orchestrator.single_flight import ReviewKey
+
+# Stages whose LLM tokens are forwarded to clients
+STREAMED_STAGES = ("analyze", "comment", "react")
+
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+
+def _stage(metadata: Dict) -> str:
+    # Calls inside a subgraph (the ReAct agent) report the subgraph's node;
+    # the checkpoint namespace starts with the outer workflow node
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    return namespace.split("|")[0].split(":")[0] or metadata.get("langgraph_node", "")
+
+
+async def iter_review_events(state: Dict, key: ReviewKey, final_state: Dict) -> AsyncIterator[Dict]:
+    """Yields the run's events; final_state is filled with the full final state at the end."""
+    async with review_run(state, key) as run:
+        if run.resumed:
+            yield {"type": "resumed"}
+        async for event in _iter_run_events(run, final_state):
+            yield event
+        final_state.update(await run.values(final_state))
+
+
+async def _iter_run_events(run, final_state: Dict) -> AsyncIterator[Dict]:
+    stream = run.astream(stream_mode=["messages", "updates", "custom"], subgraphs=True)
+    async for namespace, mode, payload in stream:
+        if mode == "custom":
+            if isinstance(payload, dict) and "type" in payload:
+                yield payload
+            continue
+        if mode == "updates":
+            if namespace:
+                continue
+            for node, update in payload.items():
+                update = update or {}
+                final_state.update(update)
+                yield {"type": "node", "node": node, "step": update.get("step")}
+                if update.get("decision"):
+                    yield {"type": "decision", **update["decision"]}
+            continue
+
+        chunk, metadata = payload
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        stage = _stage(metadata)
+        if text and stage in STREAMED_STAGES:
+            yield {"type": "token", "stage": stage, "file": metadata.get(FILE_METADATA_KEY), "text": text}
+
+
+def encode_event(event: Dict, stream_format: str) -> str:
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
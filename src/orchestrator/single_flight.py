@@ -0,0 +1,158 @@
+"""
+Single-flight coalescing of concurrent reviews of the same PR revision.
+
+Requests are keyed on (owner, repo, pr_number, head SHA). The first caller
+runs the workflow; callers arriving while it is in flight await the same
+task, and completed results are served from a short-TTL memory cache.
+Only callers with the same cache bypass flag and routing budget share a run
+or a cached result, and a shared run is cancelled only once every caller
+waiting on it has been (see CancelGroup).
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from src.orchestrator.cancellation import CANCEL_TOKEN, CancelGroup, ReviewCancelled, cancel_scope
+from src.tools.github_mcp_tool import fetch_pr_head_sha
+from src.utils.config_loader import read_base_config
+from src.utils.llm_cache import cache_bypassed
+from src.utils.metrics import REVIEWS, REVIEWS_IN_FLIGHT
+from src.utils.model_router import ROUTER
+
+ReviewKey = Tuple[str, str, int, str]
+
+
+def _budget() -> Tuple:
+    return tuple(sorted(ROUTER.current_budget().items()))
+
+
+class ReviewSingleFlight:
+    def __init__(self, result_ttl_seconds: float = 120, max_results: int = 256, enabled: bool = True):
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_results = max_results
+        self.enabled = enabled
+        self.executions = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        # Keyed on (key, cache bypass, budget) and (key, budget): a run only serves callers with the same settings
+        self._inflight: Dict[Tuple, Tuple[asyncio.Task, CancelGroup]] = {}
+        self._results: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+
+    async def make_key(self, repo_owner: str, repo_name: str, pr_number: int, head_sha: Optional[str] = None) -> ReviewKey:
+        """Keys on head_sha when the caller already knows it (webhooks), else fetches it."""
+        if not self.enabled:
+            head_sha = ""
+        elif head_sha is None:
+            head_sha = await fetch_pr_head_sha(repo_owner, repo_name, pr_number)
+        return (repo_owner.lower(), repo_name.lower(), int(pr_number), head_sha)
+
+    def _cached(self, key: Tuple) -> Optional[Dict]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.result_ttl_seconds:
+            del self._results[key]
+            return None
+        return result
+
+    def _store(self, flight: Tuple, key: Tuple, task: asyncio.Task):
+        self._inflight.pop(flight, None)
+        # Only cache successful reviews of a known revision
+        if task.cancelled() or task.exception() is not None or not key[0][3]:
+            return
+        self._results[key] = (time.monotonic(), task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    async def run(
+        self,
+        key: ReviewKey,
+        review: Callable[[], Awaitable[Dict]],
+        use_cache: bool = True,
+        on_coalesced: Optional[Callable[[], None]] = None,
+    ) -> Dict:
+        """
+        Runs review() for key unless an identical review is in flight or was
+        just completed, in which case that result is returned instead. The
+        caller's cancel token (from cancel_scope) stops only its own wait: it
+        gets ReviewCancelled once the shared run ends, and the run itself
+        stops early only if every caller waiting on it was cancelled.
+        """
+        REVIEWS_IN_FLIGHT.labels("requests").inc()
+        try:
+            result = await self._run(key, review, use_cache, on_coalesced)
+        except ReviewCancelled:
+            REVIEWS.labels("cancelled").inc()
+            raise
+        except Exception:
+            REVIEWS.labels("failed").inc()
+            raise
+        finally:
+            REVIEWS_IN_FLIGHT.labels("requests").dec()
+        REVIEWS.labels("completed").inc()
+        return result
+
+    async def _execute(self, review: Callable[[], Awaitable[Dict]], group: Optional[CancelGroup] = None) -> Dict:
+        REVIEWS_IN_FLIGHT.labels("executing").inc()
+        try:
+            if group is None:
+                return await review()
+            # The task copied the first caller's context; its nodes check the whole group instead
+            with cancel_scope(group):
+                return await review()
+        finally:
+            REVIEWS_IN_FLIGHT.labels("executing").dec()
+
+    async def _run(self, key, review, use_cache, on_coalesced) -> Dict:
+        if not self.enabled:
+            self.executions += 1
+            return await self._execute(review)
+
+        budget = _budget()
+        result_key = (key, budget)
+        flight = (key, cache_bypassed(), budget)
+        if use_cache:
+            cached = self._cached(result_key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        token = CANCEL_TOKEN.get()
+        if flight in self._inflight:
+            task, group = self._inflight[flight]
+            self.coalesced += 1
+            if on_coalesced:
+                on_coalesced()
+        else:
+            self.executions += 1
+            group = CancelGroup()
+            task = asyncio.create_task(self._execute(review, group))
+            self._inflight[flight] = (task, group)
+            task.add_done_callback(lambda t: self._store(flight, result_key, t))
+        group.add(token)
+        # Shielded so one caller disconnecting does not cancel the shared review
+        result = await asyncio.shield(task)
+        if token is not None:
+            token.raise_if_cancelled()
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "in_flight": len(self._inflight),
+            "cached_results": len(self._results),
+        }
+
+
+_SINGLE_FLIGHT_CONFIG = read_base_config().get("SINGLE_FLIGHT", {})
+SINGLE_FLIGHT = ReviewSingleFlight(
+    result_ttl_seconds=_SINGLE_FLIGHT_CONFIG.get("result_ttl_seconds", 120),
+    max_results=_SINGLE_FLIGHT_CONFIG.get("max_results", 256),
+    enabled=_SINGLE_FLIGHT_CONFIG.get("enabled", True),
+)
@@ -0,0 +1,175 @@
+"""
+Deterministic triage of a fetched PR, run before any LLM call.
+
+Each changed file is classified with cheap local checks (lockfile, generated,
+binary, whitespace-only, comment/docstring-only, Python syntax of new files),
+and the PR is routed to one of:
+
+- "rules": nothing needs an LLM; the verdict comes from merge_decision_tool
+- "light": small change; analyze the remaining files and comment, but decide by rules
+- "full":  the normal analyze -> comment -> decision path, minus skipped files
+
+New Python files that do not parse get an issue comment, which is added to
+the reviewer's comments and makes the verdict a rules "do not merge" on
+either path.
+"""
+
+import threading
+from typing import Dict, List
+
+from src.utils.config_loader import read_base_config
+from src.utils.file_kinds import (
+    hunk_sides,
+    is_comment_only_python,
+    is_generated,
+    is_lockfile,
+    is_python,
+    is_whitespace_only,
+    python_syntax_error,
+)
+from src.tools.react_tool import merge_decision_tool
+
+TRIAGE_CONFIG = read_base_config().get("TRIAGE", {})
+
+RULES = "rules"
+LIGHT = "light"
+FULL = "full"
+
+# The structured decision is one call; the ReAct loop makes one call to pick
+# the tool and one for the final answer
+DECISION_LLM_CALLS = 2 if read_base_config().get("DECISION", {}).get("mode", "structured") == "react" else 1
+
+SKIP_REASONS = {
+    "lockfile": "dependency lockfile",
+    "generated": "generated or vendored file",
+    "binary": "binary file",
+    "whitespace": "whitespace-only change",
+    "comments": "comment/docstring-only change",
+}
+
+
+def classify_file(change: Dict) -> str:
+    """Returns a SKIP_REASONS key, or "review" if the file needs an LLM."""
+    filename = change.get("filename", "")
+    if change.get("is_binary"):
+        return "binary"
+    if is_lockfile(filename):
+        return "lockfile"
+    hunks = hunk_sides(change.get("diff", ""))
+    # Generator markers are only trusted at the top of a newly added file
+    added = [line for hunk in hunks for line in hunk[3]] if change.get("status") == "added" else None
+    if is_generated(filename, added):
+        return "generated"
+    # A truncated diff cannot be proven trivial
+    if change.get("truncated") or not hunks or change.get("status") in ("added", "removed", "renamed"):
+        return "review"
+    if all(is_whitespace_only(removed, added, filename) for _, _, removed, added in hunks):
+        return "whitespace"
+    if is_python(filename) and all(is_comment_only_python(old, new) for old, new, _, _ in hunks):
+        return "comments"
+    return "review"
+
+
+def check_syntax(change: Dict):
+    """Parses new Python files with ast; modified files only carry hunks and are not parsed."""
+    filename = change.get("filename", "")
+    if not is_python(filename) or change.get("status") != "added" or change.get("truncated"):
+        return None
+    source = "\n".join(line for hunk in hunk_sides(change.get("diff", "")) for line in hunk[3])
+    error = python_syntax_error(source)
+    if error is None:
+        return None
+    return {
+        "comment_type": "issue",
+        "severity": "critical",
+        "file_path": filename,
+        "line_number": error["line"],
+        "content": f"Critical bug: {error['message']} at line {error['line']}; this file does not parse.",
+    }
+
+
+def triage_pr(file_changes: Dict[str, Dict], has_code_changes: bool) -> Dict:
+    """Classifies every file and picks the route; also estimates the LLM calls saved."""
+    enabled = TRIAGE_CONFIG.get("enabled", True)
+    files = {name: classify_file(change) if enabled else "review" for name, change in file_changes.items()}
+    syntax_comments = [c for c in (check_syntax(change) for change in file_changes.values()) if c] if enabled else []
+
+    reviewed = [name for name, kind in files.items() if kind == "review"]
+    changed_lines = sum(
+        file_changes[name].get("additions", 0) + file_changes[name].get("deletions", 0) for name in reviewed
+    )
+
+    if enabled and not reviewed:
+        route = RULES
+    elif (
+        enabled
+        and changed_lines <= TRIAGE_CONFIG.get("light_max_changed_lines", 30)
+        and len(reviewed) <= TRIAGE_CONFIG.get("light_max_files", 3)
+    ):
+        route = LIGHT
+    else:
+        route = FULL
+
+    # Calls the untriaged workflow would make vs. the calls this route will make
+    baseline = (len(file_changes) + 1 + DECISION_LLM_CALLS) if has_code_changes else 1
+    if route == RULES:
+        planned = 0
+    elif has_code_changes:
+        planned = len(reviewed) + 1 + (DECISION_LLM_CALLS if route == FULL and not syntax_comments else 0)
+    else:
+        planned = 1
+
+    return {
+        "route": route,
+        "files": files,
+        "reviewed_files": reviewed,
+        "changed_lines": changed_lines,
+        "syntax_comments": syntax_comments,
+        "llm_calls_baseline": baseline,
+        "llm_calls_planned": planned,
+        "llm_calls_avoided": max(0, baseline - planned),
+    }
+
+
+def skipped_file_report(kind: str) -> str:
+    return f"Skipped by triage: {SKIP_REASONS.get(kind, kind)}. No issues found."
+
+
+def rules_decision(triage: Dict, comments: List[Dict]) -> str:
+    """Merge verdict from merge_decision_tool, without an LLM."""
+    if triage.get("syntax_comments"):
+        analysis = "Triage found files that do not parse."
+    elif triage.get("route") == RULES:
+        analysis = "Triage: only lockfiles, generated files or whitespace/comment changes. No issues found."
+    else:
+        analysis = "Small change reviewed on the light path."
+    lines = [f"- [{c.get('comment_type', '').upper()}] {c.get('content', '')}" for c in comments]
+    # Only reviewer "issue" comments block; suggestions and praise do not
+    if not any(c.get("comment_type") == "issue" for c in comments):
+        lines.append("Looks good.")
+    return merge_decision_tool(analysis, "\n".join(lines))
+
+
+class TriageStats:
+    def __init__(self):
+        self.routes = {RULES: 0, LIGHT: 0, FULL: 0}
+        self.files_skipped = 0
+        self.llm_calls_avoided = 0
+        self._lock = threading.Lock()
+
+    def record(self, triage: Dict):
+        with self._lock:
+            self.routes[triage["route"]] += 1
+            self.files_skipped += sum(1 for kind in triage["files"].values() if kind != "review")
+            self.llm_calls_avoided += triage["llm_calls_avoided"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "routes": dict(self.routes),
+                "files_skipped": self.files_skipped,
+                "llm_calls_avoided": self.llm_calls_avoided,
+            }
+
+
+TRIAGE_STATS = TriageStats()
@@ -5,9 +5,15 @@ class PRState(TypedDict, total=False):
     repo_name: str
     pr_number: int
     pr_data: Optional[Dict]
+    file_changes: Optional[Dict[str, Dict]]
     analysis: Optional[str]
+    file_analyses: Optional[Dict[str, str]]
     comments: Optional[List[Dict[str, Any]]]
-    review_summary: Optional[str]
     step: Optional[str]
     merge_decision: Optional[str]
-    has_code_changes: Optional[bool]
\ No newline at end of file
+    decision: Optional[Dict[str, Any]]
+    has_code_changes: Optional[bool]
+    triage: Optional[Dict[str, Any]]
+    token_report: Optional[Dict[str, Any]]
+    model_plan: Optional[Dict[str, Any]]
+    publication: Optional[Dict[str, Any]]
\ No newline at end of file
@@ -1,128 +1,328 @@
 # github_mcp.py
 
 import os
+import json
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from src.utils.config_loader import read_base_config
+from src.tools.mcp_session_pool import MCPSession, MCPSessionPool
+from src.tools.github_rate_limiter import GitHubRateLimiter
+from src.tools.pr_resource_cache import PRResourceCache, pr_validator
+from src.utils.metrics import MCP_CALL_DURATION
+from src.utils.review_log import get_logger, log_event
 
 load_dotenv()
 # Load environment variables from .env file
-MCP_SERVER_PATH = "src/comms/server/github-mcp-server/github-mcp-server"
+logger = get_logger("github")
+
+MCP_CONFIG = read_base_config().get("MCP", {})
+MCP_SERVER_PATH = MCP_CONFIG.get("server_path", "src/comms/server/github-mcp-server/github-mcp-server")
 GITHUB_PAT = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
+CALL_TIMEOUT = MCP_CONFIG.get("call_timeout", 30)
+PER_PAGE = MCP_CONFIG.get("per_page", 100)
+MAX_PAGES = MCP_CONFIG.get("max_pages", 30)
+# Tool that creates and submits a review with all of its inline comments in one request
+REVIEW_TOOL = MCP_CONFIG.get("review_tool", "create_pull_request_review")
+# Tool that lists a PR's submitted reviews
+REVIEWS_TOOL = MCP_CONFIG.get("reviews_tool", "get_pull_request_reviews")
+
+# Shared pool installed by the API lifespan; None means one session per call.
+_SESSION_POOL = None
+
+RATE_LIMIT_CONFIG = read_base_config().get("GITHUB_RATE_LIMIT", {})
+RATE_LIMITER = GitHubRateLimiter(
+    requests_per_second=RATE_LIMIT_CONFIG.get("requests_per_second", 10),
+    burst=RATE_LIMIT_CONFIG.get("burst", 20),
+    max_retries=RATE_LIMIT_CONFIG.get("max_retries", 5),
+    base_backoff=RATE_LIMIT_CONFIG.get("base_backoff", 1),
+    max_backoff=RATE_LIMIT_CONFIG.get("max_backoff", 120),
+)
+PR_CACHE = PRResourceCache(
+    max_prs=RATE_LIMIT_CONFIG.get("max_cached_prs", 1000),
+    details_ttl_seconds=RATE_LIMIT_CONFIG.get("details_ttl_seconds", 5),
+)
 
 def get_mcp_env():
     return {
         "GITHUB_PERSONAL_ACCESS_TOKEN": GITHUB_PAT,
-        "GITHUB_TOOLSETS": "repos,issues,pull_requests,code_security"
+        "GITHUB_TOOLSETS": MCP_CONFIG.get("toolsets", "repos,issues,pull_requests,code_security")
     }
 
-async def get_tools():
-    client = MultiServerMCPClient({
-        "github": {
-            "command": MCP_SERVER_PATH,
-            "args": ["stdio"],
-            "env": get_mcp_env()
-        }
-    })
-    await client.__aenter__()
-    tools = client.get_tools()
-    return client, tools
+def get_mcp_connection():
+    return {
+        "transport": "stdio",
+        "command": MCP_SERVER_PATH,
+        "args": ["stdio"],
+        "env": get_mcp_env()
+    }
+
+def create_session_pool() -> MCPSessionPool:
+    return MCPSessionPool(
+        get_mcp_connection(),
+        size=MCP_CONFIG.get("pool_size", 4),
+        lease_timeout=MCP_CONFIG.get("lease_timeout", 30),
+        health_check_interval=MCP_CONFIG.get("health_check_interval", 30),
+        ping_timeout=MCP_CONFIG.get("ping_timeout", 5),
+        startup_timeout=MCP_CONFIG.get("startup_timeout", 30),
+    )
+
+def set_session_pool(pool):
+    global _SESSION_POOL
+    _SESSION_POOL = pool
+
+def get_session_pool():
+    return _SESSION_POOL
+
+@asynccontextmanager
+async def lease_tools():
+    """
+    Yields a name -> tool mapping, leased from the shared pool when one is
+    running, otherwise from a short-lived session (CLI usage).
+    """
+    if _SESSION_POOL is not None:
+        async with _SESSION_POOL.lease() as tools:
+            yield tools
+        return
+
+    session = await MCPSession(get_mcp_connection()).start()
+    try:
+        yield session.tools
+    finally:
+        await session.close()
+
+def parse_tool_result(result):
+    if isinstance(result, list) and result and all(isinstance(r, dict) and "text" in r for r in result):
+        result = "".join(r["text"] for r in result)
+    if isinstance(result, str):
+        try:
+            result = json.loads(result)
+        except Exception:
+            pass
+    return result
 
 async def list_prs(repo_owner, repo_name, state="open"):
-    client, tools = await get_tools()
-    list_prs_tool = next((t for t in tools if t.name == 'list_pull_requests'), None)
     prs = []
-    if list_prs_tool:
-        result = await list_prs_tool.ainvoke({
-            "owner": repo_owner,
-            "repo": repo_name,
-            "state": state,
-            "per_page": 100
-        })
-        import json
-        if isinstance(result, str):
-            try:
-                result = json.loads(result)
-            except Exception:
-                pass
-        if isinstance(result, dict) and "data" in result:
-            result = result["data"]
-        if isinstance(result, list):
-            prs = result
-    await client.__aexit__(None, None, None)
+    async with lease_tools() as tools:
+        if 'list_pull_requests' in tools:
+            result = parse_tool_result(await _invoke(tools, 'list_pull_requests', {
+                "owner": repo_owner,
+                "repo": repo_name,
+                "state": state,
+                "per_page": 100
+            }))
+            if isinstance(result, dict) and "data" in result:
+                result = result["data"]
+            if isinstance(result, list):
+                prs = result
     return prs
 
+def _as_list(result):
+    result = parse_tool_result(result)
+    if isinstance(result, dict) and "data" in result:
+        result = result["data"]
+    return result if isinstance(result, list) else None
+
+async def _invoke(tools, name, args):
+    tool = tools.get(name)
+    if tool is None:
+        return None
+    # Every GitHub call is scheduled through the per-credential rate limiter
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await RATE_LIMITER.call(
+            GITHUB_PAT,
+            lambda: asyncio.wait_for(tool.ainvoke(args), CALL_TIMEOUT),
+            parse=parse_tool_result
+        )
+        outcome = "ok"
+        return result
+    finally:
+        MCP_CALL_DURATION.labels(name, outcome).observe(time.perf_counter() - started)
+
+async def _fetch_remaining_pages(tools, name, args, first_page, total):
+    """
+    Fetches pages 2..N of a paginated listing. When the total is known the pages
+    are requested concurrently, otherwise they are walked until a short page.
+    """
+    items = list(first_page)
+    if len(first_page) < PER_PAGE:
+        return items
+
+    if total:
+        last_page = min(-(-int(total) // PER_PAGE), MAX_PAGES)
+        pages = await asyncio.gather(*(
+            _invoke(tools, name, {**args, "page": page, "perPage": PER_PAGE})
+            for page in range(2, last_page + 1)
+        ), return_exceptions=True)
+        for page in pages:
+            if isinstance(page, BaseException):
+                log_event(logger, logging.WARNING, "github.page_skipped", tool=name, error=repr(page))
+                continue
+            items.extend(_as_list(page) or [])
+        return items
+
+    for page in range(2, MAX_PAGES + 1):
+        batch = _as_list(await _invoke(tools, name, {**args, "page": page, "perPage": PER_PAGE})) or []
+        items.extend(batch)
+        if len(batch) < PER_PAGE:
+            break
+    return items
+
+def _details(result):
+    result = parse_tool_result(result)
+    return result if isinstance(result, dict) else None
+
 async def fetch_pr_data(repo_owner, repo_name, pr_number):
-    import json
-    client, tools = await get_tools()
-    get_pr_tool = next((t for t in tools if t.name == 'get_pull_request'), None)
-    get_pr_files_tool = next((t for t in tools if t.name == 'get_pull_request_files'), None)
-    get_pr_diff_tool = next((t for t in tools if t.name == 'get_pull_request_diff'), None)
-    list_commits_tool = next((t for t in tools if t.name == 'list_commits'), None)
-    pr_data = {}
-
-    # PR details
-    if get_pr_tool:
-        pr_info = await get_pr_tool.ainvoke({
-            "owner": repo_owner,
-            "repo": repo_name,
-            "pullNumber": pr_number,
-            "state": "open"
-        })
-        if isinstance(pr_info, str):
+    """
+    Fetches PR details, files, diff and commits concurrently.
+
+    Each call has its own timeout; a failed call is recorded under
+    ``fetch_errors`` and the remaining data is still returned. When files,
+    diff and commits were fetched before, only the details are requested and
+    the cached listings are reused if the PR's validator is unchanged.
+    """
+    pr_data = {"pr_commits": []}
+    errors = {}
+    args = {
+        "owner": repo_owner,
+        "repo": repo_name,
+        "pullNumber": pr_number,
+        "state": "open"
+    }
+    page_args = {**args, "page": 1, "perPage": PER_PAGE}
+    names = ["get_pull_request", "get_pull_request_files", "get_pull_request_diff", "list_commits"]
+    cache_key = PR_CACHE.key(repo_owner, repo_name, pr_number)
+    cached = PR_CACHE.get(cache_key)
+
+    async with lease_tools() as tools:
+        pr_info = PR_CACHE.fresh_details(cache_key)
+        if pr_info is None and cached and cached.get("resources") is not None:
+            # Revalidate: one details call decides whether the listings are still current
             try:
-                pr_info = json.loads(pr_info)
-            except Exception:
-                pass
+                pr_info = _details(await _invoke(tools, "get_pull_request", args))
+            except Exception as e:
+                errors["get_pull_request"] = repr(e)
+        if pr_info is not None:
+            PR_CACHE.put_details(cache_key, pr_info)
+            if cached and cached.get("resources") is not None and cached.get("validator") == pr_validator(pr_info):
+                PR_CACHE.revalidated += 1
+                return {**pr_data, **pr_info, **cached["resources"]}
+
+        PR_CACHE.refetched += 1
+        calls = {
+            "get_pull_request_files": _invoke(tools, "get_pull_request_files", page_args),
+            "get_pull_request_diff": _invoke(tools, "get_pull_request_diff", args),
+            "list_commits": _invoke(tools, "list_commits", page_args),
+        }
+        if pr_info is None and "get_pull_request" not in errors:
+            calls["get_pull_request"] = _invoke(tools, "get_pull_request", args)
+        results = dict(zip(calls, await asyncio.gather(*calls.values(), return_exceptions=True)))
+        for name, result in results.items():
+            if isinstance(result, BaseException):
+                errors[name] = repr(result)
+
+        # PR details
+        if pr_info is None and "get_pull_request" not in errors:
+            pr_info = _details(results.get("get_pull_request"))
         if isinstance(pr_info, dict):
             pr_data.update(pr_info)
 
-    # PR files
-    if get_pr_files_tool:
-        files = await get_pr_files_tool.ainvoke({
-            "owner": repo_owner,
-            "repo": repo_name,
-            "pullNumber": pr_number,
-            "state": "open"
-        })
-        if isinstance(files, str):
-            try:
-                files = json.loads(files)
-            except Exception:
-                pass
-        if isinstance(files, dict) and "data" in files:
-            files = files["data"]
-        if isinstance(files, list):
-            pr_data["pr_files"] = files
+        # PR files and commits, with any further pages fetched in parallel
+        listings = [
+            ("get_pull_request_files", "pr_files", pr_data.get("changed_files")),
+            ("list_commits", "pr_commits", pr_data.get("commits")),
+        ]
+        pending = {}
+        for name, key, total in listings:
+            if name in errors:
+                continue
+            first = _as_list(results[name])
+            if first is not None:
+                pending[key] = (name, _fetch_remaining_pages(tools, name, page_args, first, total))
+        paged = await asyncio.gather(*(coro for _, coro in pending.values()), return_exceptions=True)
+        for (key, (name, _)), result in zip(pending.items(), paged):
+            if isinstance(result, BaseException):
+                errors[name] = repr(result)
+            else:
+                pr_data[key] = result
 
     # PR diff
-    if get_pr_diff_tool:
-        diff = await get_pr_diff_tool.ainvoke({
-            "owner": repo_owner,
-            "repo": repo_name,
-            "pullNumber": pr_number,
-            "state": "open"
-        })
+    diff = results.get("get_pull_request_diff")
+    if "get_pull_request_diff" not in errors:
+        if isinstance(diff, list):
+            diff = "".join(d.get("text", "") for d in diff if isinstance(d, dict))
         if isinstance(diff, str):
-            pr_data["pr_diff"] = diff[:5000]
+            pr_data["pr_diff"] = diff
 
-    # PR commits
-    pr_data["pr_commits"] = []
-    if list_commits_tool:
-        commits = await list_commits_tool.ainvoke({
-            "owner": repo_owner,
-            "repo": repo_name,
-            "pullNumber": pr_number,
-            "state": "open"
+    if errors:
+        if len(errors) == len(names):
+            raise RuntimeError(f"Failed to fetch PR {repo_owner}/{repo_name}#{pr_number}: {errors}")
+        log_event(logger, logging.WARNING, "github.partial_pr_data", errors=errors)
+        pr_data["fetch_errors"] = errors
+    elif isinstance(pr_info, dict):
+        PR_CACHE.put_resources(cache_key, pr_info, {
+            "pr_files": pr_data.get("pr_files", []),
+            "pr_diff": pr_data.get("pr_diff", ""),
+            "pr_commits": pr_data.get("pr_commits", []),
         })
-        if isinstance(commits, str):
-            try:
-                commits = json.loads(commits)
-            except Exception:
-                pass
-        if isinstance(commits, dict) and "data" in commits:
-            commits = commits["data"]
-        if isinstance(commits, list):
-            pr_data["pr_commits"] = commits
-
-    await client.__aexit__(None, None, None)
+
     return pr_data
+
+async def fetch_pr_head_sha(repo_owner, repo_name, pr_number) -> str:
+    """Returns the PR's current head commit SHA, or "" if it cannot be fetched."""
+    cache_key = PR_CACHE.key(repo_owner, repo_name, pr_number)
+    pr_info = PR_CACHE.fresh_details(cache_key)
+    if pr_info is None:
+        try:
+            async with lease_tools() as tools:
+                pr_info = _details(await _invoke(tools, "get_pull_request", {
+                    "owner": repo_owner,
+                    "repo": repo_name,
+                    "pullNumber": pr_number
+                }))
+        except Exception as e:
+            log_event(logger, logging.WARNING, "github.head_sha_failed", error=repr(e))
+            return ""
+        if pr_info is not None:
+            PR_CACHE.put_details(cache_key, pr_info)
+    if isinstance(pr_info, dict):
+        return (pr_info.get("head") or {}).get("sha") or ""
+    return ""
+
+async def create_pr_review(repo_owner, repo_name, pr_number, body, event, comments, commit_id=None):
+    """
+    Creates and submits one review on the PR: body, event (APPROVE,
+    REQUEST_CHANGES or COMMENT) and inline comments [{"path", "position",
+    "body"}], all in a single GitHub request. commit_id pins the positions to
+    the diff that was reviewed.
+    """
+    args = {
+        "owner": repo_owner,
+        "repo": repo_name,
+        "pullNumber": pr_number,
+        "body": body,
+        "event": event,
+        "comments": comments
+    }
+    if commit_id:
+        args["commitId"] = commit_id
+    async with lease_tools() as tools:
+        if REVIEW_TOOL not in tools:
+            raise RuntimeError(f"The GitHub MCP server has no {REVIEW_TOOL} tool; check MCP.toolsets")
+        return parse_tool_result(await _invoke(tools, REVIEW_TOOL, args))
+
+async def list_pr_reviews(repo_owner, repo_name, pr_number):
+    """Returns the PR's submitted reviews, each with its "body" and "commit_id"."""
+    async with lease_tools() as tools:
+        if REVIEWS_TOOL not in tools:
+            raise RuntimeError(f"The GitHub MCP server has no {REVIEWS_TOOL} tool; check MCP.toolsets")
+        return _as_list(await _invoke(tools, REVIEWS_TOOL, {
+            "owner": repo_owner,
+            "repo": repo_name,
+            "pullNumber": pr_number
+        })) or []
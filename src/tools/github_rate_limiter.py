@@ -0,0 +1,166 @@
+"""
+Rate-limit-aware scheduling of GitHub MCP tool calls.
+
+Every tool invocation passes through a token bucket for its credential.
+Rate-limit signals returned by github-mcp-server (403/429 errors with
+"rate reset in ..." / "retry after ..." hints, or quota fields when present)
+pause the credential until the reset time, and the call is retried with
+exponential backoff and jitter.
+"""
+
+import re
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+RATE_LIMIT_PATTERN = re.compile(
+    r"API rate limit (?:of \d+ still )?exceeded|secondary rate limit|abuse detection|429 Too Many Requests",
+    re.IGNORECASE
+)
+RESET_IN_PATTERN = re.compile(r"rate reset in ((?:\d+h)?(?:\d+m)?(?:[\d.]+s)?)", re.IGNORECASE)
+RETRY_AFTER_PATTERN = re.compile(r"retry[- ]after[:\s]+([\d.]+)\s*s?", re.IGNORECASE)
+DURATION_PART = re.compile(r"([\d.]+)([hms])")
+
+
+class RateLimitExceeded(RuntimeError):
+    pass
+
+
+def parse_duration(text: str) -> float:
+    """Parses Go-style durations such as "1h2m3s" or "45.5s" into seconds."""
+    units = {"h": 3600, "m": 60, "s": 1}
+    return sum(float(value) * units[unit] for value, unit in DURATION_PART.findall(text))
+
+
+def rate_limit_delay(message: str) -> Optional[float]:
+    """
+    Returns how long to wait if message is a rate-limit error, 0.0 if it is one
+    without a hint, or None if it is not a rate-limit error.
+    """
+    if not message or not RATE_LIMIT_PATTERN.search(message):
+        return None
+    match = RETRY_AFTER_PATTERN.search(message)
+    if match:
+        return float(match.group(1))
+    match = RESET_IN_PATTERN.search(message)
+    if match:
+        return parse_duration(match.group(1))
+    return 0.0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _CredentialState:
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.remaining: Optional[int] = None
+        self.blocked_until = 0.0
+
+
+class GitHubRateLimiter:
+    def __init__(
+        self,
+        requests_per_second: float = 10.0,
+        burst: float = 20.0,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 120.0,
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._credentials: Dict[str, _CredentialState] = {}
+
+    def _state(self, credential: Optional[str]) -> _CredentialState:
+        key = hashlib.sha256((credential or "").encode("utf-8")).hexdigest()[:16]
+        if key not in self._credentials:
+            self._credentials[key] = _CredentialState(self.requests_per_second, self.burst)
+        return self._credentials[key]
+
+    def _observe(self, state: _CredentialState, result: Any):
+        """Records quota information when a response carries it."""
+        if not isinstance(result, dict):
+            return
+        rate = result.get("rate") or result.get("rate_limit") or {}
+        remaining = rate.get("remaining", result.get("X-RateLimit-Remaining"))
+        reset = rate.get("reset", result.get("X-RateLimit-Reset"))
+        if remaining is None:
+            return
+        state.remaining = int(remaining)
+        if state.remaining <= 0 and reset:
+            state.blocked_until = max(state.blocked_until, float(reset) - time.time() + time.monotonic())
+
+    def _backoff(self, attempt: int, hint: Optional[float]) -> float:
+        delay = hint if hint else self.base_backoff * (2 ** attempt)
+        return min(self.max_backoff, delay) + random.uniform(0, self.base_backoff)
+
+    async def call(self, credential: Optional[str], invoke: Callable[[], Awaitable[Any]], parse: Callable[[Any], Any] = None) -> Any:
+        """
+        Runs invoke() under the credential's token bucket, retrying while
+        GitHub reports a primary or secondary rate limit.
+        """
+        state = self._state(credential)
+        for attempt in range(self.max_retries + 1):
+            wait = state.blocked_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await state.bucket.acquire()
+            self.calls += 1
+            try:
+                result = await invoke()
+                # parse joins text content blocks and decodes JSON; error text stays a string
+                parsed = parse(result) if parse else result
+                message = parsed if isinstance(parsed, str) else ""
+            except Exception as e:
+                result = None
+                message = str(e)
+                delay = rate_limit_delay(message)
+                if delay is None:
+                    raise
+            else:
+                # Tool errors come back as short strings; never scan diffs or JSON payloads
+                is_error_text = message and len(message) < 2000 and not message.lstrip().startswith(("diff --git", "{", "["))
+                delay = rate_limit_delay(message) if is_error_text else None
+                if delay is None:
+                    self._observe(state, parsed)
+                    return result
+
+            self.rate_limited += 1
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            state.blocked_until = max(state.blocked_until, time.monotonic() + self._backoff(attempt, delay))
+        raise RateLimitExceeded(f"GitHub rate limit still exceeded after {self.max_retries} retries: {message[:200]}")
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "credentials": len(self._credentials),
+        }
@@ -0,0 +1,181 @@
+# mcp_session_pool.py
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+
+from src.utils.review_log import get_logger, log_event
+
+SERVER_NAME = "github"
+
+logger = get_logger("mcp")
+
+
+class MCPSession:
+    """
+    One long-lived github-mcp-server subprocess with its tools loaded once.
+
+    The stdio transport is bound to the task that opened it, so the session is
+    owned by a dedicated background task and closed by signalling that task.
+    """
+
+    def __init__(self, connection: Dict, startup_timeout: float = 30.0):
+        self.connection = connection
+        self.startup_timeout = startup_timeout
+        self.session = None
+        self.tools: Dict[str, BaseTool] = {}
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.startup_timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RuntimeError("Timed out starting github-mcp-server session.")
+        if self.session is None:
+            raise RuntimeError(f"Failed to start github-mcp-server session: {self.error}")
+        return self
+
+    async def _run(self):
+        client = MultiServerMCPClient({SERVER_NAME: self.connection})
+        try:
+            async with client.session(SERVER_NAME) as session:
+                tools = await load_mcp_tools(session)
+                self.tools = {t.name: t for t in tools}
+                self.session = session
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def ping(self, timeout: float = 5.0) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+
+
+class MCPSessionPool:
+    """
+    Keeps a fixed number of warm MCP sessions and leases them to concurrent callers.
+
+    Dead sessions are restarted on lease, and a background loop pings idle
+    sessions so a crashed subprocess is replaced before a request needs it.
+    """
+
+    def __init__(
+        self,
+        connection: Dict,
+        size: int = 4,
+        lease_timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+        startup_timeout: float = 30.0,
+    ):
+        self.connection = connection
+        self.size = max(1, int(size))
+        self.lease_timeout = lease_timeout
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._sessions = []
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _new_session(self) -> MCPSession:
+        return MCPSession(self.connection, startup_timeout=self.startup_timeout)
+
+    async def start(self):
+        sessions = [self._new_session() for _ in range(self.size)]
+        results = await asyncio.gather(*(s.start() for s in sessions), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            log_event(logger, logging.WARNING, "mcp.sessions_failed_to_start", failed=len(failed), size=self.size, error=repr(failed[0]))
+        for session in sessions:
+            self._sessions.append(session)
+            self._idle.put_nowait(session)
+        if self.health_check_interval and self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+        return self
+
+    async def _replace(self, session: MCPSession) -> MCPSession:
+        await session.close()
+        fresh = self._new_session()
+        await fresh.start()
+        self._sessions[self._sessions.index(session)] = fresh
+        self.restarts += 1
+        return fresh
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yield the name -> tool mapping of an idle, live session."""
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed.")
+        session = await asyncio.wait_for(self._idle.get(), self.lease_timeout)
+        try:
+            if not session.alive:
+                session = await self._replace(session)
+            yield session.tools
+        finally:
+            self._idle.put_nowait(session)
+
+    async def _health_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            for _ in range(self._idle.qsize()):
+                try:
+                    session = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    if not await session.ping(self.ping_timeout):
+                        session = await self._replace(session)
+                except Exception as e:
+                    log_event(logger, logging.WARNING, "mcp.session_restart_failed", error=repr(e))
+                finally:
+                    self._idle.put_nowait(session)
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "alive": sum(1 for s in self._sessions if s.alive),
+            "restarts": self.restarts,
+        }
+
+    async def close(self):
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+        await asyncio.gather(*(s.close() for s in self._sessions), return_exceptions=True)
+        self._sessions = []
@@ -0,0 +1,78 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+PRKey = Tuple[str, str, int]
+
+
+def pr_validator(details: Dict) -> Tuple[str, str, str]:
+    """
+    The PR's revalidation token. github-mcp-server does not expose HTTP ETags,
+    so the head SHA and updated_at of the PR serve as the validator, plus the
+    etag/last_modified fields when a server does pass them through.
+    """
+    return (
+        str(details.get("etag") or details.get("last_modified") or ""),
+        str((details.get("head") or {}).get("sha") or ""),
+        str(details.get("updated_at") or ""),
+    )
+
+
+class PRResourceCache:
+    """
+    Per-PR cache of files, diff and commits, stored with the validator of the
+    PR details they were fetched under. A matching validator on the next fetch
+    means the listings are reused without spending quota on them.
+    """
+
+    def __init__(self, max_prs: int = 1000, details_ttl_seconds: float = 5.0):
+        self.max_prs = max_prs
+        self.details_ttl_seconds = details_ttl_seconds
+        self.revalidated = 0
+        self.refetched = 0
+        self._entries: "OrderedDict[PRKey, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(repo_owner: str, repo_name: str, pr_number: int) -> PRKey:
+        return (repo_owner.lower(), repo_name.lower(), int(pr_number))
+
+    def get(self, key: PRKey) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def fresh_details(self, key: PRKey) -> Optional[Dict]:
+        """PR details fetched within the last details_ttl_seconds, if any."""
+        entry = self.get(key)
+        if entry and entry.get("details") and time.monotonic() - entry["details_at"] <= self.details_ttl_seconds:
+            return entry["details"]
+        return None
+
+    def expire_details(self, key: PRKey):
+        """Forces the next fetch to revalidate, e.g. after a webhook reported a new head."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["details_at"] = float("-inf")
+
+    def _put(self, key: PRKey, **fields):
+        with self._lock:
+            entry = self._entries.setdefault(key, {"resources": None, "validator": None})
+            entry.update(fields)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_prs:
+                self._entries.popitem(last=False)
+
+    def put_details(self, key: PRKey, details: Dict):
+        self._put(key, details=details, details_at=time.monotonic())
+
+    def put_resources(self, key: PRKey, details: Dict, resources: Dict):
+        self._put(key, details=details, details_at=time.monotonic(),
+                  validator=pr_validator(details), resources=resources)
+
+    def stats(self) -> Dict:
+        return {"revalidated": self.revalidated, "refetched": self.refetched, "cached_prs": len(self._entries)}
@@ -1,24 +1,63 @@
+from enum import Enum
+from typing import Dict
+
 from langchain_core.tools import tool
 
-def merge_decision_tool(code_analysis: str, review_comments: str) -> str:
-    """
-    Decide if the PR should be merged into master, given code analysis and review comments.
-    Returns a message with merge decision, rationale, and risk level (high, medium, low).
-    """
+
+class Verdict(str, Enum):
+    MERGE = "merge"
+    DO_NOT_MERGE = "do_not_merge"
+
+
+class RiskLevel(str, Enum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+
+def format_decision(verdict: Verdict, risk: RiskLevel, rationale: str) -> str:
+    """Renders a decision in the "YES/NO ..." form the rest of the workflow matches on."""
+    prefix = "YES, it is safe to merge." if Verdict(verdict) == Verdict.MERGE else "NO, do not merge."
+    return f"{prefix} {rationale.strip()} Risk level: {RiskLevel(risk).value.upper()}."
+
+
+def parse_decision(message: str) -> Dict:
+    """Best-effort verdict/risk extraction from a free-text decision."""
+    upper = message.upper()
+    verdict = Verdict.MERGE if "YES, IT IS SAFE TO MERGE" in upper else Verdict.DO_NOT_MERGE
+    risk = next((level for level in RiskLevel if f"RISK LEVEL: {level.value.upper()}" in upper), None)
+    return {"verdict": verdict.value, "risk": risk.value if risk else None, "rationale": message}
+
+
+def evaluate_merge_rules(code_analysis: str, review_comments: str) -> Dict:
+    """Deterministic rule engine behind merge_decision_tool; returns verdict, risk and rationale."""
     code_lower = code_analysis.lower()
     comments_lower = review_comments.lower()
 
     # High risk conditions
     if "security" in code_lower or "critical bug" in comments_lower or "security" in comments_lower:
-        return "NO, do not merge. There are potential security or critical issues that need resolution. Risk level: HIGH."
+        return {"verdict": Verdict.DO_NOT_MERGE, "risk": RiskLevel.HIGH,
+                "rationale": "There are potential security or critical issues that need resolution."}
 
     # Medium risk conditions
     if "bug" in comments_lower or "potential issue" in comments_lower:
-        return "NO, do not merge. Some issues need to be fixed. Risk level: MEDIUM."
+        return {"verdict": Verdict.DO_NOT_MERGE, "risk": RiskLevel.MEDIUM,
+                "rationale": "Some issues need to be fixed."}
 
     # Low risk / good to merge conditions
     if "looks good" in comments_lower or "no issues found" in code_lower:
-        return "YES, it is safe to merge. No critical problems were detected. Risk level: LOW."
+        return {"verdict": Verdict.MERGE, "risk": RiskLevel.LOW,
+                "rationale": "No critical problems were detected."}
 
     # Default cautious fallback
-    return "NO, do not merge. Unable to confidently assess the PR. Risk level: MEDIUM."
+    return {"verdict": Verdict.DO_NOT_MERGE, "risk": RiskLevel.MEDIUM,
+            "rationale": "Unable to confidently assess the PR."}
+
+
+def merge_decision_tool(code_analysis: str, review_comments: str) -> str:
+    """
+    Decide if the PR should be merged into master, given code analysis and review comments.
+    Returns a message with merge decision, rationale, and risk level (high, medium, low).
+    """
+    result = evaluate_merge_rules(code_analysis, review_comments)
+    return format_decision(result["verdict"], result["risk"], result["rationale"])
@@ -1,20 +1,34 @@
 import asyncio
 import httpx
 
+BASE_URL = "http://localhost:8000"
+POLL_INTERVAL = 2.0
+
 async def test_analyze_pr():
-    url = "http://localhost:8000/analyze_pr"
     # PR URL without https://
     # pr_url = "https://github.com/artkulak/repo2file/pull/2"
     pr_url = "github.com/firstcontributions/first-contributions/pull/1"
 
-    async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
-        response = await client.post(url, json={"github_link": pr_url})
-        if response.status_code == 200:
-            data = response.json()
-            print("Final Review Summary:")
-            print(data.get("final_review_summary", "No summary returned"))
-        else:
+    # Each request returns quickly; the review itself runs as a background job
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=httpx.Timeout(30.0)) as client:
+        response = await client.post("/review-jobs", json={"github_link": pr_url})
+        if response.status_code != 202:
             print(f"Request failed with status {response.status_code}: {response.text}")
+            return
+
+        job_id = response.json()["job_id"]
+        print(f"Queued review job {job_id}")
+        while True:
+            job = (await client.get(f"/review-jobs/{job_id}")).json()
+            if job["status"] == "completed":
+                print("Final Review Summary:")
+                print(job["result"].get("final_review_summary", "No summary returned"))
+                return
+            if job["status"] == "failed":
+                print(f"Review failed: {job['error']}")
+                return
+            print(f"Status: {job['status']} (node: {job['current_node']})")
+            await asyncio.sleep(POLL_INTERVAL)
 
 if __name__ == "__main__":
     asyncio.run(test_analyze_pr())
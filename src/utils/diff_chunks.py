@@ -0,0 +1,134 @@
+"""
+Splits one file's diff into chunks that each fit an analysis prompt.
+
+Whole hunks are packed in order while they fit max_tokens; a hunk larger
+than that on its own is split at line boundaries into smaller hunks with
+recomputed @@ headers, so line numbers stay accurate in every chunk. The
+file's ---/+++ lines are repeated at the top of each chunk.
+"""
+
+from typing import Dict, List, TypedDict
+
+from src.utils.config_loader import read_base_config
+from src.utils.diff_minify import split_diff
+from src.utils.diff_parser import format_hunk_header, hunk_line_kind
+from src.utils.tokens import count_tokens
+
+_CHUNK_CONFIG = read_base_config().get("CHUNKED_ANALYSIS", {})
+CHUNKING_ENABLED = _CHUNK_CONFIG.get("enabled", True)
+# Diff tokens per chunk; larger file diffs are analyzed chunk by chunk
+CHUNK_TOKENS = _CHUNK_CONFIG.get("chunk_tokens", 6000)
+# Reports combined by one reduce call
+FAN_IN = max(2, _CHUNK_CONFIG.get("fan_in", 4))
+# Concurrent chunk and reduce calls per review, on top of ANALYZER.max_concurrency
+CHUNK_CONCURRENCY = _CHUNK_CONFIG.get("max_concurrency", 16)
+# Raw diff text kept per file while chunking is enabled (instead of DIFF.max_file_bytes)
+MAX_CHUNKED_FILE_BYTES = _CHUNK_CONFIG.get("max_file_bytes", 2000000)
+
+
+class DiffChunk(TypedDict):
+    diff: str
+    part: int           # 1-based
+    new_start: int      # new-file line range the chunk covers
+    new_end: int
+    additions: int
+    deletions: int
+    tokens: int
+
+
+def _hunk_pieces(match, lines: List[str], max_tokens: int, room: int) -> List[Dict]:
+    """
+    The hunk as one piece, or, if it does not fit max_tokens, as several
+    smaller hunks, the first of them filling the room left in the current chunk.
+    """
+    old_no, new_no = int(match.group(1)), int(match.group(3))
+    section = match.string[match.end():]
+    header_tokens = count_tokens(match.string) + 1
+    line_tokens = [count_tokens(line) + 1 for line in lines]
+    split = header_tokens + sum(line_tokens) > max_tokens
+    limit = room if split and room > header_tokens * 4 else max_tokens
+    pieces: List[Dict] = []
+    piece = None
+
+    def start_piece():
+        return {"lines": [], "tokens": header_tokens, "old": (old_no, 0), "new": (new_no, 0),
+                "additions": 0, "deletions": 0}
+
+    for line, tokens in zip(lines, line_tokens):
+        kind = hunk_line_kind(line)
+        if piece is None:
+            piece = start_piece()
+        elif split and piece["lines"] and piece["tokens"] + tokens > limit and kind != "\\":
+            pieces.append(piece)
+            piece = start_piece()
+            limit = max_tokens
+        piece["lines"].append(line)
+        piece["tokens"] += tokens
+        if kind in (" ", "-"):
+            piece["old"] = (piece["old"][0], piece["old"][1] + 1)
+            old_no += 1
+        if kind in (" ", "+"):
+            piece["new"] = (piece["new"][0], piece["new"][1] + 1)
+            new_no += 1
+        if kind == "+":
+            piece["additions"] += 1
+        elif kind == "-":
+            piece["deletions"] += 1
+    if piece is not None:
+        pieces.append(piece)
+
+    out = []
+    for i, piece in enumerate(pieces):
+        (old_start, old_count), (new_start, new_count) = piece["old"], piece["new"]
+        header = match.string if len(pieces) == 1 else format_hunk_header(
+            old_start, old_count, new_start, new_count, section if i == 0 else ""
+        )
+        out.append({
+            "text": "\n".join([header] + piece["lines"]),
+            "tokens": piece["tokens"],
+            "new_start": new_start,
+            "new_end": new_start + max(0, new_count - 1),
+            "additions": piece["additions"],
+            "deletions": piece["deletions"],
+        })
+    return out or [{"text": match.string, "tokens": header_tokens, "new_start": new_no, "new_end": new_no,
+                    "additions": 0, "deletions": 0}]
+
+
+def chunk_diff(diff: str, max_tokens: int = CHUNK_TOKENS) -> List[DiffChunk]:
+    """Splits a single-file diff into chunks of at most about max_tokens tokens each."""
+    header, hunks = split_diff(diff)
+    header = [line for line in header if line]
+    header_tokens = count_tokens("\n".join(header)) + 1 if header else 0
+    # Leave room for the repeated header; a tiny budget still gets one line per chunk
+    limit = max(1, max_tokens - header_tokens)
+
+    chunks: List[DiffChunk] = []
+    current: List[Dict] = []
+
+    def flush():
+        if not current:
+            return
+        chunks.append({
+            "diff": "\n".join(header + [piece["text"] for piece in current]),
+            "part": len(chunks) + 1,
+            "new_start": current[0]["new_start"],
+            "new_end": max(piece["new_end"] for piece in current),
+            "additions": sum(piece["additions"] for piece in current),
+            "deletions": sum(piece["deletions"] for piece in current),
+            "tokens": header_tokens + sum(piece["tokens"] for piece in current),
+        })
+
+    used = 0
+    for match, lines in hunks:
+        for piece in _hunk_pieces(match, lines, limit, limit - used if current else limit):
+            if current and used + piece["tokens"] > limit:
+                flush()
+                current, used = [], 0
+            current.append(piece)
+            used += piece["tokens"]
+    flush()
+    if not chunks:
+        chunks.append({"diff": diff, "part": 1, "new_start": 0, "new_end": 0,
+                       "additions": 0, "deletions": 0, "tokens": count_tokens(diff)})
+    return chunks
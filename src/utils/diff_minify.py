@@ -0,0 +1,296 @@
+"""
+Shrinks per-file diffs before they are rendered into analysis prompts.
+
+- Context lines are cut to `radius` lines around each change; a hunk whose
+  changes are far apart is split into smaller hunks with correct @@ headers,
+  so line numbers in the prompt stay accurate.
+- Whitespace-only hunks and rename/mode-only files become one-line notes.
+- Binary, lockfile and generated files are not sent at all.
+- The index line and the diff --git line are dropped; the prompt names the file.
+
+fit_to_budget() then spreads a per-request token budget across files by
+risk and cuts each diff at hunk boundaries to fit its share. Files too large
+for one prompt, which are analyzed in chunks, keep their whole diff.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.config_loader import read_base_config
+from src.utils.diff_parser import HUNK_HEADER, format_hunk_header, hunk_line_kind
+from src.utils.file_kinds import basename, is_generated, is_lockfile, is_whitespace_only
+from src.utils.tokens import count_tokens
+
+_DIFF_CONFIG = read_base_config().get("DIFF", {})
+MINIFY_ENABLED = _DIFF_CONFIG.get("minify", True)
+CONTEXT_RADIUS = _DIFF_CONFIG.get("context_radius", 2)
+# Prompt tokens of all file diffs in one review; 0 disables the budget
+TOKEN_BUDGET = _DIFF_CONFIG.get("token_budget", 60000)
+MIN_FILE_TOKENS = _DIFF_CONFIG.get("min_file_tokens", 300)
+
+DROPPED_HEADER_PREFIXES = ("diff --git ", "index ", "similarity index ", "dissimilarity index ")
+
+SOURCE_EXTENSIONS = (
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".java", ".kt", ".rb", ".rs", ".c", ".cc", ".cpp",
+    ".h", ".hpp", ".cs", ".php", ".scala", ".swift", ".sql", ".sh",
+)
+DOC_EXTENSIONS = (".md", ".rst", ".txt", ".adoc")
+# Paths whose changes deserve a larger share of the budget
+SENSITIVE_PATTERN = re.compile(
+    r"auth|login|passw|secret|token|crypt|security|permission|session|payment|billing|sql|migration|deserial",
+    re.IGNORECASE,
+)
+
+
+def split_diff(diff: str) -> Tuple[List[str], List[Tuple[re.Match, List[str]]]]:
+    """Splits a single-file diff into its header lines and (header match, lines) per hunk."""
+    header: List[str] = []
+    hunks: List[Tuple[re.Match, List[str]]] = []
+    for line in diff.split("\n"):
+        match = HUNK_HEADER.match(line) if line.startswith("@@") else None
+        if match:
+            hunks.append((match, []))
+        elif hunks:
+            hunks[-1][1].append(line)
+        else:
+            header.append(line)
+    return header, hunks
+
+
+def minify_hunk(match: re.Match, lines: List[str], radius: int) -> Tuple[List[str], Dict[str, int]]:
+    """Returns the hunk as one or more smaller hunks (header + lines each) and counters."""
+    old_no, new_no = int(match.group(1)), int(match.group(3))
+    section = match.string[match.end():]
+    kinds = [hunk_line_kind(line) for line in lines]
+    removed = [line[1:] for line, kind in zip(lines, kinds) if kind == "-"]
+    added = [line[1:] for line, kind in zip(lines, kinds) if kind == "+"]
+    stats = {"context_dropped": 0, "whitespace_hunks": 0}
+
+    # Folded only when tokens and indentation are unchanged line for line
+    # (no filename: indentation always counts), so control flow stays visible
+    if (removed or added) and is_whitespace_only(removed, added, filename=None):
+        stats["whitespace_hunks"] = 1
+        return [f"{match.group(0)}{section} [whitespace-only change to {len(removed) + len(added)} line(s), omitted]"], stats
+
+    changes = [i for i, kind in enumerate(kinds) if kind in ("+", "-")]
+    keep = [kind != " " for kind in kinds]
+    for i in changes:
+        for j in range(max(0, i - radius), min(len(lines), i + radius + 1)):
+            keep[j] = True
+    # A "\ No newline" marker follows whatever line it annotates
+    for i, kind in enumerate(kinds):
+        if kind == "\\" and i and not keep[i - 1]:
+            keep[i] = False
+
+    out: List[str] = []
+    run: List[str] = []
+    run_start = None
+    counts = [0, 0]
+
+    def flush():
+        if run:
+            out.append(format_hunk_header(run_start[0], counts[0], run_start[1], counts[1], section if not out else ""))
+            out.extend(run)
+
+    for line, kind, kept in zip(lines, kinds, keep):
+        if kind == "other":
+            flush()
+            run = []
+            out.append(line)
+            continue
+        if kept:
+            if not run:
+                run_start, counts = (old_no, new_no), [0, 0]
+            run.append(line)
+            if kind in (" ", "-"):
+                counts[0] += 1
+            if kind in (" ", "+"):
+                counts[1] += 1
+        else:
+            if run:
+                flush()
+                run = []
+            stats["context_dropped"] += 1
+        if kind in (" ", "-"):
+            old_no += 1
+        if kind in (" ", "+"):
+            new_no += 1
+    flush()
+    return out, stats
+
+
+def skip_reason(change: Dict) -> Optional[str]:
+    """Files whose diff is not worth sending: a triage SKIP_REASONS key, or None."""
+    filename = change.get("filename", "")
+    if change.get("is_binary"):
+        return "binary"
+    if is_lockfile(filename):
+        return "lockfile"
+    if is_generated(filename):
+        return "generated"
+    return None
+
+
+def minify_diff(change: Dict, radius: int = CONTEXT_RADIUS) -> Dict:
+    """
+    Returns {"diff", "header", "hunks", "context_dropped", "whitespace_hunks"}
+    where "hunks" are the minified hunk texts, in order.
+    """
+    header, hunks = split_diff(change.get("diff", ""))
+    stats = {"context_dropped": 0, "whitespace_hunks": 0}
+    if not hunks:
+        # Renames, mode changes and empty files carry no content
+        notes = [line for line in header if line and not line.startswith(DROPPED_HEADER_PREFIXES)]
+        if change.get("status") == "renamed":
+            summary = f"[renamed from {change.get('old_path') or 'another path'}; content unchanged]"
+        else:
+            summary = f"[no content changes: {'; '.join(notes) or 'empty diff'}]"
+        return {"diff": summary, "header": [], "hunks": [], **stats}
+
+    kept_header = [
+        line for line in header
+        if line and not line.startswith(DROPPED_HEADER_PREFIXES)
+    ]
+    hunk_texts = []
+    for match, lines in hunks:
+        minified, hunk_stats = minify_hunk(match, lines, radius)
+        for key in stats:
+            stats[key] += hunk_stats[key]
+        hunk_texts.append("\n".join(minified))
+    return {"diff": "\n".join(kept_header + hunk_texts), "hunks": hunk_texts, "header": kept_header, **stats}
+
+
+def file_risk(change: Dict) -> float:
+    """Relative weight of a file in the token budget."""
+    filename = change.get("filename", "")
+    changed = change.get("additions", 0) + change.get("deletions", 0)
+    weight = math.sqrt(1 + changed)
+    name = basename(filename)
+    if filename.endswith(SOURCE_EXTENSIONS):
+        weight *= 2
+    elif filename.endswith(DOC_EXTENSIONS):
+        weight *= 0.5
+    if name.startswith("test_") or "/tests/" in f"/{filename}" or "_test." in name or ".spec." in name:
+        weight *= 0.75
+    if SENSITIVE_PATTERN.search(filename):
+        weight *= 2
+    if change.get("status") == "added":
+        weight *= 1.25
+    return weight
+
+
+def allocate_budget(needs: Dict[str, int], weights: Dict[str, float], budget: int, min_tokens: int = 0) -> Dict[str, int]:
+    """
+    Water-filling: files needing less than their weighted share get what they
+    need, and the rest of the budget is re-split among the others by weight.
+    """
+    allocation: Dict[str, int] = {}
+    remaining = dict(needs)
+    left = budget
+    while remaining:
+        total_weight = sum(weights[name] for name in remaining) or 1.0
+        shares = {name: left * weights[name] / total_weight for name in remaining}
+        fits = [name for name in remaining if remaining[name] <= shares[name]]
+        if not fits:
+            for name in remaining:
+                allocation[name] = max(min_tokens, int(shares[name]))
+            break
+        for name in fits:
+            allocation[name] = remaining.pop(name)
+            left -= allocation[name]
+    return allocation
+
+
+def cut_to_tokens(minified: Dict, limit: int) -> Tuple[str, int]:
+    """Keeps whole hunks in order while they fit; returns the text and the number of hunks omitted."""
+    header = minified.get("header", [])
+    used = count_tokens("\n".join(header))
+    kept: List[str] = []
+    hunks = minified["hunks"]
+    for i, hunk in enumerate(hunks):
+        tokens = count_tokens(hunk) + 1
+        if used + tokens > limit:
+            if not kept:
+                # Not even one hunk fits: keep the start of the first one
+                lines = []
+                for line in hunk.split("\n"):
+                    used += count_tokens(line) + 1
+                    if used > limit and lines:
+                        break
+                    lines.append(line)
+                kept.append("\n".join(lines))
+                i += 1
+            omitted = len(hunks) - i
+            note = f"... [{omitted} more hunk(s) omitted to fit the token budget]"
+            return "\n".join(header + kept + ([note] if omitted else ["... [hunk cut to fit the token budget]"])), omitted
+        kept.append(hunk)
+        used += tokens
+    return "\n".join(header + kept), 0
+
+
+def fit_to_budget(file_changes: Dict[str, Dict], radius: int = CONTEXT_RADIUS, budget: Optional[int] = TOKEN_BUDGET,
+                  min_file_tokens: int = MIN_FILE_TOKENS,
+                  chunk_tokens: Optional[int] = None) -> Tuple[Dict[str, Dict], Dict[str, str], Dict]:
+    """
+    Minifies every file's diff and enforces the request's token budget.
+    Files whose minified diff exceeds chunk_tokens are analyzed in chunks and
+    left out of the budget, so none of their hunks are dropped.
+
+    Returns (changes with the prompt diff in "diff", filename -> skip reason,
+    report of raw vs prompt tokens per file and in total).
+    """
+    prepared: Dict[str, Dict] = {}
+    skipped: Dict[str, str] = {}
+    minified: Dict[str, Dict] = {}
+    files: Dict[str, Dict] = {}
+    for name, change in file_changes.items():
+        raw_tokens = count_tokens(change.get("diff", ""))
+        reason = skip_reason(change)
+        if reason:
+            skipped[name] = reason
+            files[name] = {"raw_tokens": raw_tokens, "prompt_tokens": 0, "skipped": reason}
+            continue
+        minified[name] = minify_diff(change, radius)
+        files[name] = {
+            "raw_tokens": raw_tokens,
+            "minified_tokens": count_tokens(minified[name]["diff"]),
+            "context_lines_dropped": minified[name]["context_dropped"],
+            "whitespace_hunks_folded": minified[name]["whitespace_hunks"],
+        }
+
+    needs = {name: files[name]["minified_tokens"] for name in minified}
+    if chunk_tokens:
+        for name, tokens in needs.items():
+            if tokens > chunk_tokens:
+                files[name]["chunked"] = True
+        needs = {name: tokens for name, tokens in needs.items() if not files[name].get("chunked")}
+    allocation = needs
+    if budget and sum(needs.values()) > budget:
+        weights = {name: file_risk(file_changes[name]) for name in minified}
+        allocation = allocate_budget(needs, weights, budget, min_file_tokens)
+
+    for name, result in minified.items():
+        diff, omitted = result["diff"], 0
+        if files[name].get("chunked"):
+            files[name]["prompt_tokens"] = files[name]["minified_tokens"]
+            prepared[name] = {**file_changes[name], "diff": diff}
+            continue
+        if allocation[name] < needs[name]:
+            diff, omitted = cut_to_tokens(result, allocation[name])
+            files[name]["budget"] = allocation[name]
+            files[name]["hunks_omitted"] = omitted
+        files[name]["prompt_tokens"] = count_tokens(diff) if diff is not result["diff"] else needs[name]
+        prepared[name] = {**file_changes[name], "diff": diff}
+
+    raw_total = sum(f["raw_tokens"] for f in files.values())
+    prompt_total = sum(f["prompt_tokens"] for f in files.values())
+    report = {
+        "files": files,
+        "raw_tokens": raw_total,
+        "prompt_tokens": prompt_total,
+        "tokens_saved": raw_total - prompt_total,
+        "saved_pct": round(100 * (raw_total - prompt_total) / raw_total, 1) if raw_total else 0.0,
+        "budget": budget,
+    }
+    return prepared, skipped, report
@@ -0,0 +1,244 @@
+"""
+Streaming unified-diff parser.
+
+Reads a diff one file section at a time and yields one record per file, with a record per
+hunk (old/new line ranges and the offsets of added/removed lines inside the
+hunk). Only the file currently being parsed is held in memory, and the raw
+text kept per file is capped by a byte budget instead of truncating the
+whole diff.
+"""
+
+import re
+import hashlib
+from typing import Dict, IO, Iterable, Iterator, List, Optional, TypedDict, Union
+
+FILE_HEADER = "diff --git "
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class HunkRecord(TypedDict):
+    header: str
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    position: int               # diff position of the @@ line (0 for the first hunk)
+    added_offsets: List[int]    # 1-based offsets of "+" lines after the @@ line
+    removed_offsets: List[int]  # 1-based offsets of "-" lines after the @@ line
+    marker_offsets: List[int]   # offsets of "\ No newline at end of file" lines
+
+
+class FileDiffRecord(TypedDict):
+    old_path: str
+    new_path: str
+    filename: str
+    status: str                 # added, removed, renamed, modified
+    is_binary: bool
+    additions: int
+    deletions: int
+    diff: str
+    size_bytes: int
+    digest: str                 # sha256 of the full file diff, including any truncated tail
+    truncated: bool
+    hunks: List[HunkRecord]
+
+
+def _iter_file_texts(source: Union[str, IO[str], Iterable[str]]) -> Iterator[str]:
+    """Yields the raw text of one file section at a time."""
+    if isinstance(source, str):
+        start = 0 if source.startswith(FILE_HEADER) else source.find("\n" + FILE_HEADER)
+        if start == -1:
+            return
+        start = start + 1 if start else 0
+        while True:
+            end = source.find("\n" + FILE_HEADER, start)
+            if end == -1:
+                yield source[start:]
+                return
+            yield source[start:end + 1]
+            start = end + 1
+
+    buffer: List[str] = []
+    for line in source:
+        if line.startswith(FILE_HEADER):
+            if buffer:
+                yield "".join(buffer)
+            buffer = [line]
+        elif buffer:
+            buffer.append(line)
+    if buffer:
+        yield "".join(buffer)
+
+
+def _header_paths(line: str):
+    # "diff --git a/<old> b/<new>"; exact paths are refined from ---/+++ lines
+    rest = line[len(FILE_HEADER):]
+    split = rest.find(" b/")
+    if rest.startswith("a/") and split != -1:
+        return rest[2:split], rest[split + 3:]
+    return rest, rest
+
+
+def hunk_line_kind(line: str) -> str:
+    """Kind of a line inside a hunk: "+", "-", " " (context), "\\" (no-newline marker) or "other"."""
+    first = line[:1]
+    if first in ("+", "-", "\\"):
+        return first
+    if first == " " or line == "":
+        return " "
+    # Notes appended by the parser, such as "... [diff truncated ...]"
+    return "other"
+
+
+def format_hunk_header(old_start: int, old_count: int, new_start: int, new_count: int, section: str = "") -> str:
+    """An @@ header for the given line ranges; section is the text after the closing @@."""
+    # An empty side points at the line before it, as git does
+    old_start = max(0, old_start - 1) if old_count == 0 else old_start
+    new_start = max(0, new_start - 1) if new_count == 0 else new_start
+    return f"@@ -{old_start},{old_count} +{new_start},{new_count} @@{section}"
+
+
+def _new_hunk(line: str, position: int) -> Optional[HunkRecord]:
+    match = HUNK_HEADER.match(line)
+    if not match:
+        return None
+    old_start, old_count, new_start, new_count = match.groups()
+    return {
+        "header": line,
+        "old_start": int(old_start),
+        "old_count": int(old_count) if old_count is not None else 1,
+        "new_start": int(new_start),
+        "new_count": int(new_count) if new_count is not None else 1,
+        "position": position,
+        "added_offsets": [],
+        "removed_offsets": [],
+        "marker_offsets": [],
+    }
+
+
+def parse_file_diff(text: str, max_file_bytes: Optional[int] = None) -> FileDiffRecord:
+    """Parses the section of a unified diff belonging to a single file."""
+    data = text.encode("utf-8", "replace")
+    size_bytes = len(data)
+    truncated = max_file_bytes is not None and size_bytes > max_file_bytes
+    if truncated:
+        kept = data[:max_file_bytes].decode("utf-8", "ignore")
+        kept = kept[:kept.rfind("\n") + 1] or kept
+        diff = kept.strip() + f"\n... [diff truncated at {max_file_bytes} bytes of {size_bytes}]"
+    else:
+        diff = text.strip()
+
+    lines = text.split("\n")
+    if text.endswith("\n"):
+        lines.pop()
+
+    old_path, new_path = _header_paths(lines[0])
+    status = "modified"
+    is_binary = False
+    additions = deletions = 0
+    hunks: List[HunkRecord] = []
+
+    # Extended header lines up to the first hunk
+    index = 1
+    for index in range(1, len(lines) + 1):
+        if index == len(lines):
+            break
+        line = lines[index]
+        if line.startswith("@@"):
+            break
+        if line.startswith("new file mode"):
+            status = "added"
+        elif line.startswith("deleted file mode"):
+            status = "removed"
+        elif line.startswith("rename from "):
+            status = "renamed"
+            old_path = line[len("rename from "):]
+        elif line.startswith("rename to "):
+            status = "renamed"
+            new_path = line[len("rename to "):]
+        elif line.startswith("Binary files") or line.startswith("GIT binary patch"):
+            is_binary = True
+        elif line.startswith("--- a/"):
+            old_path = line[6:]
+        elif line.startswith("+++ b/"):
+            new_path = line[6:]
+
+    # Hunks: every line after the first @@ occupies one diff position
+    hunk = None
+    position = -1
+    offset = 0
+    for line in lines[index:]:
+        position += 1
+        if line.startswith("@@"):
+            candidate = _new_hunk(line, position)
+            if candidate is not None:
+                hunk = candidate
+                hunks.append(hunk)
+                offset = 0
+                continue
+        if hunk is None:
+            continue
+        offset += 1
+        first = line[:1]
+        if first == "+":
+            additions += 1
+            hunk["added_offsets"].append(offset)
+        elif first == "-":
+            deletions += 1
+            hunk["removed_offsets"].append(offset)
+        elif first == "\\":
+            # "\ No newline at end of file" still occupies a diff position
+            hunk["marker_offsets"].append(offset)
+
+    return {
+        "old_path": old_path,
+        "new_path": new_path,
+        "filename": old_path if status == "removed" else new_path,
+        "status": status,
+        "is_binary": is_binary,
+        "additions": additions,
+        "deletions": deletions,
+        "diff": diff,
+        "size_bytes": size_bytes,
+        "digest": hashlib.sha256(data).hexdigest(),
+        "truncated": truncated,
+        "hunks": hunks,
+    }
+
+
+def iter_file_diffs(source: Union[str, IO[str], Iterable[str]], max_file_bytes: Optional[int] = None) -> Iterator[FileDiffRecord]:
+    """
+    Parses a unified diff incrementally, yielding one record per file.
+
+    Args:
+        source: The diff as a string, a text stream or any iterable of lines.
+        max_file_bytes: Cap on the raw diff text kept per file; hunks are
+            still indexed past the cap. None keeps everything.
+    """
+    for text in _iter_file_texts(source):
+        yield parse_file_diff(text, max_file_bytes)
+
+
+def parse_diff(source: Union[str, IO[str], Iterable[str]], max_file_bytes: Optional[int] = None) -> Dict[str, FileDiffRecord]:
+    """Convenience wrapper returning filename -> record."""
+    return {record["filename"]: record for record in iter_file_diffs(source, max_file_bytes)}
+
+
+def new_line_positions(hunks: List[HunkRecord]) -> Dict[int, int]:
+    """
+    Maps every new-file line the diff shows (added or context) to its diff
+    position, the anchor GitHub review comments use. Removed lines and
+    lines outside the hunks have no position.
+    """
+    positions: Dict[int, int] = {}
+    for hunk in hunks:
+        skipped = set(hunk["removed_offsets"]).union(hunk["marker_offsets"])
+        # Context lines are the new side's lines that were not added
+        total = len(skipped) + hunk["new_count"]
+        line = hunk["new_start"]
+        for offset in range(1, total + 1):
+            if offset in skipped:
+                continue
+            positions[line] = hunk["position"] + offset
+            line += 1
+    return positions
@@ -0,0 +1,184 @@
+"""
+Cheap, local classification of changed files and hunks.
+
+Used by the triage stage to decide which files are worth an LLM call:
+lockfiles, generated or vendored files, and changes that only touch
+whitespace, comments or docstrings are reviewed by rules instead.
+"""
+
+import io
+import ast
+import fnmatch
+import tokenize
+from typing import Dict, List, Optional, Tuple
+
+LOCKFILE_NAMES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "pdm.lock", "Cargo.lock",
+    "Gemfile.lock", "composer.lock", "go.sum", "mix.lock", "pubspec.lock",
+    "packages.lock.json", "flake.lock",
+}
+
+GENERATED_PATTERNS = [
+    "*.min.js", "*.min.css", "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go",
+    "*.generated.*", "*_generated.*", "*.g.dart", "*.snap",
+    "vendor/*", "*/vendor/*", "node_modules/*", "*/node_modules/*",
+    "dist/*", "build/*", "__generated__/*", "*/__generated__/*",
+]
+
+# Markers that generators conventionally put near the top of a file
+GENERATED_MARKERS = ("@generated", "do not edit", "code generated by", "autogenerated", "auto-generated")
+
+# Leading whitespace is syntax in these files
+INDENT_SENSITIVE_PATTERNS = ["*.py", "*.pyi", "*.yaml", "*.yml", "Makefile", "makefile", "GNUmakefile", "*.mk"]
+
+SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER}
+STATEMENT_START = {tokenize.NEWLINE, tokenize.NL, tokenize.INDENT, tokenize.DEDENT, None}
+
+
+def basename(filename: str) -> str:
+    return filename.rsplit("/", 1)[-1]
+
+def is_python(filename: str) -> bool:
+    return filename.endswith((".py", ".pyi"))
+
+def is_lockfile(filename: str) -> bool:
+    return basename(filename) in LOCKFILE_NAMES
+
+def is_generated(filename: str, added_lines: Optional[List[str]] = None) -> bool:
+    """Matches well-known generated/vendored paths, or a generator marker in the first added lines."""
+    if any(fnmatch.fnmatch(filename, pattern) for pattern in GENERATED_PATTERNS):
+        return True
+    head = "\n".join((added_lines or [])[:5]).lower()
+    return any(marker in head for marker in GENERATED_MARKERS)
+
+
+def hunk_sides(diff: str) -> List[Tuple[List[str], List[str], List[str], List[str]]]:
+    """
+    Splits a single-file diff into hunks of (old_side, new_side, removed, added)
+    line lists, where each side includes the context lines.
+    """
+    hunks = []
+    current = None
+    for line in diff.split("\n"):
+        if line.startswith("@@"):
+            current = ([], [], [], [])
+            hunks.append(current)
+            continue
+        if current is None or line.startswith("\\"):
+            continue
+        old_side, new_side, removed, added = current
+        marker, text = line[:1], line[1:]
+        if marker == "-":
+            old_side.append(text)
+            removed.append(text)
+        elif marker == "+":
+            new_side.append(text)
+            added.append(text)
+        else:
+            old_side.append(text)
+            new_side.append(text)
+    return hunks
+
+
+def indentation_matters(filename: str) -> bool:
+    """True for files where leading whitespace is syntax (Python, YAML, Makefiles)."""
+    return any(fnmatch.fnmatch(basename(filename), pattern) for pattern in INDENT_SENSITIVE_PATTERNS)
+
+
+def _layout_lines(lines: List[str], keep_indent: bool) -> List[str]:
+    """Non-blank lines without trailing whitespace or CRs, and without indentation unless keep_indent."""
+    out = []
+    for line in lines:
+        line = line.rstrip()
+        if line:
+            out.append(line if keep_indent else line.lstrip())
+    return out
+
+
+def is_whitespace_only(removed: List[str], added: List[str], filename: Optional[str] = None) -> bool:
+    """
+    True when the change only touches trailing whitespace, line endings or
+    blank lines. Whitespace inside a line always counts, so joined or split
+    tokens are a real change; leading indentation counts too unless filename
+    is known not to care about it.
+    """
+    keep_indent = filename is None or indentation_matters(filename)
+    return _layout_lines(removed, keep_indent) == _layout_lines(added, keep_indent)
+
+
+def _tokens(text: str, indents: Optional[List[str]] = None) -> Optional[List[Tuple[int, str]]]:
+    """
+    Tokens of a Python snippet without comments, layout or docstrings; None if
+    it does not tokenize. With indents (the leading whitespace of each source
+    line), every statement's indentation is kept as a token of its own.
+    """
+    try:
+        raw = list(tokenize.generate_tokens(io.StringIO(text + "\n").readline))
+    except (tokenize.TokenError, SyntaxError):
+        return None
+    tokens = []
+    previous = None
+    for index, token in enumerate(raw):
+        following = raw[index + 1].type if index + 1 < len(raw) else None
+        # A string that forms a statement by itself is a docstring
+        is_docstring = (
+            token.type == tokenize.STRING
+            and previous in STATEMENT_START
+            and following in (tokenize.NEWLINE, tokenize.NL, tokenize.ENDMARKER, None)
+        )
+        if token.type not in SKIPPED_TOKENS and not is_docstring:
+            if indents is not None and previous in STATEMENT_START:
+                row = token.start[0]
+                tokens.append((tokenize.INDENT, indents[row - 1] if row <= len(indents) else ""))
+            tokens.append((token.type, token.string))
+        if token.type not in (tokenize.COMMENT, tokenize.NL):
+            previous = token.type
+    return tokens
+
+
+def _indents(lines: List[str]) -> List[str]:
+    return [line[:len(line) - len(line.lstrip())] for line in lines]
+
+
+def is_comment_only_python(old_side: List[str], new_side: List[str]) -> bool:
+    """
+    True when a Python hunk only changes comments, docstrings or whitespace
+    that is not indentation.
+
+    A hunk may start or end inside a triple-quoted string. When the snippet
+    does not tokenize as is, it is retried with the string re-opened at the
+    start or closed at the end, and the hunk only counts as comment-only if
+    every reading that tokenizes on both sides agrees.
+    """
+    # Lines are tokenized dedented, which keeps partial blocks tokenizable, and
+    # each statement's original indentation is compared alongside its tokens
+    old_text = "\n".join(line.strip() for line in old_side)
+    new_text = "\n".join(line.strip() for line in new_side)
+    old_indents, new_indents = _indents(old_side), _indents(new_side)
+    old_tokens, new_tokens = _tokens(old_text, old_indents), _tokens(new_text, new_indents)
+    if old_tokens is not None and new_tokens is not None:
+        return old_tokens == new_tokens
+
+    readings = 0
+    for quote in ('"""', "'''"):
+        for prefix, suffix in ((quote, ""), ("", quote)):
+            old_tokens = _tokens(prefix + old_text + suffix, old_indents)
+            new_tokens = _tokens(prefix + new_text + suffix, new_indents)
+            if old_tokens is None or new_tokens is None:
+                continue
+            if old_tokens != new_tokens:
+                return False
+            readings += 1
+    return readings > 0
+
+
+def python_syntax_error(source: str) -> Optional[Dict]:
+    """Returns {"line", "message"} if source does not parse, else None."""
+    try:
+        ast.parse(source)
+    except SyntaxError as e:
+        return {"line": e.lineno or 1, "message": f"SyntaxError: {e.msg}"}
+    except ValueError as e:
+        return {"line": 1, "message": f"ValueError: {e}"}
+    return None
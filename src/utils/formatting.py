@@ -0,0 +1,6 @@
+import re
+
+ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+
+def strip_ansi_codes(text):
+    return ANSI_ESCAPE.sub('', text)
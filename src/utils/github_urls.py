@@ -0,0 +1,23 @@
+import re
+
+def parse_github_pr_url(url: str):
+    """
+    Parses a GitHub PR URL and returns (owner, repo, pr_number)
+    Accepts URL with or without https:// prefix.
+    """
+    pattern = r"^(https://)?github\.com/([^/]+)/([^/]+)/pull/(\d+)$"
+    match = re.match(pattern, url.strip())
+    if match:
+        _, owner, repo, pr_number = match.groups()
+        return owner, repo, int(pr_number)
+    raise ValueError("Invalid GitHub PR URL format.")
+
+def parse_github_repo(repo: str):
+    """
+    Parses "owner/repo" or a GitHub repository URL and returns (owner, repo).
+    """
+    pattern = r"^(?:(?:https://)?github\.com/)?([^/\s]+)/([^/\s]+?)(?:\.git)?/?$"
+    match = re.match(pattern, repo.strip())
+    if match:
+        return match.group(1), match.group(2)
+    raise ValueError("Invalid GitHub repository format, expected owner/repo.")
@@ -0,0 +1,169 @@
+"""
+Incremental parser for a JSON array of objects arriving in chunks.
+
+Feed it LLM output as it streams; every object of the first array whose next
+token is an object (or the empty array) is returned as soon as its closing
+brace arrives. Text around the array, such as prose or a ```json fence, is
+ignored, and so is a wrapper like {"comments": [...]}. On close(), an object
+cut off partway is repaired where possible: an open string is closed, an
+incomplete trailing member is dropped and open brackets are closed.
+
+Each character is scanned once, so parsing costs O(n) over the whole output.
+"""
+
+import re
+import json
+from typing import Dict, List, Optional
+
+_STRUCTURAL = re.compile(r'[\[\]{}",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+
+SEEK, OPEN, ARRAY, DONE = "seek", "open", "array", "done"
+
+
+class JsonArrayStreamParser:
+    def __init__(self):
+        self.state = SEEK
+        self.objects = 0     # objects returned by feed()
+        self.recovered = 0   # cut-off objects repaired by close()
+        self.skipped = 0     # complete items that were not valid JSON objects
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._obj_start: Optional[int] = None
+        self._member_end: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Adds a chunk and returns the objects it completed."""
+        if self.state == DONE or not chunk:
+            return []
+        self._buf += chunk
+        out: List[Dict] = []
+        buf = self._buf
+        pos = self._pos
+
+        while pos < len(buf) and self.state != DONE:
+            if self.state == SEEK:
+                pos = buf.find("[", pos)
+                if pos < 0:
+                    pos = len(buf)
+                    break
+                self.state = OPEN
+                pos += 1
+                continue
+
+            if self.state == OPEN:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos == len(buf):
+                    break
+                if buf[pos] == "{":
+                    self.state = ARRAY
+                elif buf[pos] == "]":
+                    self.state = DONE
+                else:
+                    self.state = SEEK
+                continue
+
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                pos = match.start()
+                if buf[pos] == "\\":
+                    if pos + 1 == len(buf):
+                        # The escaped character has not arrived yet
+                        break
+                    pos += 2
+                    continue
+                self._in_string = False
+                pos += 1
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            pos = match.start()
+            ch = buf[pos]
+            depth = len(self._stack)
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if depth == 0 and ch == "{":
+                    self._obj_start = pos
+                    self._member_end = None
+                self._stack.append(ch)
+            elif ch == ",":
+                if depth == 1 and self._stack[0] == "{":
+                    self._member_end = pos
+            elif depth == 0:
+                if ch == "]":
+                    self.state = DONE
+            else:
+                self._stack.pop()
+                if depth == 1:
+                    if ch == "}" and self._obj_start is not None:
+                        self._emit(buf[self._obj_start:pos + 1], out)
+                    self._obj_start = None
+            pos += 1
+
+        # Keep only the unfinished object, if any
+        keep = self._obj_start if self.state == ARRAY and self._obj_start is not None else pos
+        if keep > 0:
+            buf = buf[keep:]
+            pos -= keep
+            if self._obj_start is not None:
+                self._obj_start -= keep
+            if self._member_end is not None:
+                self._member_end -= keep
+        self._buf, self._pos = buf, pos
+        return out
+
+    def _emit(self, text: str, out: List[Dict]):
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = None
+        if isinstance(value, dict):
+            self.objects += 1
+            out.append(value)
+        else:
+            self.skipped += 1
+
+    def close(self) -> List[Dict]:
+        """Ends the stream; returns the cut-off object, repaired, if there was one."""
+        partial = None
+        if self.state == ARRAY and self._obj_start is not None:
+            partial = self._repair()
+        self.state = DONE
+        self._buf, self._pos = "", 0
+        if partial is None:
+            return []
+        self.recovered += 1
+        return [partial]
+
+    def _repair(self) -> Optional[Dict]:
+        text = self._buf[self._obj_start:]
+        closers = "".join(_CLOSERS[c] for c in reversed(self._stack))
+        candidates = []
+        if self._in_string:
+            # Drop a dangling escape before closing the string
+            trailing = len(text) - len(text.rstrip("\\"))
+            candidates.append(text[:len(text) - trailing % 2] + '"' + closers)
+        else:
+            candidates.append(text.rstrip().rstrip(",") + closers)
+        if self._member_end is not None:
+            # Fall back to the object's last complete member
+            candidates.append(self._buf[self._obj_start:self._member_end] + "}")
+        for candidate in candidates:
+            try:
+                value = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(value, dict) and value:
+                return value
+        return None
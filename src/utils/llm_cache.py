@@ -0,0 +1,225 @@
+"""
+Content-addressed cache for LLM responses.
+
+The key is a SHA-256 of LangChain's llm_string (model, temperature and the
+other invocation parameters) and the rendered prompt, so byte-identical calls
+are answered without going to the provider. Entries live in an in-memory LRU
+backed by a SQLite file, with TTL and size-based eviction on both tiers.
+"""
+
+import os
+import time
+import json
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from src.utils.config_loader import read_base_config
+
+# Per-request switch: when True, lookups miss and fresh responses overwrite the entry
+_CACHE_BYPASS: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+def set_cache_bypass(bypass: bool):
+    """Sets the bypass flag for the current request context."""
+    return _CACHE_BYPASS.set(bool(bypass))
+
+def cache_bypassed() -> bool:
+    """Whether the current request context bypasses the cache."""
+    return _CACHE_BYPASS.get()
+
+def _serialize(generations: Sequence[Generation]) -> str:
+    return json.dumps([
+        {"message": message_to_dict(g.message)} if isinstance(g, ChatGeneration) else {"text": g.text}
+        for g in generations
+    ])
+
+def _mark_cache_hit(generations: Sequence[Generation]) -> list:
+    """Copies of cached generations tagged so usage metrics do not count them as provider calls."""
+    return [
+        ChatGeneration(message=g.message.model_copy(
+            update={"response_metadata": {**g.message.response_metadata, "cache_hit": True}}
+        )) if isinstance(g, ChatGeneration) else g
+        for g in generations
+    ]
+
+def _deserialize(value: str) -> list:
+    return [
+        ChatGeneration(message=messages_from_dict([item["message"]])[0]) if "message" in item
+        else Generation(text=item["text"])
+        for item in json.loads(value)
+    ]
+
+
+class LLMResponseCache(BaseCache):
+    def __init__(
+        self,
+        path: str = ".cache/llm_cache.sqlite",
+        memory_entries: int = 512,
+        max_entries: int = 20000,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created_at > self.ttl_seconds
+
+    # ---------- memory tier ----------
+    def _memory_get(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self._expired(created_at):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_put(self, key: str, value, created_at: float):
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # ---------- disk tier ----------
+    def _disk_get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self._expired(created_at):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        generations = _deserialize(value)
+        self._memory_put(key, generations, created_at)
+        return generations
+
+    def _disk_put(self, key: str, return_val: Sequence[Generation], created_at: float):
+        value = _serialize(return_val)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, created_at, created_at),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    # ---------- BaseCache interface ----------
+    def lookup(self, prompt: str, llm_string: str):
+        if _CACHE_BYPASS.get():
+            self.bypassed += 1
+            return None
+        key = self.make_key(prompt, llm_string)
+        value = self._memory_get(key)
+        if value is None:
+            value = self._disk_get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _mark_cache_hit(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self.make_key(prompt, llm_string)
+        created_at = time.time()
+        self._memory_put(key, list(return_val), created_at)
+        self._disk_put(key, return_val, created_at)
+
+    async def alookup(self, prompt: str, llm_string: str):
+        if _CACHE_BYPASS.get():
+            self.bypassed += 1
+            return None
+        key = self.make_key(prompt, llm_string)
+        value = self._memory_get(key)
+        if value is None:
+            value = await asyncio.to_thread(self._disk_get, key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _mark_cache_hit(value)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self.make_key(prompt, llm_string)
+        created_at = time.time()
+        self._memory_put(key, list(return_val), created_at)
+        await asyncio.to_thread(self._disk_put, key, return_val, created_at)
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+LLM_CACHE = None
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Returns the process-wide cache, or None when disabled in config."""
+    global LLM_CACHE
+    cache_config = read_base_config().get("LLM_CACHE", {})
+    if not cache_config.get("enabled", False):
+        return None
+    if LLM_CACHE is None:
+        LLM_CACHE = LLMResponseCache(
+            path=cache_config.get("path", ".cache/llm_cache.sqlite"),
+            memory_entries=cache_config.get("memory_entries", 512),
+            max_entries=cache_config.get("max_entries", 20000),
+            ttl_seconds=cache_config.get("ttl_seconds", 7 * 24 * 3600),
+        )
+    return LLM_CACHE
@@ -0,0 +1,98 @@
+"""
+Process-wide registry of shared LLM clients and prompt templates.
+
+Chat models are built once per (model, temperature) and share a single
+keep-alive HTTP connection pool, instead of every agent call constructing a
+new ChatOpenAI client with its own pool. Entries are created lazily under a
+lock, so concurrent requests reuse the same instances.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+from src.utils.config_loader import read_base_config
+from src.utils.llm_cache import get_llm_cache
+from src.utils.metrics import USAGE_CALLBACK
+
+LLM_CONFIG = read_base_config().get("LLM", {})
+
+_LOCK = threading.Lock()
+_CHAT_MODELS: Dict[Tuple[str, float], BaseChatModel] = {}
+_PROMPTS: Dict[str, ChatPromptTemplate] = {}
+_HTTP_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+# Optional override used by offline benchmarks: (model, temperature) -> chat model
+_CHAT_MODEL_FACTORY: Optional[Callable[[str, float], BaseChatModel]] = None
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    global _HTTP_ASYNC_CLIENT
+    with _LOCK:
+        if _HTTP_ASYNC_CLIENT is None:
+            _HTTP_ASYNC_CLIENT = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_CONFIG.get("max_connections", 50),
+                    max_keepalive_connections=LLM_CONFIG.get("max_keepalive_connections", 20),
+                    keepalive_expiry=LLM_CONFIG.get("keepalive_expiry", 60),
+                ),
+                timeout=httpx.Timeout(LLM_CONFIG.get("request_timeout", 120)),
+            )
+        return _HTTP_ASYNC_CLIENT
+
+
+def _build_chat_model(model: str, temperature: float) -> BaseChatModel:
+    if _CHAT_MODEL_FACTORY is not None:
+        return _CHAT_MODEL_FACTORY(model, temperature)
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=LLM_CONFIG.get("max_retries", 2),
+        http_async_client=get_http_async_client(),
+        cache=get_llm_cache(),
+        callbacks=[USAGE_CALLBACK],
+        stream_usage=True,
+    )
+
+
+def get_chat_model(model: str = "gpt-4o", temperature: float = 0) -> BaseChatModel:
+    """Returns the shared chat model for (model, temperature), creating it on first use."""
+    key = (model, float(temperature))
+    chat_model = _CHAT_MODELS.get(key)
+    if chat_model is not None:
+        return chat_model
+    built = _build_chat_model(model, temperature)
+    with _LOCK:
+        return _CHAT_MODELS.setdefault(key, built)
+
+
+def get_prompt_template(name: str, template: str) -> ChatPromptTemplate:
+    """Returns the compiled prompt template registered under name."""
+    prompt = _PROMPTS.get(name)
+    if prompt is not None:
+        return prompt
+    built = ChatPromptTemplate.from_template(template)
+    with _LOCK:
+        return _PROMPTS.setdefault(name, built)
+
+
+def set_chat_model_factory(factory: Optional[Callable[[str, float], BaseChatModel]]):
+    """Swaps how chat models are built (e.g. fake models) and drops cached instances."""
+    global _CHAT_MODEL_FACTORY
+    with _LOCK:
+        _CHAT_MODEL_FACTORY = factory
+        _CHAT_MODELS.clear()
+
+
+async def close_llm_registry():
+    global _HTTP_ASYNC_CLIENT
+    with _LOCK:
+        client, _HTTP_ASYNC_CLIENT = _HTTP_ASYNC_CLIENT, None
+        _CHAT_MODELS.clear()
+    if client is not None:
+        await client.aclose()
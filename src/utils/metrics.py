@@ -0,0 +1,181 @@
+"""
+Prometheus metrics for the review service, served at GET /metrics.
+
+Covers per-node latency and errors of the LangGraph workflow, latency of
+every GitHub MCP tool call, LLM token usage and estimated cost per model
+(from the usage data LangChain hands to callbacks), and in-flight reviews.
+"""
+
+import time
+import logging
+import functools
+import threading
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.utils.config_loader import read_base_config
+from src.utils.review_log import get_logger, log_event
+
+METRICS_CONFIG = read_base_config().get("METRICS", {})
+# USD per 1M tokens, {"model": {"prompt": x, "completion": y}}
+MODEL_PRICES: Dict[str, Dict[str, float]] = METRICS_CONFIG.get("model_prices", {})
+
+logger = get_logger("workflow")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+NODE_DURATION = Histogram(
+    "pr_review_node_duration_seconds", "Duration of each workflow node.",
+    ["node"], buckets=LATENCY_BUCKETS,
+)
+NODE_ERRORS = Counter(
+    "pr_review_node_errors_total", "Errors raised or recorded by workflow nodes.",
+    ["node"],
+)
+MCP_CALL_DURATION = Histogram(
+    "pr_review_mcp_call_duration_seconds", "Duration of GitHub MCP tool calls, including rate-limit waits.",
+    ["tool", "outcome"], buckets=LATENCY_BUCKETS,
+)
+LLM_CALLS = Counter(
+    "pr_review_llm_calls_total", "Chat model calls; cached calls are served by the LLM response cache.",
+    ["model", "node", "cached"],
+)
+LLM_TOKENS = Counter(
+    "pr_review_llm_tokens_total", "Tokens sent to and generated by chat models.",
+    ["model", "node", "type"],
+)
+LLM_COST = Counter(
+    "pr_review_llm_cost_usd_total", "Estimated chat model cost from MODEL_PRICES.",
+    ["model", "node"],
+)
+LLM_ERRORS = Counter(
+    "pr_review_llm_errors_total", "Chat model calls that raised.",
+    ["model", "node"],
+)
+DIFF_TOKENS = Counter(
+    "pr_review_diff_tokens_total", "Tokens of file diffs before (raw) and after (prompt) minification and budgeting.",
+    ["stage"],
+)
+REVIEWS_IN_FLIGHT = Gauge(
+    "pr_review_reviews_in_flight", "Reviews in progress: callers waiting on a review and workflow runs executing.",
+    ["kind"],
+)
+REVIEWS = Counter(
+    "pr_review_reviews_total", "Finished review requests.",
+    ["outcome"],
+)
+MODEL_ROUTES = Counter(
+    "pr_review_model_routes_total", "LLM calls by stage and model tier (see MODEL_ROUTING), escalations included.",
+    ["stage", "tier"],
+)
+MODEL_ESCALATIONS = Counter(
+    "pr_review_model_escalations_total", "Calls retried on the next tier because the output could not be used.",
+    ["stage", "from_tier", "to_tier"],
+)
+MODEL_CALL_DURATION = Histogram(
+    "pr_review_model_call_duration_seconds", "Duration of routed LLM calls by stage and model tier.",
+    ["stage", "tier"], buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_EVENTS = Counter(
+    "pr_review_webhook_events_total", "pull_request webhook deliveries by what was done with them.",
+    ["outcome"],
+)
+PUBLISHED_COMMENTS = Counter(
+    "pr_review_published_comments_total", "Review comments considered for publishing, by outcome.",
+    ["outcome"],
+)
+
+
+def instrument_node(name: str, node):
+    """Wraps a workflow node so its duration and raised errors are recorded."""
+    @functools.wraps(node)
+    async def wrapper(state):
+        started = time.perf_counter()
+        try:
+            return await node(state)
+        except Exception as e:
+            NODE_ERRORS.labels(name).inc()
+            log_event(logger, logging.ERROR, "node.failed", stage=name, error=repr(e))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            NODE_DURATION.labels(name).observe(elapsed)
+            log_event(logger, logging.DEBUG, "node.finished", stage=name, seconds=round(elapsed, 4))
+    return wrapper
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # Dated snapshots such as gpt-4o-2024-08-06 are priced like their base model
+        prices = next(
+            (MODEL_PRICES[name] for name in sorted(MODEL_PRICES, key=len, reverse=True) if model.startswith(name)),
+            None
+        )
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices.get("prompt", 0) + completion_tokens * prices.get("completion", 0)) / 1_000_000
+
+
+class UsageMetricsCallback(AsyncCallbackHandler):
+    """
+    Records calls, tokens and cost of every chat model call, labelled with
+    the model and the workflow node the call was made from.
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name") or "unknown"
+        node = (metadata or {}).get("langgraph_node") or "none"
+        with self._lock:
+            self._runs[run_id] = (model, node)
+
+    def _pop(self, run_id: UUID):
+        with self._lock:
+            return self._runs.pop(run_id, ("unknown", "none"))
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        model, node = self._pop(run_id)
+        llm_output = response.llm_output or {}
+        messages = [
+            generation.message
+            for generations in response.generations for generation in generations
+            if getattr(generation, "message", None) is not None
+        ]
+        model = llm_output.get("model_name") or next(
+            (m.response_metadata["model_name"] for m in messages if m.response_metadata.get("model_name")), model
+        )
+        # Responses served by the LLM response cache are tagged and cost nothing
+        if messages and all(m.response_metadata.get("cache_hit") for m in messages):
+            LLM_CALLS.labels(model, node, "true").inc()
+            return
+        LLM_CALLS.labels(model, node, "false").inc()
+
+        prompt_tokens = completion_tokens = 0
+        for message in messages:
+            usage = getattr(message, "usage_metadata", None) or {}
+            prompt_tokens += usage.get("input_tokens", 0)
+            completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens and not completion_tokens:
+            usage = llm_output.get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+
+        LLM_TOKENS.labels(model, node, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(model, node, "completion").inc(completion_tokens)
+        LLM_COST.labels(model, node).inc(estimate_cost(model, prompt_tokens, completion_tokens))
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        model, node = self._pop(run_id)
+        LLM_ERRORS.labels(model, node).inc()
+
+
+USAGE_CALLBACK = UsageMetricsCallback()
@@ -0,0 +1,294 @@
+"""
+Cost- and latency-aware choice of the chat model for every LLM call.
+
+MODEL_ROUTING in src/configs/config.json lists model tiers from cheapest
+(and fastest) to strongest. Each stage picks a tier by rules:
+
+- analyze:  per file; sensitive paths (auth, crypto, migrations, ...) get the
+            stage's default tier, while small diffs, non-source files and PRs
+            triaged "light" get the cheap tier
+- comment:  the cheap tier when every file was analyzed on it, else the default
+- decision: the cheap tier when the rule pre-check rates the PR low risk and
+            no comment is critical or major, else the default
+
+Before analysis, plan_review() estimates the cost and latency of the whole
+review from prompt sizes and the tiers' prices and latency profiles, and if
+the request's budget (set_routing_budget(), defaulting to MODEL_ROUTING.budget)
+is exceeded, moves the least risky files, then the comment and decision
+stages, down to the cheap tier. A call whose output does not parse on its
+tier is retried on the next tier (escalate()).
+
+With routing disabled every call uses its stage's default tier and nothing
+escalates.
+"""
+
+import time
+import logging
+import contextvars
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from langchain_core.language_models import BaseChatModel
+
+from src.utils.config_loader import read_base_config
+from src.utils.diff_minify import SENSITIVE_PATTERN, SOURCE_EXTENSIONS, file_risk
+from src.utils.llm_registry import get_chat_model
+from src.utils.metrics import MODEL_CALL_DURATION, MODEL_ESCALATIONS, MODEL_ROUTES, estimate_cost
+from src.utils.review_log import get_logger, log_event
+
+ROUTING_CONFIG = read_base_config().get("MODEL_ROUTING", {})
+
+ANALYZE = "analyze"
+COMMENT = "comment"
+DECISION = "decision"
+
+DEFAULT_TIERS = [
+    {"name": "small", "model": "gpt-4o-mini"},
+    {"name": "large", "model": "gpt-4o"},
+]
+
+# Triage route of small PRs (see src/orchestrator/triage.py)
+LIGHT_ROUTE = "light"
+
+T = TypeVar("T")
+
+logger = get_logger("routing")
+
+# Per-request budget {"max_cost_usd", "max_latency_s"}; None fields fall back to the config
+_BUDGET: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("routing_budget", default=None)
+
+
+def set_routing_budget(max_cost_usd: Optional[float] = None, max_latency_s: Optional[float] = None):
+    """Sets the review budget for the current request context."""
+    return _BUDGET.set({"max_cost_usd": max_cost_usd, "max_latency_s": max_latency_s})
+
+
+class ModelRouter:
+    def __init__(self, tiers: List[Dict], stages: Dict[str, Dict], budget: Dict, enabled: bool = True,
+                 prompt_overhead_tokens: int = 400, max_concurrency: int = 4):
+        self.tiers = {tier["name"]: tier for tier in tiers}
+        self.order = [tier["name"] for tier in tiers]
+        self.stages = stages
+        self.budget = budget
+        self.enabled = enabled
+        self.prompt_overhead_tokens = prompt_overhead_tokens
+        self.max_concurrency = max_concurrency
+        self.routes: Dict[str, Dict[str, int]] = {}
+        self.escalations: Dict[str, int] = {}
+        self.downgraded = 0
+        self.estimated_cost_usd = 0.0
+        self.estimated_default_cost_usd = 0.0
+
+    # ---------- tiers ----------
+
+    @property
+    def cheapest(self) -> str:
+        return self.order[0]
+
+    def default_tier(self, stage: str) -> str:
+        return self.stages.get(stage, {}).get("default_tier", self.order[-1])
+
+    def cheap_tier(self, stage: str) -> str:
+        return self.stages.get(stage, {}).get("cheap_tier", self.cheapest)
+
+    def model(self, tier: str) -> str:
+        return self.tiers[tier]["model"]
+
+    def chat_model(self, tier: str, temperature: float = 0) -> BaseChatModel:
+        return get_chat_model(self.model(tier), temperature=temperature)
+
+    def next_tier(self, tier: str) -> Optional[str]:
+        index = self.order.index(tier)
+        return self.order[index + 1] if self.enabled and index + 1 < len(self.order) else None
+
+    def _cap(self, tier: str, cap: Optional[str]) -> str:
+        """The cheaper of tier and cap."""
+        if cap is None:
+            return tier
+        return min(tier, cap, key=self.order.index)
+
+    def estimate(self, tier: str, prompt_tokens: int) -> Tuple[float, float]:
+        """(USD, seconds) of one call on tier, from its price and latency profile."""
+        profile = self.tiers[tier]
+        output_tokens = profile.get("expected_output_tokens", 500)
+        prompt_tokens += self.prompt_overhead_tokens
+        seconds = (
+            profile.get("base_latency_ms", 500)
+            + profile.get("ms_per_prompt_token", 0) * prompt_tokens
+            + profile.get("ms_per_output_token", 10) * output_tokens
+        ) / 1000
+        return estimate_cost(profile["model"], prompt_tokens, output_tokens), seconds
+
+    # ---------- rules ----------
+
+    def file_tier(self, change: Dict, triage_route: Optional[str]) -> str:
+        default = self.default_tier(ANALYZE)
+        if not self.enabled:
+            return default
+        rules = self.stages.get(ANALYZE, {})
+        filename = change.get("filename", "")
+        if SENSITIVE_PATTERN.search(filename):
+            return default
+        changed = change.get("additions", 0) + change.get("deletions", 0)
+        if (
+            triage_route == LIGHT_ROUTE
+            or not filename.endswith(SOURCE_EXTENSIONS)
+            or changed <= rules.get("cheap_max_changed_lines", 40)
+        ):
+            return self.cheap_tier(ANALYZE)
+        return default
+
+    def comment_tier(self, plan: Optional[Dict]) -> str:
+        default = self.default_tier(COMMENT)
+        if not self.enabled or not plan:
+            return default
+        files = plan.get("files") or {}
+        cheap = self.cheap_tier(COMMENT)
+        tier = cheap if files and all(t == self.cheap_tier(ANALYZE) for t in files.values()) else default
+        return self._cap(tier, plan.get("caps", {}).get(COMMENT))
+
+    def decision_tier(self, rules_risk: str, comments: List[Dict], plan: Optional[Dict]) -> str:
+        default = self.default_tier(DECISION)
+        if not self.enabled:
+            return default
+        severe = any(c.get("severity") in ("critical", "major") for c in comments)
+        cheap_risks = self.stages.get(DECISION, {}).get("cheap_risks", ["low"])
+        tier = self.cheap_tier(DECISION) if rules_risk in cheap_risks and not severe else default
+        return self._cap(tier, (plan or {}).get("caps", {}).get(DECISION))
+
+    # ---------- budget ----------
+
+    def current_budget(self) -> Dict:
+        override = _BUDGET.get() or {}
+        return {
+            key: override.get(key) if override.get(key) is not None else self.budget.get(key)
+            for key in ("max_cost_usd", "max_latency_s")
+        }
+
+    def _estimate_plan(self, files: Dict[str, str], prompt_tokens: Dict[str, int], caps: Dict[str, str]) -> Tuple[float, float]:
+        cost, latencies = 0.0, []
+        for name, tier in files.items():
+            file_cost, seconds = self.estimate(tier, prompt_tokens.get(name, 0))
+            cost += file_cost
+            latencies.append(seconds)
+        # Files run max_concurrency at a time; comment and decision follow one after the other
+        latency = max(max(latencies, default=0), sum(latencies) / self.max_concurrency)
+        analysis_output = sum(self.tiers[t].get("expected_output_tokens", 500) for t in files.values())
+        for stage in (COMMENT, DECISION):
+            stage_cost, seconds = self.estimate(caps.get(stage) or self.default_tier(stage), analysis_output)
+            cost += stage_cost
+            latency += seconds
+        return cost, latency
+
+    def plan_review(self, file_changes: Dict[str, Dict], prompt_tokens: Dict[str, int],
+                    triage_route: Optional[str] = None) -> Dict:
+        """
+        Tier of every file to analyze plus caps for the later stages, fitted to
+        the request's budget. Stored in the workflow state as model_plan.
+        """
+        budget = self.current_budget()
+        files = {name: self.file_tier(change, triage_route) for name, change in file_changes.items()}
+        caps: Dict[str, str] = {}
+        default_cost, _ = self._estimate_plan(
+            {name: self.default_tier(ANALYZE) for name in files}, prompt_tokens, caps
+        )
+        cost, latency = self._estimate_plan(files, prompt_tokens, caps)
+
+        def over_budget() -> bool:
+            return (
+                (budget["max_cost_usd"] is not None and cost > budget["max_cost_usd"])
+                or (budget["max_latency_s"] is not None and latency > budget["max_latency_s"])
+            )
+
+        downgraded = 0
+        if self.enabled and over_budget():
+            cheap = self.cheap_tier(ANALYZE)
+            # Least risky files give up the stronger tier first
+            for name in sorted(files, key=lambda n: file_risk(file_changes[n])):
+                if files[name] == cheap:
+                    continue
+                files[name] = cheap
+                downgraded += 1
+                cost, latency = self._estimate_plan(files, prompt_tokens, caps)
+                if not over_budget():
+                    break
+            for stage in (COMMENT, DECISION):
+                if over_budget():
+                    caps[stage] = self.cheap_tier(stage)
+                    cost, latency = self._estimate_plan(files, prompt_tokens, caps)
+        self.downgraded += downgraded
+        self.estimated_cost_usd += cost
+        self.estimated_default_cost_usd += default_cost
+        return {
+            "files": files,
+            "caps": caps,
+            "budget": budget,
+            "estimated_cost_usd": round(cost, 6),
+            "estimated_latency_s": round(latency, 2),
+            "default_cost_usd": round(default_cost, 6),
+            "downgraded": downgraded,
+            "over_budget": over_budget(),
+        }
+
+    # ---------- calls ----------
+
+    def record_call(self, stage: str, tier: str, seconds: float):
+        MODEL_ROUTES.labels(stage, tier).inc()
+        MODEL_CALL_DURATION.labels(stage, tier).observe(seconds)
+        stage_routes = self.routes.setdefault(stage, {})
+        stage_routes[tier] = stage_routes.get(tier, 0) + 1
+
+    def escalate(self, stage: str, tier: str, reason: str) -> Optional[str]:
+        """The tier to retry on after tier's output could not be used, or None."""
+        next_tier = self.next_tier(tier)
+        if next_tier is None:
+            return None
+        MODEL_ESCALATIONS.labels(stage, tier, next_tier).inc()
+        self.escalations[stage] = self.escalations.get(stage, 0) + 1
+        log_event(logger, logging.INFO, "model.escalated", stage=stage, tier=tier, to=next_tier, reason=reason)
+        return next_tier
+
+    async def invoke(self, stage: str, tier: str, call: Callable[[str], Awaitable[T]],
+                     valid: Callable[[T], bool]) -> Tuple[T, str]:
+        """
+        Runs call(tier) and escalates while the result is not valid (or the
+        call raised). Returns the last result and the tier that produced it;
+        the last tier's exception is re-raised.
+        """
+        while True:
+            started = time.perf_counter()
+            error = None
+            try:
+                result = await call(tier)
+                reason = None if valid(result) else "unparseable output"
+            except Exception as e:
+                result, error, reason = None, e, repr(e)
+            self.record_call(stage, tier, time.perf_counter() - started)
+            if reason is None:
+                return result, tier
+            next_tier = self.escalate(stage, tier, reason)
+            if next_tier is None:
+                if error is not None:
+                    raise error
+                return result, tier
+            tier = next_tier
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "tiers": {name: tier["model"] for name, tier in self.tiers.items()},
+            "routes": self.routes,
+            "escalations": self.escalations,
+            "downgraded_for_budget": self.downgraded,
+            "estimated_cost_usd": round(self.estimated_cost_usd, 4),
+            "estimated_default_cost_usd": round(self.estimated_default_cost_usd, 4),
+        }
+
+
+ROUTER = ModelRouter(
+    tiers=ROUTING_CONFIG.get("tiers") or DEFAULT_TIERS,
+    stages={stage: ROUTING_CONFIG.get(stage, {}) for stage in (ANALYZE, COMMENT, DECISION)},
+    budget=ROUTING_CONFIG.get("budget", {}),
+    enabled=ROUTING_CONFIG.get("enabled", False),
+    prompt_overhead_tokens=ROUTING_CONFIG.get("prompt_overhead_tokens", 400),
+    max_concurrency=read_base_config().get("ANALYZER", {}).get("max_concurrency", 4),
+)
@@ -0,0 +1,648 @@
+"""
+Per-repository index of code outside the diff, used to enrich analyzer prompts.
+
+The analyzer only sees changed hunks, so helpers defined elsewhere look
+undefined to it. For repositories with a local git checkout (configured
+under REPO_INDEX.checkouts), this module keeps:
+
+- the function, class, method and module-constant definitions of every
+  Python file, extracted with `ast`
+- a BM25 index over fixed-size line chunks of every source file
+
+A base index is built once per repository at the checkout's ref, persisted
+per commit SHA, and updated incrementally by comparing blob SHAs, so only
+files that changed are re-read. A PR head is served as a view: the base
+index with the files that differ at the head swapped in.
+
+related_context() picks the few definitions matching identifiers used in a
+file's hunks, then fills any remaining room with the best BM25 chunks.
+
+Usage:
+    python -m src.utils.repo_index build owner/repo
+    python -m src.utils.repo_index query owner/repo load_config retry_policy
+"""
+
+import os
+import re
+import ast
+import gzip
+import json
+import math
+import time
+import asyncio
+import logging
+import keyword
+import functools
+import argparse
+import builtins
+import threading
+import subprocess
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.config_loader import read_base_config
+from src.utils.diff_minify import SOURCE_EXTENSIONS
+from src.utils.review_log import get_logger, log_event
+from src.utils.tokens import count_tokens
+
+REPO_INDEX_CONFIG = read_base_config().get("REPO_INDEX", {})
+
+logger = get_logger("repo_index")
+
+INDEXED_EXTENSIONS = SOURCE_EXTENSIONS + (".pyi",)
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SUBWORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+DEFINED_IN_DIFF = re.compile(r"^\+\s*(?:async\s+)?(?:def|class)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
+IMPORT_LINE = re.compile(r"^\s*(?:import|from)\s")
+
+# Names too common to say anything about where code lives
+STOPWORDS = {name.lower() for name in keyword.kwlist + dir(builtins)} | {
+    "self", "cls", "args", "kwargs", "const", "let", "var", "function", "func", "public", "private",
+    "protected", "static", "void", "int", "str", "string", "bool", "float", "new", "this", "null",
+    "nil", "err", "error", "return", "value", "data", "result", "name", "type", "get", "set",
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@functools.lru_cache(maxsize=65536)
+def _identifier_terms(identifier: str) -> Tuple[str, ...]:
+    lower = identifier.lower()
+    terms = [lower] if len(lower) > 1 and lower not in STOPWORDS else []
+    parts = [p.lower() for p in SUBWORD.findall(identifier)]
+    if len(parts) > 1:
+        terms.extend(p for p in parts if len(p) > 2 and p not in STOPWORDS)
+    return tuple(terms)
+
+
+def split_terms(text: str) -> List[str]:
+    """Lowercased identifiers plus their snake/camel-case parts, without stopwords."""
+    terms = []
+    for identifier in IDENTIFIER.findall(text):
+        terms.extend(_identifier_terms(identifier))
+    return terms
+
+
+def _snippet(lines: List[str], start: int, end: int, max_lines: int) -> str:
+    body = lines[start - 1:end]
+    if len(body) > max_lines:
+        body = body[:max_lines] + ["    ..."]
+    return "\n".join(body)
+
+
+def extract_python_symbols(path: str, source: str, max_lines: int = 12) -> List[Dict]:
+    """Module-level and class-level definitions of a Python file; [] if it does not parse."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    lines = source.split("\n")
+    symbols = []
+
+    def visit(node, prefix: str):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([d.lineno for d in child.decorator_list] + [child.lineno])
+                is_class = isinstance(child, ast.ClassDef)
+                if is_class:
+                    # Header, docstring and method signatures say more than the first lines
+                    head_end = child.body[0].lineno - 1 if child.body else child.lineno
+                    parts = [_snippet(lines, start, max(head_end, child.lineno), max_lines)]
+                    doc = ast.get_docstring(child)
+                    if doc:
+                        parts.append(f'    """{doc.splitlines()[0]}"""')
+                    parts.extend(
+                        lines[m.lineno - 1].rstrip() + " ..."
+                        for m in child.body if isinstance(m, (ast.FunctionDef, ast.AsyncFunctionDef))
+                    )
+                    snippet = "\n".join(parts[:max_lines + 1])
+                else:
+                    snippet = _snippet(lines, start, child.end_lineno, max_lines)
+                symbols.append({
+                    "name": child.name, "qualname": f"{prefix}{child.name}",
+                    "kind": "class" if is_class else "function",
+                    "path": path, "start": start, "end": child.end_lineno, "snippet": snippet,
+                })
+                if is_class:
+                    visit(child, f"{prefix}{child.name}.")
+            elif not prefix and isinstance(child, (ast.Assign, ast.AnnAssign)):
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for target in targets:
+                    # Constants and aliases; lowercase module globals mostly collide with locals elsewhere
+                    if isinstance(target, ast.Name) and target.id.lstrip("_")[:1].isupper():
+                        symbols.append({
+                            "name": target.id, "qualname": target.id, "kind": "variable",
+                            "path": path, "start": child.lineno, "end": child.end_lineno,
+                            "snippet": _snippet(lines, child.lineno, child.end_lineno, 4),
+                        })
+
+    visit(tree, "")
+    return symbols
+
+
+def chunk_terms(text: str, chunk_lines: int) -> List[Tuple[int, int, Dict[str, int]]]:
+    """(start, end, term counts) per chunk of chunk_lines lines."""
+    lines = text.split("\n")
+    chunks = []
+    for start in range(0, len(lines), chunk_lines):
+        terms = Counter(split_terms("\n".join(lines[start:start + chunk_lines])))
+        if terms:
+            chunks.append((start + 1, min(start + chunk_lines, len(lines)), dict(terms)))
+    return chunks
+
+
+class GitCheckout:
+    """Reads trees and blobs of a local clone with plain git commands."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _git(self, *args: str, stdin: Optional[bytes] = None) -> bytes:
+        return subprocess.run(
+            ["git", "-C", self.path, *args], input=stdin, capture_output=True, check=True
+        ).stdout
+
+    def resolve(self, rev: str) -> Optional[str]:
+        try:
+            return self._git("rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}").decode().strip() or None
+        except subprocess.CalledProcessError:
+            return None
+
+    def fetch(self, refspec: str) -> bool:
+        try:
+            self._git("fetch", "--quiet", "--no-tags", "origin", refspec)
+            return True
+        except subprocess.CalledProcessError as e:
+            log_event(logger, logging.WARNING, "git.fetch_failed", refspec=refspec, path=self.path, error=e.stderr.decode(errors="replace").strip())
+            return False
+
+    def tree(self, sha: str, max_bytes: int) -> Dict[str, str]:
+        """path -> blob SHA of the indexed files at sha."""
+        files = {}
+        for entry in self._git("ls-tree", "-r", "-z", "--long", sha).split(b"\0"):
+            if not entry:
+                continue
+            meta, path = entry.split(b"\t", 1)
+            mode, kind, blob, size = meta.split()
+            path = path.decode("utf-8", errors="replace")
+            if kind == b"blob" and size != b"-" and int(size) <= max_bytes and path.endswith(INDEXED_EXTENSIONS):
+                files[path] = blob.decode()
+        return files
+
+    def read_blobs(self, blobs: Iterable[str]) -> Dict[str, str]:
+        """Contents of many blobs through one git cat-file process."""
+        blobs = list(dict.fromkeys(blobs))
+        if not blobs:
+            return {}
+        out = self._git("cat-file", "--batch", stdin="\n".join(blobs).encode() + b"\n")
+        texts, offset = {}, 0
+        for _ in blobs:
+            header_end = out.index(b"\n", offset)
+            blob, kind, *rest = out[offset:header_end].split()
+            if kind == b"missing":
+                offset = header_end + 1
+                continue
+            size = int(rest[0])
+            texts[blob.decode()] = out[header_end + 1:header_end + 1 + size].decode("utf-8", errors="replace")
+            offset = header_end + 1 + size + 1
+        return texts
+
+
+class RepoIndex:
+    """Definitions and BM25 chunk postings of one repository at one commit."""
+
+    def __init__(self, sha: str = "", chunk_lines: int = 40):
+        self.sha = sha
+        self.chunk_lines = chunk_lines
+        # path -> {"blob", "symbols", "chunks": [(start, end, terms)]}
+        self.files: Dict[str, Dict] = {}
+        self.symbols: Dict[str, List[Dict]] = {}
+        # term -> {(path, chunk number): count}
+        self.postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self.doc_lengths: Dict[Tuple[str, int], int] = {}
+        self.total_length = 0
+        self.lock = threading.RLock()
+
+    def _add(self, path: str, record: Dict):
+        self.files[path] = record
+        for symbol in record["symbols"]:
+            self.symbols.setdefault(symbol["name"], []).append(symbol)
+        for i, (_, _, terms) in enumerate(record["chunks"]):
+            doc = (path, i)
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[doc] = count
+            length = sum(terms.values())
+            self.doc_lengths[doc] = length
+            self.total_length += length
+
+    def remove_file(self, path: str):
+        record = self.files.pop(path, None)
+        if record is None:
+            return
+        for symbol in record["symbols"]:
+            entries = [s for s in self.symbols.get(symbol["name"], []) if s["path"] != path]
+            if entries:
+                self.symbols[symbol["name"]] = entries
+            else:
+                self.symbols.pop(symbol["name"], None)
+        for i, (_, _, terms) in enumerate(record["chunks"]):
+            doc = (path, i)
+            for term in terms:
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc, None)
+                    if not docs:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(doc, 0)
+
+    def add_file(self, path: str, blob: str, text: str):
+        self.remove_file(path)
+        symbols = extract_python_symbols(path, text) if path.endswith((".py", ".pyi")) else []
+        self._add(path, {"blob": blob, "symbols": symbols, "chunks": chunk_terms(text, self.chunk_lines)})
+
+    def update(self, sha: str, tree: Dict[str, str], checkout: GitCheckout) -> int:
+        """Brings the index to tree (path -> blob); returns the number of files re-read."""
+        with self.lock:
+            for path in [p for p in self.files if p not in tree]:
+                self.remove_file(path)
+            changed = {path: blob for path, blob in tree.items() if self.files.get(path, {}).get("blob") != blob}
+            texts = checkout.read_blobs(changed.values())
+            for path, blob in changed.items():
+                if blob in texts:
+                    self.add_file(path, blob, texts[blob])
+            self.sha = sha
+            return len(changed)
+
+    def definitions(self, name: str, hidden: Iterable[str] = ()) -> List[Dict]:
+        return [s for s in self.symbols.get(name, []) if s["path"] not in hidden]
+
+    def chunk_bounds(self, path: str, number: int) -> Tuple[int, int]:
+        start, end, _ = self.files[path]["chunks"][number]
+        return start, end
+
+    def scores(self, terms: List[str], idf: Dict[str, float], avg_length: float,
+               hidden: Iterable[str] = ()) -> Dict[Tuple[str, int], float]:
+        hidden = set(hidden)
+        scores: Dict[Tuple[str, int], float] = {}
+        for term in set(terms):
+            for doc, count in self.postings.get(term, {}).items():
+                if doc[0] in hidden:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf[term] * count * (BM25_K1 + 1) / (count + norm)
+        return scores
+
+    def to_dict(self) -> Dict:
+        return {"sha": self.sha, "chunk_lines": self.chunk_lines, "files": self.files}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RepoIndex":
+        index = cls(data["sha"], data.get("chunk_lines", 40))
+        for path, record in data["files"].items():
+            record["chunks"] = [tuple(chunk) for chunk in record["chunks"]]
+            index._add(path, record)
+        return index
+
+
+class IndexView:
+    """A base index with the files that differ at another commit swapped in."""
+
+    def __init__(self, sha: str, base: RepoIndex, checkout: GitCheckout,
+                 overlay: Optional[RepoIndex] = None, deleted: Iterable[str] = ()):
+        self.sha = sha
+        self.base = base
+        # The base is updated in place when its ref moves; views of an older base are rebuilt
+        self.base_sha = base.sha
+        self.overlay = overlay or RepoIndex(sha, base.chunk_lines)
+        self.checkout = checkout
+        # Files changed or deleted at sha hide their base version
+        self.hidden = set(self.overlay.files) | set(deleted)
+
+    def definitions(self, name: str) -> List[Dict]:
+        with self.base.lock:
+            return self.overlay.definitions(name) + self.base.definitions(name, self.hidden)
+
+    def search(self, terms: List[str], k: int, exclude_path: str = "") -> List[Tuple[float, str, int, int]]:
+        """Top-k chunks as (score, path, start line, end line)."""
+        with self.base.lock:
+            docs = len(self.base.doc_lengths) + len(self.overlay.doc_lengths)
+            if not docs or not terms:
+                return []
+            avg_length = (self.base.total_length + self.overlay.total_length) / docs or 1.0
+            idf = {}
+            for term in set(terms):
+                df = len(self.base.postings.get(term, ())) + len(self.overlay.postings.get(term, ()))
+                idf[term] = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+            hidden = self.hidden | {exclude_path}
+            scores = self.base.scores(terms, idf, avg_length, hidden)
+            overlay_scores = self.overlay.scores(terms, idf, avg_length, {exclude_path})
+            ranked = sorted(
+                [(score, doc, self.base) for doc, score in scores.items()]
+                + [(score, doc, self.overlay) for doc, score in overlay_scores.items()],
+                key=lambda item: -item[0],
+            )[:k]
+            return [(score, path, *index.chunk_bounds(path, number)) for score, (path, number), index in ranked]
+
+    def read_lines(self, path: str, start: int, end: int) -> str:
+        sha = self.sha if path in self.overlay.files else self.base.sha
+        text = self.checkout._git("show", f"{sha}:{path}").decode("utf-8", errors="replace")
+        return "\n".join(text.split("\n")[start - 1:end])
+
+
+def _hunk_ranges(change: Dict) -> List[Tuple[int, int]]:
+    return [(h["new_start"], h["new_start"] + h["new_count"]) for h in change.get("hunks", [])]
+
+
+def related_context(view: Optional[IndexView], change: Dict, max_definitions: int = 5,
+                    max_tokens: int = 1500, max_ambiguity: int = 3) -> str:
+    """
+    Definitions from elsewhere in the repository for identifiers used in the
+    file's hunks, topped up with BM25 chunks; "" if nothing relevant is found.
+    """
+    if view is None:
+        return ""
+    path = change.get("filename", "")
+    diff = change.get("diff", "")
+    used = Counter()
+    for line in diff.split("\n"):
+        # Imported names are resolved by the import itself
+        if line[:1] in ("+", " ") and not line.startswith("+++") and not IMPORT_LINE.match(line[1:]):
+            for identifier in IDENTIFIER.findall(line):
+                # Lines the change adds say more about what it depends on
+                used[identifier] += 2 if line[:1] == "+" else 1
+    defined_here = set(DEFINED_IN_DIFF.findall(diff))
+    ranges = _hunk_ranges(change)
+
+    picked: List[Tuple[str, str]] = []
+    seen = set()
+    tokens = 0
+    candidates = [
+        (name, view.definitions(name)) for name in used
+        if name not in defined_here and name.lower() not in STOPWORDS and len(name) > 2
+    ]
+    candidates = [(name, defs) for name, defs in candidates if 0 < len(defs) <= max_ambiguity]
+    candidates.sort(key=lambda item: (-used[item[0]], len(item[1])))
+    directory = os.path.dirname(path)
+    for name, defs in candidates:
+        # Prefer definitions close to the changed file
+        defs = sorted(defs, key=lambda s: -len(os.path.commonprefix([os.path.dirname(s["path"]), directory])))
+        for symbol in defs[:1]:
+            location = (symbol["path"], symbol["start"])
+            overlaps = symbol["path"] == path and any(
+                symbol["start"] < end and start <= symbol["end"] for start, end in ranges
+            )
+            if location in seen or overlaps:
+                continue
+            text = f"# {symbol['path']}:{symbol['start']} ({symbol['kind']} {symbol['qualname']})\n{symbol['snippet']}"
+            cost = count_tokens(text)
+            if tokens + cost > max_tokens:
+                continue
+            seen.add(location)
+            picked.append((location, text))
+            tokens += cost
+        if len(picked) >= max_definitions:
+            break
+
+    remaining = max_definitions - len(picked)
+    if remaining > 0:
+        added = "\n".join(line[1:] for line in diff.split("\n") if line.startswith("+") and not line.startswith("+++"))
+        terms = [term for term, _ in Counter(split_terms(added)).most_common(30)]
+        for _, chunk_path, start, end in view.search(terms, remaining, exclude_path=path):
+            if any(p == chunk_path and start <= line <= end for (p, line), _ in picked):
+                continue
+            try:
+                text = f"# {chunk_path}:{start}-{end}\n{view.read_lines(chunk_path, start, end)}"
+            except subprocess.CalledProcessError:
+                continue
+            cost = count_tokens(text)
+            if tokens + cost > max_tokens:
+                break
+            picked.append(((chunk_path, start), text))
+            tokens += cost
+
+    if not picked:
+        return ""
+    body = "\n\n".join(text for _, text in picked)
+    return (
+        "Related code from elsewhere in the repository (context only, not part of this change; "
+        f"names defined here exist and are not undefined):\n```\n{body}\n```"
+    )
+
+
+class RepoIndexStore:
+    """Base indexes per repository plus a bounded LRU of per-commit views."""
+
+    def __init__(
+        self,
+        checkouts: Dict[str, str],
+        cache_dir: str = ".cache/repo_index",
+        ref: str = "HEAD",
+        fetch: bool = False,
+        max_file_bytes: int = 200000,
+        chunk_lines: int = 40,
+        max_views: int = 16,
+        max_snapshots: int = 3,
+    ):
+        self.checkouts = {name.lower(): path for name, path in checkouts.items()}
+        self.cache_dir = cache_dir
+        self.ref = ref
+        self.fetch = fetch
+        self.max_file_bytes = max_file_bytes
+        self.chunk_lines = chunk_lines
+        self.max_views = max_views
+        self.max_snapshots = max_snapshots
+        self._bases: Dict[str, RepoIndex] = {}
+        self._views: "OrderedDict[Tuple[str, str], IndexView]" = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.incremental_updates = 0
+        self.files_indexed = 0
+        self.view_hits = 0
+        self.last_build_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.checkouts)
+
+    def _snapshot_path(self, repo: str, sha: str) -> str:
+        return os.path.join(self.cache_dir, repo.replace("/", "__"), f"{sha}.json.gz")
+
+    def _load_snapshot(self, repo: str, checkout: GitCheckout) -> Optional[RepoIndex]:
+        directory = os.path.dirname(self._snapshot_path(repo, "x"))
+        if not os.path.isdir(directory):
+            return None
+        paths = sorted((os.path.join(directory, f) for f in os.listdir(directory)), key=os.path.getmtime, reverse=True)
+        for path in paths:
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    index = RepoIndex.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                log_event(logger, logging.WARNING, "repo_index.snapshot_unreadable", path=path, error=repr(e))
+                continue
+            if index.chunk_lines == self.chunk_lines and checkout.resolve(index.sha):
+                return index
+        return None
+
+    def _save_snapshot(self, repo: str, index: RepoIndex):
+        path = self._snapshot_path(repo, index.sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with index.lock:
+            data = json.dumps(index.to_dict())
+        tmp = f"{path}.tmp"
+        # Snapshots are rewritten on every update; fast compression beats small files
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+            f.write(data)
+        os.replace(tmp, path)
+        directory = os.path.dirname(path)
+        snapshots = sorted((os.path.join(directory, f) for f in os.listdir(directory)), key=os.path.getmtime, reverse=True)
+        for old in snapshots[self.max_snapshots:]:
+            os.remove(old)
+
+    def base_index(self, repo: str) -> Optional[RepoIndex]:
+        """The repository's base index at the checkout's ref, updated incrementally."""
+        path = self.checkouts.get(repo)
+        if path is None:
+            return None
+        checkout = GitCheckout(path)
+        with self._lock:
+            lock = self._locks.setdefault(repo, threading.Lock())
+        with lock:
+            sha = checkout.resolve(self.ref)
+            if sha is None:
+                log_event(logger, logging.WARNING, "repo_index.unresolved_ref", repo=repo, ref=self.ref, path=path)
+                return None
+            index = self._bases.get(repo)
+            if index is not None and index.sha == sha:
+                return index
+            started = time.perf_counter()
+            if index is None:
+                index = self._load_snapshot(repo, checkout) or RepoIndex(chunk_lines=self.chunk_lines)
+            if index.sha == sha:
+                self._bases[repo] = index
+                return index
+            incremental = bool(index.files)
+            changed = index.update(sha, checkout.tree(sha, self.max_file_bytes), checkout)
+            self.files_indexed += changed
+            if incremental:
+                self.incremental_updates += 1
+            else:
+                self.builds += 1
+            self.last_build_seconds = time.perf_counter() - started
+            self._bases[repo] = index
+            self._save_snapshot(repo, index)
+            log_event(
+                logger, logging.INFO, "repo_index.updated" if incremental else "repo_index.built",
+                repo=repo, sha=sha[:12], files=changed, seconds=round(self.last_build_seconds, 3),
+            )
+            return index
+
+    def view(self, repo_owner: str, repo_name: str, head_sha: str = "", pr_number: Optional[int] = None) -> Optional[IndexView]:
+        repo = f"{repo_owner}/{repo_name}".lower()
+        base = self.base_index(repo)
+        if base is None:
+            return None
+        checkout = GitCheckout(self.checkouts[repo])
+        sha = checkout.resolve(head_sha) if head_sha else None
+        if sha is None and head_sha and self.fetch and pr_number is not None:
+            if checkout.fetch(f"pull/{pr_number}/head"):
+                sha = checkout.resolve(head_sha)
+        sha = sha or base.sha
+
+        key = (repo, sha)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None and view.base_sha == base.sha:
+                self._views.move_to_end(key)
+                self.view_hits += 1
+                return view
+
+        overlay, deleted = None, set()
+        if sha != base.sha:
+            tree = checkout.tree(sha, self.max_file_bytes)
+            overlay = RepoIndex(sha, self.chunk_lines)
+            with base.lock:
+                changed = {p: b for p, b in tree.items() if base.files.get(p, {}).get("blob") != b}
+                deleted = {p for p in base.files if p not in tree}
+            texts = checkout.read_blobs(changed.values())
+            for path, blob in changed.items():
+                if blob in texts:
+                    overlay.add_file(path, blob, texts[blob])
+        view = IndexView(sha, base, checkout, overlay, deleted)
+        with self._lock:
+            self._views[key] = view
+            self._views.move_to_end(key)
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view
+
+    async def get(self, repo_owner: str, repo_name: str, head_sha: str = "", pr_number: Optional[int] = None) -> Optional[IndexView]:
+        """The index view at the PR head (or the base ref), or None for repositories without a checkout."""
+        if f"{repo_owner}/{repo_name}".lower() not in self.checkouts:
+            return None
+        return await asyncio.to_thread(self.view, repo_owner, repo_name, head_sha, pr_number)
+
+    async def warm(self):
+        """Builds or updates the base index of every configured repository."""
+        for repo in self.checkouts:
+            try:
+                await asyncio.to_thread(self.base_index, repo)
+            except Exception as e:
+                log_event(logger, logging.WARNING, "repo_index.build_failed", repo=repo, error=repr(e))
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "repositories": sorted(self.checkouts),
+            "indexed": {repo: {"sha": index.sha, "files": len(index.files)} for repo, index in self._bases.items()},
+            "views": len(self._views),
+            "view_hits": self.view_hits,
+            "builds": self.builds,
+            "incremental_updates": self.incremental_updates,
+            "files_indexed": self.files_indexed,
+            "last_build_seconds": round(self.last_build_seconds, 3),
+        }
+
+
+REPO_INDEX = RepoIndexStore(
+    checkouts=REPO_INDEX_CONFIG.get("checkouts", {}),
+    cache_dir=REPO_INDEX_CONFIG.get("cache_dir", ".cache/repo_index"),
+    ref=REPO_INDEX_CONFIG.get("ref", "HEAD"),
+    fetch=REPO_INDEX_CONFIG.get("fetch", False),
+    max_file_bytes=REPO_INDEX_CONFIG.get("max_file_bytes", 200000),
+    chunk_lines=REPO_INDEX_CONFIG.get("chunk_lines", 40),
+    max_views=REPO_INDEX_CONFIG.get("max_views", 16),
+)
+MAX_DEFINITIONS = REPO_INDEX_CONFIG.get("max_definitions", 5)
+MAX_CONTEXT_TOKENS = REPO_INDEX_CONFIG.get("max_context_tokens", 1500)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build or update the base index of a configured repository")
+    build.add_argument("repo", help="owner/repo as configured in REPO_INDEX.checkouts")
+    query = sub.add_parser("query", help="show the definitions and chunks matching some identifiers")
+    query.add_argument("repo")
+    query.add_argument("identifiers", nargs="+")
+    query.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    owner, name = args.repo.split("/", 1)
+    view = REPO_INDEX.view(owner, name)
+    if view is None:
+        raise SystemExit(f"No checkout configured for {args.repo} under REPO_INDEX.checkouts")
+    if args.command == "build":
+        print(json.dumps(REPO_INDEX.stats(), indent=2))
+        return
+    for identifier in args.identifiers:
+        for symbol in view.definitions(identifier):
+            print(f"# {symbol['path']}:{symbol['start']} ({symbol['kind']} {symbol['qualname']})\n{symbol['snippet']}\n")
+    for score, path, start, end in view.search(split_terms(" ".join(args.identifiers)), args.k):
+        print(f"# {path}:{start}-{end}  bm25={score:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Structured, non-blocking logging for the review service.
+
+Records go through a QueueHandler to a QueueListener thread that formats
+and writes them, so workflow nodes never block the event loop on stdout.
+Each record is one JSON line with the level, logger, event name, the
+fields passed to log_event() and the correlation context bound with
+bind_review() (review_id, pr), which follows the review into every task
+it spawns.
+
+Configured by the LOGGING section of src/configs/config.json, overridable
+with the LOG_LEVEL and LOG_FORMAT environment variables. "console" prints
+short colored lines for local runs; the full colored review is rendered
+only on request (see src/utils/review_render.py).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, Optional, TextIO
+from uuid import uuid4
+
+from src.utils.config_loader import read_base_config
+
+LOG_CONFIG = read_base_config().get("LOGGING", {})
+COLORS = read_base_config().get("COLORS", {})
+
+ROOT_LOGGER = "pr_review"
+
+# Correlation fields of the review the current task works on
+REVIEW_CONTEXT: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("review_context", default={})
+
+LEVEL_COLORS = {"WARNING": "error", "ERROR": "error", "CRITICAL": "error"}
+
+
+class _ContextFilter(logging.Filter):
+    """Stamps records with the bound review context while still on the caller's task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = REVIEW_CONTEXT.get()
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueues records without formatting them; the listener thread does that."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks hold frames; render them before the record leaves this thread
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "context", {}),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """One colored line per record: time, level, event, then key=value fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = getattr(record, "context", {})
+        fields = getattr(record, "fields", {})
+        color = COLORS.get(LEVEL_COLORS.get(record.levelname) or fields.get("stage", ""), "")
+        prefix = f"[{context['review_id']}] " if context.get("review_id") else ""
+        details = " ".join(f"{key}={value}" for key, value in fields.items() if key != "stage" and value is not None)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {prefix}{record.getMessage()}"
+        if details:
+            line = f"{line} {details}"
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return f"{color}{line}\033[0m" if color else line
+
+
+FORMATTERS = {"json": JsonFormatter, "console": ConsoleFormatter}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+    path: Optional[str] = None,
+    use_queue: bool = True,
+):
+    """
+    (Re)configures the pr_review loggers. With use_queue=False records are
+    written synchronously by the calling thread (used by benchmarks).
+    """
+    global _listener
+    level = (level or os.getenv("LOG_LEVEL") or LOG_CONFIG.get("level", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT") or LOG_CONFIG.get("format", "json")
+    path = path or LOG_CONFIG.get("path")
+    if stream is None and path:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        target: logging.Handler = logging.FileHandler(path, encoding="utf-8")
+    else:
+        target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(FORMATTERS.get(fmt, JsonFormatter)())
+
+    with _lock:
+        shutdown_logging()
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(level)
+        logger.propagate = False
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        if use_queue:
+            records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            handler: logging.Handler = _DeferredQueueHandler(records)
+            _listener = QueueListener(records, target)
+            _listener.start()
+        else:
+            handler = target
+        handler.addFilter(_ContextFilter())
+        logger.addHandler(handler)
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """Logs event with structured fields; nothing is built when the level is filtered out."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+def new_review_id() -> str:
+    return uuid4().hex[:12]
+
+
+@contextmanager
+def bind_review(review_id: Optional[str] = None, **context: str) -> Iterator[str]:
+    """Tags every record logged inside the block (and tasks it starts) with the review's IDs."""
+    review_id = review_id or new_review_id()
+    token = REVIEW_CONTEXT.set({**REVIEW_CONTEXT.get(), "review_id": review_id, **context})
+    try:
+        yield review_id
+    finally:
+        REVIEW_CONTEXT.reset(token)
+
+
+configure_logging()
+atexit.register(shutdown_logging)
@@ -0,0 +1,78 @@
+"""
+Human-readable review summaries, built only when a caller asks for one.
+
+The workflow itself only logs structured events (src/utils/review_log.py);
+the API, jobs and batch reviews render the plain summary from the final
+state when they return it, and the CLI renders the colored version.
+"""
+
+from typing import Dict
+
+from src.utils.config_loader import read_base_config
+
+COLORS = read_base_config()["COLORS"]
+
+NON_CODE_MERGE_MESSAGE = (
+    "After reviewing your pull request, I am happy to inform you that the changes "
+    "have been successfully reviewed and are ready to be merged."
+)
+
+
+def color_block(text, color_code):
+    return f"{color_code}{text}\033[0m"
+
+
+def render_pr_details(pr: Dict) -> str:
+    lines = []
+    lines.append("======== PR DETAILS ========")
+    lines.append(f"PR #{pr.get('pr_number')}: {pr.get('pr_title', 'Unknown')}")
+    lines.append(f"Author: {pr.get('pr_author', 'Unknown')}")
+    lines.append(f"State: {pr.get('pr_state', 'Unknown')}")
+    lines.append(f"URL: {pr.get('pr_url', '')}")
+    lines.append(f"\nDescription:\n{pr.get('pr_description', '')}\n")
+    lines.append("--- FILES CHANGED ---")
+    for f in pr.get("pr_files", []):
+        lines.append(f"- {f.get('filename', '')} ({f.get('status', '')}) [+{f.get('additions', 0)}/-{f.get('deletions', 0)}]")
+    lines.append("\n--- COMMITS ---")
+    for c in pr.get("pr_commits", []):
+        sha_short = c.get('sha','')[:7]
+        author = c.get('author','')
+        msg_line = c.get('message','').splitlines()[0] if c.get('message') else ''
+        lines.append(f"- {sha_short} by {author}: {msg_line}")
+    if pr.get("pr_diff"):
+        lines.append("\n--- DIFF (First 200 chars) ---")
+        lines.append(pr["pr_diff"][:200])
+    lines.append("============================\n")
+    return '\n'.join(lines)
+
+
+def render_review_summary(state: Dict, color: bool = False) -> str:
+    """The final review summary of a finished workflow state; colored for terminals if asked."""
+    if not state.get("pr_data"):
+        return "No summary available"
+    merge_decision = state.get("merge_decision")
+    if not merge_decision and not state.get("has_code_changes"):
+        # Non-code PRs skip the decision maker
+        merge_decision = NON_CODE_MERGE_MESSAGE
+        merge_color = COLORS["merge_green"]
+    elif "YES, it is safe to merge" in (merge_decision or ""):
+        merge_color = COLORS["merge_green"]
+    elif "NO, do not merge" in (merge_decision or ""):
+        merge_color = COLORS["merge_red"]
+    else:
+        merge_color = COLORS["react"]
+    summary = []
+    summary.append("\n======== FINAL REVIEW SUMMARY ========")
+    summary.append("\n--- PR DETAILS ---")
+    summary.append(render_pr_details(state["pr_data"]))
+    if state.get("analysis") is not None:
+        summary.append("\n--- CODE ANALYSIS ---")
+        summary.append(state.get("analysis") or "No analysis available.")
+    summary.append("\n--- REVIEW COMMENTS ---")
+    for comment in state.get("comments") or []:
+        summary.append(f"- {str(comment.get('comment_type') or 'comment').upper()} [{comment.get('file_path')}:{comment.get('line_number')}]")
+        summary.append(f"  {comment.get('content', '')}\n")
+    summary.append("\n--- MERGE DECISION ---")
+    summary.append(color_block(merge_decision or "", merge_color) if color else merge_decision or "")
+    summary.append("====================================\n")
+    return '\n'.join(summary)
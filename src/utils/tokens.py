@@ -0,0 +1,38 @@
+"""
+Local token counting with tiktoken, used for prompt budgets and benchmarks.
+"""
+
+import logging
+import threading
+
+import tiktoken
+
+from src.utils.review_log import get_logger, log_event
+
+# Encoding of the gpt-4o family
+ENCODING_NAME = "o200k_base"
+
+_ENCODING = None
+# Diffs are tokenized from worker threads; the encoding is loaded once
+_ENCODING_LOCK = threading.Lock()
+
+logger = get_logger("tokens")
+
+
+def count_tokens(text: str) -> int:
+    global _ENCODING
+    if _ENCODING is None:
+        with _ENCODING_LOCK:
+            if _ENCODING is None:
+                try:
+                    _ENCODING = tiktoken.get_encoding(ENCODING_NAME)
+                except Exception as e:
+                    # The BPE file is downloaded on first use; offline, fall back to ~4 chars per token
+                    log_event(
+                        logger, logging.WARNING, "tokens.encoding_unavailable",
+                        encoding=ENCODING_NAME, error=type(e).__name__,
+                    )
+                    _ENCODING = False
+    if _ENCODING is False:
+        return (len(text) + 3) // 4
+    return len(_ENCODING.encode(text, disallowed_special=()))
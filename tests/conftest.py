@@ -0,0 +1,51 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# The app imports modules as src.* and reads src/configs/config.json relative to the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from src.utils.review_log import configure_logging  # noqa: E402
+
+# pytest closes its captured stderr before the log writer's atexit flush
+configure_logging(stream=open(os.devnull, "w"), use_queue=False)
+
+
+@pytest.fixture
+def review_workflow(monkeypatch):
+    """
+    Runs the workflow from triage on a fetched PR, with analysis and comments
+    faked. Returns a runner that gives (final state, files sent to analysis).
+    """
+    from src.orchestrator import agent_orchestrator
+
+    analyzed = []
+
+    async def analyze_files(file_changes, repo_index=None, tiers=None):
+        analyzed.append(sorted(file_changes))
+        return {name: f"Report for {name}. No issues found." for name in file_changes}
+
+    async def stream_pr_comments(analysis, tier=None):
+        yield {"content": "Looks good.", "file_path": None, "line_number": None,
+               "comment_type": "praise", "severity": None}
+
+    monkeypatch.setattr(agent_orchestrator, "analyze_files", analyze_files)
+    monkeypatch.setattr(agent_orchestrator, "stream_pr_comments", stream_pr_comments)
+    monkeypatch.setattr(agent_orchestrator, "PUBLISH_ENABLED", False)
+
+    def run(pr_number, diff, files=None, head_sha="a" * 40):
+        pr_data = {"pr_number": pr_number, "pr_diff": diff, "pr_files": files or [], "pr_head_sha": head_sha}
+        state = {
+            **agent_orchestrator.build_initial_state("o", "r", pr_number),
+            "pr_data": pr_data, "has_code_changes": True, "step": "fetch",
+        }
+        analyzed.clear()
+        final = asyncio.run(agent_orchestrator.create_pr_workflow().ainvoke(state))
+        return final, [name for batch in analyzed for name in batch]
+
+    return run
@@ -0,0 +1,21 @@
+from src.orchestrator.review_store import REVIEW_STORE
+from src.utils.llm_cache import set_cache_bypass
+
+DIFF = "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n@@ -1,2 +1,2 @@\n def g():\n-    return 1\n+    return 2\n"
+
+
+def test_unchanged_files_are_carried_forward(review_workflow):
+    review_workflow(301, DIFF, head_sha="a" * 40)
+    _, analyzed = review_workflow(301, DIFF, head_sha="b" * 40)
+    assert analyzed == []
+
+
+def test_bypass_cache_reanalyzes_unchanged_files(review_workflow):
+    review_workflow(302, DIFF, head_sha="a" * 40)
+    set_cache_bypass(True)
+    try:
+        final, analyzed = review_workflow(302, DIFF, head_sha="b" * 40)
+    finally:
+        set_cache_bypass(False)
+    assert analyzed == ["app.py"]
+    assert REVIEW_STORE.get("o", "r", 302)["head_sha"] == "b" * 40
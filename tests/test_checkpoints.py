@@ -0,0 +1,33 @@
+import asyncio
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.orchestrator.checkpoints import RUNNING, ReviewCheckpoints, make_thread_id
+
+
+def test_concurrent_reviews_share_the_connection_with_the_saver(tmp_path):
+    """Thread bookkeeping and prune() never commit while a saver statement is open."""
+    async def main():
+        checkpoints = ReviewCheckpoints(path=str(tmp_path / "checkpoints.sqlite"))
+        await checkpoints.start()
+        saver = checkpoints._saver
+
+        async def review(key):
+            thread_id = make_thread_id(key)
+            await checkpoints._record(thread_id, key, RUNNING)
+            config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+            for _ in range(3):
+                config = await saver.aput(config, empty_checkpoint(), {}, {})
+                await saver.aput_writes(config, [("comments", "x" * 20000)], "task")
+            async for _ in saver.alist({"configurable": {"thread_id": thread_id}}):
+                await asyncio.sleep(0)
+            await checkpoints.delete_thread(thread_id)
+            await checkpoints.prune()
+
+        try:
+            await asyncio.gather(*[review(("o", "r", n, "a" * 40)) for n in range(40)])
+            return await checkpoints.list_threads()
+        finally:
+            await checkpoints.close()
+
+    assert asyncio.run(main()) == []
@@ -0,0 +1,35 @@
+from src.utils.diff_chunks import chunk_diff
+from src.utils.diff_parser import HUNK_HEADER, hunk_line_kind
+
+
+def big_hunk_diff(lines: int) -> str:
+    body = [f"+    value_{i} = compute({i})" if i % 3 else f"     kept_{i} = {i}" for i in range(lines)]
+    context = sum(1 for line in body if line.startswith(" "))
+    return "\n".join(["--- a/m.py", "+++ b/m.py", f"@@ -1,{context} +1,{lines} @@ def run():"] + body)
+
+
+def test_small_diff_is_one_chunk():
+    diff = big_hunk_diff(10)
+    chunks = chunk_diff(diff, 6000)
+    assert len(chunks) == 1
+    assert chunks[0]["diff"] == diff
+
+
+def test_oversized_hunk_is_split_with_consistent_headers():
+    diff = big_hunk_diff(3000)
+    chunks = chunk_diff(diff, 2000)
+    assert len(chunks) > 1
+    next_new = 1
+    for chunk in chunks:
+        assert chunk["tokens"] <= 2000
+        lines = chunk["diff"].split("\n")
+        assert lines[:2] == ["--- a/m.py", "+++ b/m.py"]
+        for line in lines[2:]:
+            match = HUNK_HEADER.match(line)
+            if match:
+                assert int(match.group(3)) == next_new
+                continue
+            if hunk_line_kind(line) in (" ", "+"):
+                next_new += 1
+    assert next_new == 3001
+    assert sum(chunk["additions"] for chunk in chunks) == sum(1 for i in range(3000) if i % 3)
@@ -0,0 +1,30 @@
+from src.utils.diff_minify import minify_diff
+
+
+def minify(*hunks):
+    return minify_diff({"filename": "a.py", "diff": "--- a/a.py\n+++ b/a.py\n" + "\n".join(hunks)}, radius=1)
+
+
+def test_trailing_whitespace_hunk_is_folded():
+    result = minify("@@ -1,2 +1,2 @@\n-x = 1  \n+x = 1\n y = 2")
+    assert result["whitespace_hunks"] == 1
+    assert "omitted" in result["diff"]
+
+
+def test_indentation_change_is_kept():
+    result = minify("@@ -1,3 +1,3 @@\n for item in items:\n     total += item\n-    return total\n+return total")
+    assert result["whitespace_hunks"] == 0
+    assert "+return total" in result["diff"]
+
+
+def test_joined_tokens_are_kept():
+    result = minify("@@ -1 +1 @@\n-if not banned:\n+if notbanned:")
+    assert result["whitespace_hunks"] == 0
+    assert "+if notbanned:" in result["diff"]
+
+
+def test_distant_context_is_dropped_and_headers_recomputed():
+    context = "\n".join(f" line{i}" for i in range(10))
+    result = minify(f"@@ -1,11 +1,11 @@\n{context}\n-old\n+new")
+    assert result["context_dropped"] == 9
+    assert result["hunks"][0].startswith("@@ -10,2 +10,2 @@")
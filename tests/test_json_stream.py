@@ -0,0 +1,126 @@
+"""
+Property tests for JsonArrayStreamParser over seeded random inputs: comment
+arrays with strings full of quotes, escapes, brackets, "}]" and non-ASCII
+text, wrapped in prose, code fences or a {"comments": [...]} object, and fed
+in random chunk sizes.
+"""
+
+import json
+import random
+
+import pytest
+
+from src.utils.json_stream import JsonArrayStreamParser
+
+ITERATIONS = 500
+SEEDS = range(4)
+
+ALPHABET = list("abcdefgh xyz 0123") + ['"', "\\", "{", "}", "[", "]", ",", ":", "\n", "\t", "é", "→", "🙂", "}]"]
+WRAPPERS = (
+    "{}",
+    "```json\n{}\n```",
+    "Here are the comments:\n{}\nLet me know if you need more.",
+    '{{"comments": {}}}',
+    "Note [1]: see below.\n{}",
+)
+
+
+def random_string(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+
+
+def random_comment(rng: random.Random) -> dict:
+    comment = {
+        "content": random_string(rng),
+        "file_path": rng.choice([None, f"src/{random_string(rng)}.py"]),
+        "line_number": rng.choice([None, rng.randint(1, 5000)]),
+        "comment_type": rng.choice(["suggestion", "issue", "praise", "question"]),
+        "severity": rng.choice([None, "critical", "major", "minor", "trivial"]),
+    }
+    if rng.random() < 0.2:
+        comment["extra"] = {"tags": [random_string(rng) for _ in range(rng.randint(0, 3))], "score": rng.random()}
+    return comment
+
+
+def dumps(rng: random.Random, comments: list) -> str:
+    return json.dumps(comments, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+
+
+def parse_chunked(rng: random.Random, text: str):
+    parser = JsonArrayStreamParser()
+    streamed = []
+    pos = 0
+    while pos < len(text):
+        size = rng.choice([1, 2, 3, 4, 7, 16, 64, 1000])
+        streamed.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    return streamed, parser.close()
+
+
+def is_member_prefix(partial: dict, original: dict) -> bool:
+    keys = list(partial)
+    if keys != list(original)[:len(keys)]:
+        return False
+    # Every member but the last must be intact; the last may be a truncated value
+    return all(partial[k] == original[k] for k in keys[:-1])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_complete_output_yields_every_object_in_order(seed):
+    rng = random.Random(seed)
+    for _ in range(ITERATIONS):
+        comments = [random_comment(rng) for _ in range(rng.randint(0, 8))]
+        text = rng.choice(WRAPPERS).format(dumps(rng, comments))
+        streamed, tail = parse_chunked(rng, text)
+        assert streamed == comments, text
+        assert tail == [], text
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_truncated_output_yields_a_prefix_and_one_repaired_object(seed):
+    rng = random.Random(seed)
+    for _ in range(ITERATIONS):
+        comments = [random_comment(rng) for _ in range(rng.randint(1, 8))]
+        text = dumps(rng, comments)
+        cut = text[:rng.randint(0, len(text))]
+        streamed, tail = parse_chunked(rng, cut)
+        assert streamed == comments[:len(streamed)], cut
+        assert len(tail) <= 1, cut
+        if tail:
+            assert len(streamed) < len(comments), cut
+            assert is_member_prefix(tail[0], comments[len(streamed)]), cut
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_mutated_output_never_raises_and_yields_only_dicts(seed):
+    rng = random.Random(seed)
+    for _ in range(ITERATIONS):
+        text = list(rng.choice(WRAPPERS).format(dumps(rng, [random_comment(rng) for _ in range(rng.randint(1, 5))])))
+        for _ in range(rng.randint(1, 6)):
+            i = rng.randrange(len(text) + 1)
+            roll = rng.random()
+            if roll < 0.4 and i < len(text):
+                del text[i]
+            elif roll < 0.8:
+                text.insert(i, rng.choice(ALPHABET))
+            elif i < len(text):
+                text[i] = rng.choice(ALPHABET)
+        text = "".join(text)
+        streamed, tail = parse_chunked(rng, text)
+        assert all(isinstance(c, dict) for c in streamed + tail), text
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('Sure:\n```json\n[{"content": "a"}, {"con') == [{"content": "a"}]
+    assert parser.feed('tent": "b"}]\n```') == [{"content": "b"}]
+    assert parser.close() == []
+
+
+def test_cut_off_string_is_closed_on_close():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('[{"content": "a", "file_path": "x.py", "line_number": 3}, {"content": "half a sen') == [
+        {"content": "a", "file_path": "x.py", "line_number": 3}
+    ]
+    assert parser.close() == [{"content": "half a sen"}]
+    assert parser.recovered == 1
@@ -0,0 +1,39 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agents.pr_reviewer_agent import pr_reviewer
+from src.agents.pr_reviewer_agent.pr_reviewer import generate_pr_comments
+from src.utils.review_render import render_review_summary
+
+CUT_OFF = (
+    '[{"content": "Handle the timeout.", "file_path": "a.py", "line_number": 3, "comment_type": "issue", '
+    '"severity": "major"}, {"content": "half a sen'
+)
+
+
+def comments_for(output, monkeypatch):
+    model = FakeListChatModel(responses=[output], cache=False)
+    monkeypatch.setattr(pr_reviewer.ROUTER, "chat_model", lambda tier, temperature=0: model)
+    return asyncio.run(generate_pr_comments({}, "analysis"))
+
+
+def test_truncated_stream_comments_are_completed_and_rendered(monkeypatch):
+    comments = comments_for(CUT_OFF, monkeypatch)
+    assert comments[1] == {
+        "content": "half a sen", "file_path": None, "line_number": None,
+        "comment_type": "comment", "severity": None, "truncated": True,
+    }
+    summary = render_review_summary({"pr_data": {"pr_number": 1}, "comments": comments, "merge_decision": "x"})
+    assert "- ISSUE [a.py:3]" in summary
+    assert "- COMMENT [None:None]\n  half a sen" in summary
+
+
+def test_comments_without_content_are_dropped(monkeypatch):
+    comments = comments_for('[{"comment_type": "issue"}, {"content": "ok", "line_number": "7"}, {"content": "cut', monkeypatch)
+    assert [(c["content"], c["line_number"]) for c in comments] == [("ok", None), ("cut", None)]
+
+
+def test_render_tolerates_comments_missing_fields():
+    summary = render_review_summary({"pr_data": {"pr_number": 1}, "comments": [{"content": "x"}, {}]})
+    assert "- COMMENT [None:None]\n  x" in summary
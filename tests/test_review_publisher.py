@@ -0,0 +1,141 @@
+import json
+import asyncio
+from contextlib import asynccontextmanager
+
+from src.orchestrator import review_publisher
+from src.orchestrator.review_publisher import build_review, publish_review, published_history
+from src.tools import github_mcp_tool
+from src.tools.github_mcp_tool import set_session_pool
+from src.utils.diff_parser import new_line_positions, parse_diff
+
+DIFF = (
+    "diff --git a/f.py b/f.py\n--- a/f.py\n+++ b/f.py\n"
+    "@@ -1,3 +1,4 @@\n a\n-b\n+c\n+d\n e\n"
+    "@@ -20,2 +21,2 @@ def g():\n x\n-y\n+z\n"
+)
+FILES = parse_diff(DIFF)
+HEAD = "a" * 40
+
+
+def comment(content, line, path="f.py", **extra):
+    return {"content": content, "file_path": path, "line_number": line, "comment_type": "issue", **extra}
+
+
+class FakeTool:
+    def __init__(self, calls, result):
+        self.calls, self.result = calls, result
+
+    async def ainvoke(self, args):
+        self.calls.append(args)
+        return json.dumps(self.result)
+
+
+class FakePool:
+    def __init__(self, reviews):
+        self.created = []
+        self.tools = {
+            github_mcp_tool.REVIEW_TOOL: FakeTool(self.created, {"id": 7, "html_url": "u"}),
+            github_mcp_tool.REVIEWS_TOOL: FakeTool([], reviews),
+        }
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self.tools
+
+
+def publish(number, comments, head=HEAD, reviews=()):
+    pool = FakePool(list(reviews))
+    set_session_pool(pool)
+    state = {
+        "repo_owner": "o", "repo_name": "r", "pr_number": number,
+        "pr_data": {"pr_head_sha": head}, "file_changes": FILES,
+        "comments": comments, "merge_decision": "NO, do not merge.",
+    }
+    try:
+        return asyncio.run(publish_review(state)), pool.created
+    finally:
+        set_session_pool(None)
+
+
+def test_new_line_positions_skip_removed_lines_and_count_hunk_headers():
+    positions = new_line_positions(FILES["f.py"]["hunks"])
+    assert positions == {1: 1, 2: 3, 3: 4, 4: 5, 21: 7, 22: 9}
+
+
+def test_build_review_positions_and_drops():
+    review = build_review(FILES, [
+        comment("bad c", 2, severity="major"),
+        comment("Bad  C", 2, path="./f.py"),
+        comment("far away", 99),
+        comment("z?", 22),
+        comment("overall fine", None, path=None),
+    ], "do_not_merge", "NO, do not merge.", head_sha=HEAD)
+    assert review["event"] == "REQUEST_CHANGES"
+    assert [(c["path"], c["position"]) for c in review["comments"]] == [("f.py", 3), ("f.py", 9)]
+    assert review["dropped"] == {"outside_diff": 1, "duplicate": 1, "over_limit": 0}
+    assert review["general"] == 1 and "overall fine" in review["body"]
+
+
+def test_build_review_skips_comments_already_posted():
+    first = build_review(FILES, [comment("bad c", 2)], "merge", None)
+    again = build_review(FILES, [comment("bad c", 2), comment("new", 3)], "merge", None, posted=first["keys"])
+    assert [c["body"] for c in again["comments"]] == ["**Issue**: new"]
+    assert again["dropped"]["duplicate"] == 1
+
+
+def test_marker_round_trips_through_review_history():
+    review = build_review(FILES, [comment("bad c", 2), comment("general", None, path=None)], "merge", None, head_sha=HEAD)
+    heads, keys = published_history([{"body": review["body"]}, {"body": "a human review"}, {"body": None}])
+    assert heads == {HEAD}
+    assert keys == set(review["keys"]) and len(keys) == 2
+
+
+def test_publishes_one_review_pinned_to_the_head():
+    publication, created = publish(101, [comment("bad c", 2), comment("far", 99)])
+    assert publication["status"] == "published" and publication["review_id"] == 7
+    assert len(created) == 1
+    assert created[0]["commitId"] == HEAD
+    assert created[0]["comments"] == [{"path": "f.py", "position": 3, "body": "**Issue**: bad c"}]
+
+
+def test_same_head_is_published_once_in_process():
+    publish(102, [comment("bad c", 2)])
+    publication, created = publish(102, [comment("bad c", 2)])
+    assert publication["status"] == "already_published" and created == []
+
+
+def test_reviews_posted_by_another_process_are_not_repeated():
+    earlier = build_review(FILES, [comment("bad c", 2)], "merge", None, head_sha=HEAD)
+    publication, created = publish(103, [comment("bad c", 2)], reviews=[{"body": earlier["body"]}])
+    assert publication["status"] == "already_published" and created == []
+
+    publication, created = publish(103, [comment("bad c", 2), comment("z?", 22)], head="b" * 40,
+                                   reviews=[{"body": earlier["body"]}])
+    assert publication["status"] == "published"
+    assert [c["position"] for c in created[0]["comments"]] == [9]
+
+
+def test_missing_head_sha_is_not_published():
+    before = review_publisher.PUBLISH_LOG.stats()["no_head_sha"]
+    publication, created = publish(104, [comment("bad c", 2)], head="")
+    assert publication["status"] == "skipped" and created == []
+    publication, created = publish(104, [comment("bad c", 2)], head=HEAD)
+    assert publication["status"] == "published"
+    assert review_publisher.PUBLISH_LOG.stats()["no_head_sha"] == before + 1
+
+
+def test_publishes_when_review_history_is_unavailable():
+    pool = FakePool([])
+    del pool.tools[github_mcp_tool.REVIEWS_TOOL]
+    set_session_pool(pool)
+    before = review_publisher.PUBLISH_LOG.stats()["history_unavailable"]
+    state = {
+        "repo_owner": "o", "repo_name": "r", "pr_number": 105, "pr_data": {"pr_head_sha": HEAD},
+        "file_changes": FILES, "comments": [comment("bad c", 2)],
+    }
+    try:
+        publication = asyncio.run(publish_review(state))
+    finally:
+        set_session_pool(None)
+    assert publication["status"] == "published" and len(pool.created) == 1
+    assert review_publisher.PUBLISH_LOG.stats()["history_unavailable"] == before + 1
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from src.orchestrator.cancellation import CancelToken, ReviewCancelled, cancel_scope, raise_if_cancelled
+from src.orchestrator.single_flight import ReviewSingleFlight
+from src.utils.llm_cache import set_cache_bypass
+from src.utils.model_router import set_routing_budget
+
+KEY = ("o", "r", 1, "abc123")
+
+
+class FakeReview:
+    """A review that checks the run's token between two steps, like cancellable_node."""
+
+    def __init__(self):
+        self.started = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        run = self.started
+        raise_if_cancelled("analyze")
+        await self.release.wait()
+        raise_if_cancelled("decision")
+        return {"run": run}
+
+
+async def join(flight, review, token=None, bypass=False, max_cost_usd=None):
+    set_cache_bypass(bypass)
+    set_routing_budget(max_cost_usd=max_cost_usd)
+    with cancel_scope(token):
+        return await flight.run(KEY, review, use_cache=not bypass)
+
+
+def run_callers(*callers, before_release=None):
+    async def main():
+        flight = ReviewSingleFlight()
+        review = FakeReview()
+        tasks = [asyncio.create_task(join(flight, review, **caller)) for caller in callers]
+        # Let the callers attach and the shared run reach its first step
+        for _ in range(3):
+            await asyncio.sleep(0)
+        if before_release:
+            before_release()
+        review.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return results, flight.stats(), review.started
+    return asyncio.run(main())
+
+
+def test_same_settings_share_one_run():
+    results, stats, started = run_callers({}, {}, {})
+    assert results == [{"run": 1}] * 3
+    assert started == 1 and stats["coalesced"] == 2
+
+
+def test_cancelling_the_first_caller_does_not_fail_the_others():
+    first, second = CancelToken(), CancelToken()
+    results, _, started = run_callers({"token": first}, {"token": second},
+                                      before_release=lambda: first.cancel("superseded"))
+    assert isinstance(results[0], ReviewCancelled) and "superseded" in str(results[0])
+    assert results[1] == {"run": 1}
+    assert started == 1
+
+
+def test_run_stops_once_every_caller_is_cancelled():
+    first, second = CancelToken(), CancelToken()
+
+    def cancel_all():
+        first.cancel("superseded")
+        second.cancel("superseded")
+
+    results, _, _ = run_callers({"token": first}, {"token": second}, before_release=cancel_all)
+    assert all(isinstance(r, ReviewCancelled) and "before decision" in str(r) for r in results)
+
+
+def test_caller_without_a_token_keeps_the_run_going():
+    token = CancelToken()
+    results, _, _ = run_callers({"token": token}, {}, before_release=lambda: token.cancel("superseded"))
+    assert isinstance(results[0], ReviewCancelled)
+    assert results[1] == {"run": 1}
+
+
+@pytest.mark.parametrize("other", [{"bypass": True}, {"max_cost_usd": 0.01}])
+def test_bypass_and_budgeted_callers_get_their_own_run(other):
+    results, stats, started = run_callers({}, other)
+    assert started == 2 and stats["coalesced"] == 0
+    assert {r["run"] for r in results} == {1, 2}
+
+
+def test_cached_result_is_only_served_to_the_same_budget():
+    async def main():
+        flight = ReviewSingleFlight()
+        review = FakeReview()
+        review.release.set()
+        await join(flight, review)
+        await join(flight, review)
+        await join(flight, review, max_cost_usd=0.01)
+        return flight.stats(), review.started
+    stats, started = asyncio.run(main())
+    assert started == 2 and stats["cache_hits"] == 1
@@ -0,0 +1,59 @@
+from src.orchestrator.triage import RULES, classify_file, triage_pr
+from src.utils.file_kinds import is_comment_only_python, is_whitespace_only
+
+
+def modified(filename, *hunks):
+    diff = f"--- a/{filename}\n+++ b/{filename}\n" + "\n".join(hunks)
+    return {"filename": filename, "status": "modified", "additions": 1, "deletions": 1, "diff": diff}
+
+
+def test_trailing_whitespace_and_line_endings_are_whitespace_only():
+    assert is_whitespace_only(["x = 1  ", "y = 2\r"], ["x = 1", "", "y = 2"], "a.py")
+
+
+def test_joined_tokens_are_not_whitespace_only():
+    assert not is_whitespace_only(["if not banned:"], ["if notbanned:"], "a.js")
+
+
+def test_indentation_counts_where_it_is_syntax():
+    for filename in ("a.py", "conf.yaml", "Makefile", "rules.mk"):
+        assert not is_whitespace_only(["    x: 1"], ["x: 1"], filename)
+    assert not is_whitespace_only(["    x"], ["x"])
+    assert is_whitespace_only(["    x();"], ["\tx();"], "a.js")
+
+
+def test_dedent_out_of_block_needs_review():
+    change = modified("a.py", "@@ -1,3 +1,3 @@\n for item in items:\n     total += item\n-    return total\n+return total")
+    assert classify_file(change) == "review"
+    assert triage_pr({"a.py": change}, True)["route"] != RULES
+
+
+def test_comment_only_python_keeps_indentation():
+    assert is_comment_only_python(["if x:", "    y()  # old"], ["if x:", "    y()  # new"])
+    assert not is_comment_only_python(["if x:", "    y()", "    z()"], ["if x:", "    y()", "z()"])
+
+
+def test_comment_and_docstring_changes_are_skipped():
+    change = modified("a.py", '@@ -1,3 +1,3 @@\n def f():\n-    """Old."""\n+    """New."""\n     return 1  # done')
+    assert classify_file(change) == "comments"
+
+
+def test_whitespace_only_change_is_settled_by_rules():
+    change = modified("a.py", "@@ -1,2 +1,2 @@\n-x = 1   \n+x = 1\n y = 2")
+    assert classify_file(change) == "whitespace"
+    assert triage_pr({"a.py": change}, True)["route"] == RULES
+
+
+def test_broken_new_file_does_not_hide_the_rest_of_the_pr(review_workflow):
+    diff = (
+        "diff --git a/new.py b/new.py\nnew file mode 100644\n--- /dev/null\n+++ b/new.py\n"
+        "@@ -0,0 +1,2 @@\n+def f(:\n+    return 1\n"
+        "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n"
+        "@@ -1,2 +1,2 @@\n def g():\n-    return 1\n+    return 2\n"
+    )
+    final, analyzed = review_workflow(201, diff)
+    assert final["triage"]["route"] != RULES
+    assert "app.py" in analyzed
+    assert "Report for app.py." in final["analysis"]
+    assert final["comments"][0]["file_path"] == "new.py" and final["comments"][0]["severity"] == "critical"
+    assert final["decision"]["verdict"] == "do_not_merge" and final["decision"]["source"] == "rules"